@@ -0,0 +1,228 @@
+"""
+Agrégations GROUP BY calculées en SQL pour le résumé admin
+"""
+import datetime
+import decimal
+
+from sqlalchemy import Integer, String, cast, func, literal, literal_column
+
+from models import db, Report
+
+
+GROUP_BY_FIELDS = ('section', 'week', 'month', 'preacher')
+
+# Colonnes numériques agrégeables: nom public -> colonne Report
+METRIC_COLUMNS = {
+    'offering': Report.offering,
+    'total_attendees': Report.total_attendees,
+    'men': Report.men,
+    'women': Report.women,
+    'children': Report.children,
+    'youth': Report.youth,
+}
+
+METRIC_FUNCTIONS = {
+    'sum': func.sum,
+    'avg': func.avg,
+    'min': func.min,
+    'max': func.max,
+}
+
+DEFAULT_METRICS = ['count', 'sum:offering', 'sum:total_attendees']
+
+
+class AggregateError(ValueError):
+    """Paramètres d'agrégation invalides"""
+
+
+def _period_expression(field: str, dialect: str):
+    """Début de semaine (lundi) ou de mois, au format YYYY-MM-DD, selon la base"""
+    if dialect == 'sqlite':
+        if field == 'month':
+            return func.strftime('%Y-%m-01', Report.date)
+        # strftime('%w'): 0 = dimanche; on recule jusqu'au lundi
+        days_since_monday = (cast(func.strftime('%w', Report.date), Integer) + 6) % 7
+        return func.date(Report.date, literal('-') + cast(days_since_monday, String) + literal(' days'))
+    if dialect == 'mysql':
+        if field == 'month':
+            return func.date_format(Report.date, '%Y-%m-01')
+        return func.subdate(Report.date, func.weekday(Report.date))
+    # PostgreSQL et autres bases compatibles date_trunc
+    return func.date(func.date_trunc(field, Report.date))
+
+
+def _group_expression(field: str, dialect: str):
+    if field == 'section':
+        return Report.section_id
+    if field == 'preacher':
+        return Report.preacher
+    return _period_expression(field, dialect)
+
+
+def parse_group_by(value: str) -> list:
+    """Valide group_by (liste séparée par des virgules)"""
+    fields = [f.strip() for f in (value or 'section').split(',') if f.strip()]
+    for field in fields:
+        if field not in GROUP_BY_FIELDS:
+            raise AggregateError(f'group_by invalide: {field} ({", ".join(GROUP_BY_FIELDS)})')
+    if len(set(fields)) != len(fields):
+        raise AggregateError('group_by contient des doublons')
+    return fields
+
+
+def parse_metrics(values: list) -> list:
+    """
+    Valide les métriques: 'count' ou '<fonction>:<colonne>' (ex: sum:offering)
+
+    Accepte plusieurs paramètres metrics= et/ou une liste séparée par des virgules.
+    """
+    metrics = []
+    for value in values or DEFAULT_METRICS:
+        for metric in value.split(','):
+            metric = metric.strip()
+            if not metric:
+                continue
+            if metric != 'count':
+                fn, _, column = metric.partition(':')
+                if fn not in METRIC_FUNCTIONS or column not in METRIC_COLUMNS:
+                    raise AggregateError(f'Métrique invalide: {metric}')
+            if metric not in metrics:
+                metrics.append(metric)
+    if not metrics:
+        raise AggregateError('Aucune métrique demandée')
+    return metrics
+
+
+def _metric_columns(metrics: list, partial: bool = False) -> list:
+    """
+    Colonnes SQL des métriques
+
+    partial=True: états fusionnables avec d'autres lignes (archive):
+    avg devient (somme, nombre de valeurs non nulles)
+    """
+    columns = []
+    for metric in metrics:
+        if metric == 'count':
+            columns.append(func.count(Report.id).label('count'))
+            continue
+        fn, _, column = metric.partition(':')
+        if partial and fn == 'avg':
+            columns.append(func.sum(METRIC_COLUMNS[column]).label(f'sum_{column}__partial'))
+            columns.append(func.count(METRIC_COLUMNS[column]).label(f'count_{column}__partial'))
+        else:
+            columns.append(METRIC_FUNCTIONS[fn](METRIC_COLUMNS[column]).label(f'{fn}_{column}'))
+    return columns
+
+
+def _plain(value):
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _archived_group_value(field: str, row):
+    if field == 'section':
+        return row.section_id
+    if field == 'preacher':
+        return row.preacher
+    if field == 'month':
+        return row.date.replace(day=1).isoformat()
+    return (row.date - datetime.timedelta(days=row.date.weekday())).isoformat()
+
+
+def _combine(fn: str, a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if fn == 'min':
+        return min(a, b)
+    if fn == 'max':
+        return max(a, b)
+    return a + b  # count, sum, états de avg
+
+
+def _merge_archived(group_by: list, metrics: list, sql_rows, archived_rows) -> dict:
+    """Fusionne les états partiels SQL (table chaude) et ceux calculés sur l'archive"""
+    plan = []  # (fonction de fusion, colonne archivée ou None pour count)
+    for metric in metrics:
+        if metric == 'count':
+            plan.append(('count', None))
+            continue
+        fn, _, column = metric.partition(':')
+        if fn == 'avg':
+            plan += [('sum', column), ('count', column)]
+        else:
+            plan.append((fn, column))
+
+    groups = {}
+    for row in sql_rows:
+        values = [_plain(v) for v in row]
+        groups[tuple(values[:len(group_by)])] = values[len(group_by):]
+    for row in archived_rows:
+        key = tuple(_archived_group_value(field, row) for field in group_by)
+        state = groups.setdefault(key, [None] * len(plan))
+        for i, (fn, column) in enumerate(plan):
+            if column is None:
+                value = 1
+            else:
+                value = getattr(row, column)
+                if fn == 'count':
+                    value = 1 if value is not None else 0
+            state[i] = _combine(fn, state[i], value)
+    return groups
+
+
+def aggregate_reports(group_by: list, metrics: list, start=None, end=None, section_id: int = None,
+                      archived=None) -> list:
+    """
+    Calcule les métriques demandées par groupe, entièrement en SQL
+
+    archived: lecteur report_archive.reader() si la période recoupe l'archive;
+    la base renvoie alors des états partiels fusionnés avec les rapports archivés.
+
+    Returns:
+        Liste de dicts: une clé par champ de group_by et par métrique
+        (ex: {'section_id': 2, 'month': '2024-01-01', 'count': 4, 'sum_offering': 1200.0})
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    group_columns = []
+    for field in group_by:
+        label = 'section_id' if field == 'section' else field
+        group_columns.append(_group_expression(field, dialect).label(label))
+
+    query = db.session.query(*group_columns, *_metric_columns(metrics, partial=archived is not None))
+    if start:
+        query = query.filter(Report.date >= start)
+    if end:
+        query = query.filter(Report.date <= end)
+    if section_id:
+        query = query.filter(Report.section_id == section_id)
+
+    positions = [literal_column(str(i)) for i in range(1, len(group_columns) + 1)]
+    query = query.group_by(*positions).order_by(*positions)
+
+    if archived is None:
+        return [{key: _plain(value) for key, value in row._mapping.items()} for row in query.all()]
+
+    labels = [column.key for column in group_columns]
+    results = []
+    groups = _merge_archived(group_by, metrics, query.all(), archived())
+    for key in sorted(groups, key=lambda k: tuple((v is None, v) for v in k)):
+        item = dict(zip(labels, key))
+        state = iter(groups[key])
+        for metric in metrics:
+            if metric == 'count':
+                item['count'] = next(state) or 0
+                continue
+            fn, _, column = metric.partition(':')
+            value = next(state)
+            if fn == 'avg':
+                count = next(state)
+                value = value / count if count else None
+            item[f'{fn}_{column}'] = _plain(value)
+        results.append(item)
+    return results
@@ -0,0 +1,311 @@
+"""
+Cache analytique en colonnes (NumPy) pour les tableaux de bord admin
+
+L'historique des rapports est chargé une fois en tableaux NumPy (jour en
+int32 depuis 1970-01-01, section, participants, offrande). Les agrégats par
+période ou par groupe sont ensuite des opérations vectorisées (masques,
+bincount) au lieu de parcourir des objets ORM.
+
+- insertion: les nouveaux rapports sont ajoutés en fin de tableaux (O(1) amorti)
+- suppression / import: le cache est marqué périmé et rechargé à la lecture
+- autres workers: (nombre, id max) est revérifié en base toutes les TTL secondes
+- rapports archivés (report_archive): chargés avec la table. L'archivage
+  déplace des lignes sans changer (nombre, id max) base + archive: il ne
+  déclenche aucun rechargement, et n'en a pas besoin (mêmes valeurs). Seul
+  l'invalidate() explicite de la commande archive-reports recharge, dans
+  son propre processus
+
+NumPy est optionnel et importé à la première lecture (pas au démarrage des
+workers); sans lui, le cache est désactivé (available = False).
+"""
+import datetime
+import logging
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from models import db, Report
+from report_archive import report_archive
+
+np = None  # importé à la demande par _load_numpy()
+
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime.date(1970, 1, 1)
+
+ANALYTICS_GROUP_BY = ('section', 'week', 'month')
+
+# Colonnes chargées: nom -> (colonne Report, dtype NumPy)
+_COLUMNS = {
+    'id': (Report.id, 'int64'),
+    'day': (Report.date, 'int32'),
+    'section_id': (Report.section_id, 'int32'),
+    'total_attendees': (Report.total_attendees, 'int64'),
+    'offering': (Report.offering, 'float64'),
+}
+
+_INITIAL_CAPACITY = 1024
+
+
+def _load_numpy():
+    """Importe NumPy au premier besoin; None s'il n'est pas installé"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # dépendance optionnelle
+            return None
+        np = numpy
+    return np
+
+
+class AnalyticsUnavailable(RuntimeError):
+    """NumPy n'est pas installé"""
+
+
+class AnalyticsError(ValueError):
+    """Paramètres d'analyse invalides"""
+
+
+def _day_number(date: datetime.date) -> int:
+    return (date - EPOCH).days
+
+
+def _day_to_iso(day) -> str:
+    return (EPOCH + datetime.timedelta(days=int(day))).isoformat()
+
+
+class ReportColumns:
+    """Tableaux NumPy de l'historique des rapports (capacité doublée à l'ajout)"""
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self.size = 0
+        # Id max vu au chargement: les rapports jusqu'à cet id y sont déjà
+        self.loaded_max_id = 0
+        self.arrays = {name: np.zeros(capacity, dtype=dtype) for name, (_, dtype) in _COLUMNS.items()}
+
+    @classmethod
+    def load(cls, chunk_size: int = 10000):
+        """Charge toute la table Report par lots (sans objets ORM), puis les rapports archivés"""
+        count = db.session.query(func.count(Report.id)).scalar() or 0
+        columns = cls(max(count + report_archive.total_rows(), _INITIAL_CAPACITY))
+        stmt = select(*[column for column, _ in _COLUMNS.values()])
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            columns.extend(rows)
+        archived = report_archive.reader(descending=False)
+        if archived:
+            columns.extend((r.id, r.date, r.section_id, r.total_attendees, r.offering) for r in archived())
+        columns.loaded_max_id = columns.max_id
+        return columns
+
+    def _reserve(self, extra: int):
+        capacity = len(self.arrays['id'])
+        if self.size + extra <= capacity:
+            return
+        capacity = max(capacity * 2, self.size + extra)
+        for name, array in self.arrays.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[name] = grown
+
+    def extend(self, rows):
+        """Ajoute des lignes (id, date, section_id, total_attendees, offering)"""
+        rows = list(rows)
+        if not rows:
+            return
+        self._reserve(len(rows))
+        end = self.size + len(rows)
+        ids, dates, sections, attendees, offerings = zip(*rows)
+        self.arrays['id'][self.size:end] = ids
+        self.arrays['day'][self.size:end] = [_day_number(d) for d in dates]
+        self.arrays['section_id'][self.size:end] = sections
+        self.arrays['total_attendees'][self.size:end] = [a or 0 for a in attendees]
+        self.arrays['offering'][self.size:end] = [o or 0.0 for o in offerings]
+        self.size = end
+
+    def view(self, name: str):
+        return self.arrays[name][:self.size]
+
+    @property
+    def max_id(self) -> int:
+        return int(self.view('id').max()) if self.size else 0
+
+
+def _week_keys(days):
+    # 1970-01-01 était un jeudi: on recule jusqu'au lundi
+    return days - (days + 3) % 7
+
+
+def _month_keys(days):
+    months = days.astype('datetime64[D]').astype('datetime64[M]')
+    return months.astype('datetime64[D]').astype('int64')
+
+
+def _next_period(key: int, group_by: str) -> int:
+    if group_by == 'week':
+        return key + 7
+    month = np.datetime64(int(key), 'D').astype('datetime64[M]') + 1
+    return int(month.astype('datetime64[D]').astype('int64'))
+
+
+class AnalyticsCache:
+    """Cache en colonnes partagé par les requêtes d'un processus"""
+
+    def __init__(self):
+        self.ttl_seconds = 30
+        self._columns = None
+        self._stale = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure le cache depuis la config Flask"""
+        self.ttl_seconds = app.config.get('ANALYTICS_CACHE_TTL_SECONDS', self.ttl_seconds)
+
+    @property
+    def available(self) -> bool:
+        return _load_numpy() is not None
+
+    # ---------- Maintenance ----------
+
+    def append(self, reports) -> None:
+        """
+        Ajoute des rapports venant d'être validés (commit fait)
+
+        Un rechargement concurrent (autre requête, après le commit) a pu déjà
+        les lire: les ids <= loaded_max_id sont ignorés pour ne pas les compter deux fois.
+        """
+        with self._lock:
+            if self._columns is None or self._stale:
+                return  # rechargé à la prochaine lecture
+            loaded_max_id = self._columns.loaded_max_id
+            self._columns.extend(
+                (r.id, r.date, r.section_id, r.total_attendees, r.offering)
+                for r in reports if r.id > loaded_max_id
+            )
+
+    def invalidate(self) -> None:
+        """Marque le cache périmé (suppression, import, archivage)"""
+        with self._lock:
+            self._stale = True
+
+    def _columns_for_read(self):
+        """Colonnes à jour: recharge si périmé ou modifié par un autre worker"""
+        if _load_numpy() is None:
+            raise AnalyticsUnavailable('NumPy est requis pour les analyses (pip install numpy)')
+        with self._lock:
+            now = time.monotonic()
+            if not self._stale and now - self._checked_at >= self.ttl_seconds:
+                count, max_id = db.session.query(func.count(Report.id), func.max(Report.id)).one()
+                count += report_archive.total_rows()
+                max_id = max(max_id or 0, report_archive.max_id())
+                if (count, max_id) != (self._columns.size, self._columns.max_id):
+                    self._stale = True
+                self._checked_at = now
+            if self._columns is None or self._stale:
+                started = time.perf_counter()
+                self._columns = ReportColumns.load()
+                self._stale = False
+                self._checked_at = now
+                logger.info(f'Analytics cache loaded: {self._columns.size} reports '
+                            f'in {(time.perf_counter() - started) * 1000:.1f} ms')
+            return self._columns
+
+    # ---------- Lecture ----------
+
+    def _select(self, start=None, end=None, section_id: int = None):
+        """Vues filtrées (jour, section, participants, offrande)"""
+        columns = self._columns_for_read()
+        days = columns.view('day')
+        sections = columns.view('section_id')
+        attendees = columns.view('total_attendees')
+        offerings = columns.view('offering')
+        mask = None
+        if start:
+            mask = days >= _day_number(start)
+        if end:
+            m = days <= _day_number(end)
+            mask = m if mask is None else mask & m
+        if section_id:
+            m = sections == section_id
+            mask = m if mask is None else mask & m
+        if mask is not None:
+            days, sections, attendees, offerings = days[mask], sections[mask], attendees[mask], offerings[mask]
+        return days, sections, attendees, offerings
+
+    def totals(self, start=None, end=None, section_id: int = None) -> dict:
+        """Nombre de rapports, participants et offrande sur la période"""
+        _, _, attendees, offerings = self._select(start, end, section_id)
+        return {
+            'count': int(attendees.size),
+            'total_attendees': int(attendees.sum()),
+            'offering': float(offerings.sum()),
+        }
+
+    def group(self, group_by: str, start=None, end=None, section_id: int = None, window: int = None) -> list:
+        """
+        Totaux par section, semaine ou mois
+
+        Args:
+            window: pour week/month, moyenne mobile sur `window` périodes; la série
+                est alors continue (périodes sans rapport à zéro)
+
+        Returns:
+            Liste de dicts triés par clé, ex: {'week': '2024-01-01', 'count': 3,
+            'total_attendees': 420, 'offering': 75000.0}
+        """
+        if group_by not in ANALYTICS_GROUP_BY:
+            raise AnalyticsError(f'group_by invalide ({", ".join(ANALYTICS_GROUP_BY)})')
+        if window is not None and (group_by == 'section' or window < 1):
+            raise AnalyticsError('window: entier >= 1, uniquement avec group_by=week ou month')
+
+        days, sections, attendees, offerings = self._select(start, end, section_id)
+        if group_by == 'section':
+            keys = sections
+        elif group_by == 'week':
+            keys = _week_keys(days)
+        else:
+            keys = _month_keys(days)
+
+        if window is not None and keys.size:
+            # Série continue de la première à la dernière période
+            periods = [int(keys.min())]
+            last = int(keys.max())
+            while periods[-1] < last:
+                periods.append(_next_period(periods[-1], group_by))
+            unique = np.array(periods, dtype='int64')
+            inverse = np.searchsorted(unique, keys)
+        else:
+            unique, inverse = np.unique(keys, return_inverse=True)
+
+        size = unique.size
+        metrics = {
+            'count': np.bincount(inverse, minlength=size),
+            'total_attendees': np.bincount(inverse, weights=attendees, minlength=size),
+            'offering': np.bincount(inverse, weights=offerings, minlength=size),
+        }
+        if window is not None and size:
+            # Somme glissante des `window` dernières périodes / périodes disponibles
+            kernel = np.ones(window)
+            available = np.minimum(np.arange(1, size + 1), window)
+            moving = {
+                f'{name}_avg': np.convolve(values, kernel)[:size] / available
+                for name, values in metrics.items()
+            }
+            metrics.update(moving)
+
+        label = 'section_id' if group_by == 'section' else group_by
+        rows = []
+        for i in range(size):
+            row = {label: int(unique[i]) if group_by == 'section' else _day_to_iso(unique[i])}
+            for name, values in metrics.items():
+                value = values[i]
+                row[name] = int(value) if name in ('count', 'total_attendees') else round(float(value), 2)
+            rows.append(row)
+        return rows
+
+
+analytics_cache = AnalyticsCache()
@@ -1,28 +1,64 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
     jwt_required,
-    get_jwt_identity,
-    get_jwt,
     verify_jwt_in_request,
-    decode_token,
 )
 import logging
 import datetime
 import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import click
 
 from config import Config
+from auth import (
+    IdentityError,
+    TokenMissing,
+    current_identity,
+    identity_from_header_or_query,
+    user_cache,
+)
 from models import db, User, Report, WeeklyStats
-from report_schema import ReportSchema
-from pdf_utils import generate_reports_pdf, generate_single_report_pdf
+from report_schema import ReportSchema, normalize_report_payload
+from password_hashing import HashingBusy, password_hasher
+from pdf_cache import pdf_cache
+from db_routing import REPLICA_BIND_KEY
+from data_versions import GLOBAL_SCOPE, bump_data_versions, conditional_get, replica_read, section_scope
+from export_jobs import JOB_DONE, ExportJobError, export_jobs
+from pagination import (
+    PaginationError,
+    fetch_page,
+    iter_reports,
+    order_by_keyset,
+    parse_limit,
+    report_rows,
+    rows_to_dicts,
+    stream_json_array,
+)
+from fast_json import json_response
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from migrations import ensure_indexes, migrate_schema
+from query_plans import check_query_plans
+from query_profiler import query_profiler
+from analytics_cache import AnalyticsError, AnalyticsUnavailable, analytics_cache
+from aggregates import AggregateError, aggregate_reports, parse_group_by, parse_metrics
+from report_export import EXPORT_FORMATS, stream_export
+from report_archive import ARCHIVE_JOB, merge_rows, report_archive
+from report_partitions import current_partitions, partition_report_table, supports_partitioning
+from report_import import ReportImportError, detect_format, file_sha256, import_reports
+from rollups import GRANULARITIES, get_rollups, rebuild_all_rollups
+from weekly_rollover import acquire_job_lock, release_job_lock, run_weekly_rollover, weekly_rollover
 from weekly_stats import (
+    apply_report_delta,
+    apply_reports_delta,
     get_or_create_weekly_stats,
-    update_weekly_stats_from_report,
     get_current_week_offering,
     get_monday_of_week,
     get_weekly_stats as get_all_weekly_stats,
@@ -38,13 +74,39 @@ def create_app(config_class=Config):
     CORS(app, 
          origins=app.config.get('CORS_ORIGINS', ['http://localhost:5173']),
          supports_credentials=True,
-         allow_headers=['Content-Type', 'Authorization'],
+         allow_headers=['Content-Type', 'Authorization', 'If-None-Match'],
+         expose_headers=['ETag', 'X-Query-Count', 'X-Query-Time-Ms', 'X-Query-Repeated'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
     )
     
     # Init database
     db.init_app(app)
 
+    # Métriques Prometheus: latence par route, SQL par requête, rendu PDF
+    metrics.init_app(app)
+
+    # Profileur SQL de développement (QUERY_PROFILER_ENABLED)
+    query_profiler.init_app(app)
+
+    # Cache des PDF de rapports individuels
+    pdf_cache.init_app(app)
+
+    # Cache des fiches utilisateur (identité résolue une fois par requête)
+    user_cache.init_app(app)
+
+    # Hachage des mots de passe hors du thread de requête
+    password_hasher.init_app(app)
+
+    # Exports PDF asynchrones
+    export_jobs.init_app(app)
+    analytics_cache.init_app(app)
+
+    # Archive froide des anciens rapports (lecture transparente)
+    report_archive.init_app(app)
+
+    # Clôture hebdomadaire (démarrée par worker: gunicorn post_fork, python app.py)
+    weekly_rollover.init_app(app)
+
     # JWT
     jwt = JWTManager(app)
 
@@ -80,17 +142,91 @@ def create_app(config_class=Config):
     def handle_bad_request(err):
         return jsonify({'msg': 'Requête invalide', 'error': str(err)}), 400
 
+    @app.errorhandler(IdentityError)
+    def handle_identity_error(err):
+        return jsonify({'msg': str(err)}), 400
+
+    @app.errorhandler(HashingBusy)
+    def handle_hashing_busy(err):
+        logger.warning(f'Password hashing pool saturated: {err}')
+        return jsonify({'msg': str(err)}), 503, {'Retry-After': '1'}
+
     @app.errorhandler(500)
     def handle_internal_error(err):
         logger.error(f'Internal server error: {err}')
         return jsonify({'msg': 'Erreur serveur interne'}), 500
 
+    # ==================== Helpers ====================
+    def reports_list_response(query, label, archived=None):
+        """
+        Sérialise une liste de rapports selon les paramètres de la requête
+
+        - stream=1: tableau JSON envoyé par morceaux (mémoire constante)
+        - limit/cursor: page keyset sur (date, id) avec next_cursor
+        - sinon: liste complète (comportement historique)
+
+        archived: lecteur report_archive.reader() si la période recoupe l'archive
+        """
+        rows_query = report_rows(query)
+
+        if request.args.get('stream') in ('1', 'true'):
+            logger.info(f'Streaming reports for {label}')
+            return Response(stream_with_context(stream_json_array(query, archived=archived)),
+                            mimetype='application/json')
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = parse_limit(request.args.get('limit'))
+                rows, next_cursor = fetch_page(rows_query, limit, request.args.get('cursor'), archived)
+            except PaginationError as e:
+                return jsonify({'msg': str(e)}), 400
+            logger.info(f'Returning page of {len(rows)} reports for {label}')
+            return json_response({
+                'items': rows_to_dicts(rows),
+                'next_cursor': next_cursor,
+                'limit': limit,
+            })
+
+        rows = order_by_keyset(rows_query).all()
+        if archived is not None:
+            rows = list(merge_rows(rows, archived(), descending=True))
+        logger.info(f'Returning {len(rows)} reports for {label}')
+        return json_response(rows_to_dicts(rows))
+
+    def build_report(data, section_id, submitted_by):
+        """Construit un Report à partir des données validées par ReportSchema"""
+        return Report(
+            date=data['date'],
+            preacher=data['preacher'],
+            total_attendees=data['total_attendees'],
+            men=data.get('men', 0) or 0,
+            women=data.get('women', 0) or 0,
+            children=data.get('children', 0) or 0,
+            youth=data.get('youth', 0) or 0,
+            offering=data.get('offering', 0.0) or 0.0,
+            currency='XOF',  # Francs CFA
+            section_id=section_id,
+            notes=data.get('notes'),
+            submitted_by=submitted_by,
+            submitted_at=datetime.datetime.utcnow(),
+        )
+
     # ==================== Health Check ====================
     @app.route('/', methods=['GET'])
     def index():
         """Vérifie que le backend fonctionne"""
         return jsonify({'msg': 'ResumeSection backend running', 'version': '1.0.0'}), 200
 
+    # ==================== Metrics ====================
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Métriques au format texte Prometheus (tous les workers si METRICS_DIR)"""
+        if not metrics.enabled:
+            return jsonify({'msg': 'Métriques désactivées'}), 404
+        if not metrics.authorized(request.headers.get('Authorization')):
+            return jsonify({'msg': 'Jeton de métriques invalide'}), 401
+        return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
     # ==================== Registration ====================
     @app.route('/register', methods=['POST', 'OPTIONS'])
     def register():
@@ -119,11 +255,10 @@ def create_app(config_class=Config):
             return jsonify({'msg': 'Mot de passe trop court (min 6 caractères)'}), 400
 
         # Bootstrap: premier utilisateur sans authentification
-        if User.query.count() > 0:
+        if user_cache.has_users():
             try:
                 verify_jwt_in_request()
-                claims = get_jwt()
-                if claims.get('role') != 'admin':
+                if not current_identity().is_admin:
                     return jsonify({'msg': 'Seul un administrateur peut créer des utilisateurs'}), 403
             except Exception:
                 return jsonify({'msg': 'Authentification requise pour créer un utilisateur'}), 403
@@ -165,6 +300,13 @@ def create_app(config_class=Config):
             logger.warning(f'Failed login attempt for: {username}')
             return jsonify({'msg': 'Identifiants invalides'}), 401
 
+        # Ré-encoder le hash si la méthode ou le coût configurés ont changé
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+            logger.info(f'Password hash upgraded for: {username}')
+        user_cache.put(user)
+
         # Créer le token JWT
         access_token = create_access_token(
             identity=str(user.id),
@@ -193,57 +335,8 @@ def create_app(config_class=Config):
             logger.error(f'Invalid JSON in add_report: {e}')
             return jsonify({'msg': 'JSON invalide', 'error': str(e)}), 400
 
-        # Mapping flexible des clés
-        mapping = {
-            'totalFaithful': 'total_attendees',
-            'total_faithful': 'total_attendees',
-            'totalFaithfulCount': 'total_attendees',
-            'total': 'total_attendees',
-            'menCount': 'men',
-            'men_count': 'men',
-            'womenCount': 'women',
-            'women_count': 'women',
-            'childrenCount': 'children',
-            'children_count': 'children',
-            'kids': 'children',
-            'youthCount': 'youth',
-            'youth_count': 'youth',
-            'offrande': 'offering',
-            'offre': 'offering',
-            'don': 'offering',
-            'notes': 'notes',
-            'note': 'notes',
-            'preacher': 'preacher',
-            'predicateur': 'preacher',
-            'date': 'date',
-            'report_date': 'date',
-        }
-
-        # Coercer les valeurs numériques
-        def coerce_numeric(key, value):
-            if value is None:
-                return None
-            if isinstance(value, (int, float)):
-                return value
-            try:
-                s = str(value).strip()
-                if s == '':
-                    return None
-                if s.isdigit() or (s.startswith('-') and s[1:].isdigit()):
-                    return int(s)
-                s2 = s.replace(',', '.')
-                return float(s2)
-            except Exception:
-                return value
-
-        # Normaliser les clés
-        normalized = {}
-        if isinstance(payload, dict):
-            for k, v in payload.items():
-                mapped = mapping.get(k, k)
-                if mapped in ('total_attendees', 'men', 'women', 'children', 'youth', 'offering'):
-                    v = coerce_numeric(mapped, v)
-                normalized[mapped] = v
+        # Normaliser les clés (alias) et les valeurs numériques
+        normalized = normalize_report_payload(payload)
 
         # Valider
         schema = ReportSchema()
@@ -254,61 +347,150 @@ def create_app(config_class=Config):
 
         data = schema.load(normalized)
 
-        # Récupérer l'ID de l'utilisateur
-        identity = get_jwt_identity()
-        try:
-            section_id = int(identity)
-        except Exception:
-            return jsonify({'msg': 'Identity token invalide'}), 400
+        # Identité de la requête; nom d'utilisateur courant via le cache
+        section_id = current_identity().id
 
         # Créer le rapport
-        report = Report(
-            date=data['date'],
-            preacher=data['preacher'],
-            total_attendees=data['total_attendees'],
-            men=data.get('men', 0) or 0,
-            women=data.get('women', 0) or 0,
-            children=data.get('children', 0) or 0,
-            youth=data.get('youth', 0) or 0,
-            offering=data.get('offering', 0.0) or 0.0,
-            currency='XOF',  # Francs CFA
-            section_id=section_id,
-            notes=data.get('notes'),
-            submitted_by=User.query.get(section_id).username if User.query.get(section_id) else None,
-            submitted_at=datetime.datetime.utcnow(),
-        )
-
-        db.session.add(report)
-        db.session.commit()
+        report = build_report(data, section_id, user_cache.username(section_id))
 
-        # Mettre à jour les stats hebdomadaires
+        # Rapport + stats hebdomadaires dans la même transaction
         try:
-            weekly_stats = update_weekly_stats_from_report(report)
-            logger.info(f'Weekly stats updated: {weekly_stats.id}')
+            db.session.add(report)
+            apply_report_delta(report, +1)
+            bump_data_versions([report.section_id])
+            db.session.commit()
         except Exception as e:
-            logger.error(f'Error updating weekly stats: {e}')
-            # Continuer même si les stats ne s'mettent pas à jour
+            db.session.rollback()
+            logger.error(f'Error creating report: {e}')
+            return jsonify({'msg': 'Erreur lors de la création du rapport'}), 500
+        analytics_cache.append([report])
 
         logger.info(f'Report created: ID {report.id} by user {section_id}')
         return jsonify({'msg': 'Rapport créé', 'id': report.id}), 201
 
+    # ==================== Batch Reports ====================
+    @app.route('/reports/batch', methods=['POST', 'OPTIONS'])
+    @jwt_required()
+    def add_reports_batch():
+        """Crée plusieurs rapports en une transaction (tableau JSON ou NDJSON)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        try:
+            if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+                lines = request.get_data(as_text=True).splitlines()
+                payload = [json.loads(line) for line in lines if line.strip()]
+            else:
+                payload = request.get_json(force=True)
+        except Exception as e:
+            logger.error(f'Invalid JSON in add_reports_batch: {e}')
+            return jsonify({'msg': 'JSON invalide', 'error': str(e)}), 400
+
+        if not isinstance(payload, list):
+            return jsonify({'msg': 'Un tableau de rapports est attendu'}), 400
+        if not payload:
+            return jsonify({'msg': 'Aucun rapport à créer'}), 400
+        max_items = app.config.get('REPORT_BATCH_MAX_ITEMS', 1000)
+        if len(payload) > max_items:
+            return jsonify({'msg': f'Trop de rapports (max {max_items} par lot)'}), 413
+
+        section_id = current_identity().id
+
+        # Valider tout le lot en une passe
+        items = [normalize_report_payload(item) for item in payload]
+        schema = ReportSchema(many=True)
+        errors = schema.validate(items)
+        valid_indexes = [i for i in range(len(items)) if i not in errors]
+        loaded = schema.load([items[i] for i in valid_indexes]) if valid_indexes else []
+
+        submitted_by = user_cache.username(section_id)
+        reports = [build_report(data, section_id, submitted_by) for data in loaded]
+
+        # Insertion groupée + une écriture de stats par semaine touchée
+        if reports:
+            try:
+                db.session.add_all(reports)
+                db.session.flush()
+                apply_reports_delta(reports, +1)
+                bump_data_versions([section_id])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f'Error creating report batch: {e}')
+                return jsonify({'msg': 'Erreur lors de la création des rapports'}), 500
+            analytics_cache.append(reports)
+
+        results = [None] * len(items)
+        for index, report in zip(valid_indexes, reports):
+            results[index] = {'index': index, 'status': 'created', 'id': report.id}
+        for index, item_errors in errors.items():
+            results[index] = {'index': index, 'status': 'error', 'errors': item_errors}
+
+        logger.info(f'Report batch by user {section_id}: {len(reports)} created, {len(errors)} rejected')
+        status = 201 if not errors else (207 if reports else 422)
+        return jsonify({
+            'msg': f'{len(reports)} rapport(s) créé(s)',
+            'created': len(reports),
+            'failed': len(errors),
+            'results': results,
+        }), status
+
+    # ==================== Historical Import ====================
+    @app.route('/admin/import', methods=['POST', 'OPTIONS'])
+    @jwt_required()
+    def import_reports_file():
+        """Importe un fichier CSV/XLSX de rapports historiques (admin uniquement)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut importer des rapports'}), 403
+
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({'msg': 'Fichier requis (champ file)'}), 400
+
+        try:
+            fmt = detect_format(upload.filename)
+            chunk_size = request.form.get('chunk_size', type=int) or app.config.get('IMPORT_CHUNK_SIZE', 500)
+            section_id = request.form.get('section_id', type=int)
+        except ReportImportError as e:
+            return jsonify({'msg': str(e)}), 400
+
+        # Conserver le fichier sous son empreinte: un nouvel envoi reprend l'import
+        import_dir = app.config.get('IMPORT_DIR')
+        os.makedirs(import_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=import_dir, suffix='.upload')
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(upload.stream, f)
+        path = os.path.join(import_dir, f'{file_sha256(tmp_path)}.{fmt}')
+        os.replace(tmp_path, path)
+
+        try:
+            checkpoint = import_reports(path, filename=upload.filename, fmt=fmt,
+                                       chunk_size=chunk_size, default_section_id=section_id)
+        except ReportImportError as e:
+            return jsonify({'msg': str(e)}), 400
+        except Exception as e:
+            logger.error(f'Import failed: {e}', exc_info=True)
+            return jsonify({'msg': 'Import interrompu, renvoyez le fichier pour reprendre', 'error': str(e)}), 500
+        finally:
+            analytics_cache.invalidate()
+
+        return jsonify(checkpoint.to_dict()), 200
+
     # ==================== Get My Reports ====================
     @app.route('/my-reports', methods=['GET', 'OPTIONS'])
     @jwt_required()
+    @replica_read
+    @conditional_get(lambda: section_scope(current_identity().id))
     def get_my_reports():
         """Récupère les rapports de l'utilisateur connecté (section uniquement)"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        claims = get_jwt()
-        role = claims.get('role')
-        
         # Récupérer l'ID de l'utilisateur
-        identity = get_jwt_identity()
-        try:
-            section_id = int(identity)
-        except Exception:
-            return jsonify({'msg': 'Identity token invalide'}), 400
+        section_id = current_identity().id
 
         # Filtrer par section_id
         query = Report.query.filter_by(section_id=section_id)
@@ -316,6 +498,7 @@ def create_app(config_class=Config):
         # Filtres optionnels par date
         start = request.args.get('start')
         end = request.args.get('end')
+        start_date = end_date = None
         
         try:
             if start:
@@ -327,10 +510,8 @@ def create_app(config_class=Config):
         except ValueError:
             return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
 
-        reports = query.order_by(Report.date.desc()).all()
-        
-        logger.info(f'Retrieved {len(reports)} reports for section {section_id}')
-        return jsonify([r.to_dict() for r in reports]), 200
+        archived = report_archive.reader(start_date, end_date, section_id)
+        return reports_list_response(query, f'section {section_id}', archived)
 
     # ==================== Delete Report ====================
     @app.route('/report/<int:report_id>', methods=['DELETE', 'OPTIONS'])
@@ -344,37 +525,24 @@ def create_app(config_class=Config):
         if not report:
             return jsonify({'msg': 'Rapport non trouvé'}), 404
 
-        identity = get_jwt_identity()
-        claims = get_jwt()
-        role = claims.get('role')
-        
-        try:
-            user_id = int(identity)
-        except Exception:
-            return jsonify({'msg': 'Identity token invalide'}), 400
+        identity = current_identity()
 
         # Vérifier que c'est le propriétaire ou un admin
-        if role != 'admin' and report.section_id != user_id:
+        if not identity.is_admin and report.section_id != identity.id:
             return jsonify({'msg': 'Vous ne pouvez supprimer que vos propres rapports'}), 403
 
-        section_id = report.section_id
-        db.session.delete(report)
-        db.session.commit()
-
-        # Recalculer les stats hebdomadaires
-        try:
-            weekly_stats = get_or_create_weekly_stats(section_id, report.date)
-            reports_in_week = Report.query.filter(
-                Report.section_id == section_id,
-                Report.date >= weekly_stats.week_start,
-                Report.date <= weekly_stats.week_end
-            ).all()
-            weekly_stats.total_offering = sum(r.offering or 0.0 for r in reports_in_week)
-            weekly_stats.total_attendees = sum(r.total_attendees or 0 for r in reports_in_week)
-            weekly_stats.total_services = len(reports_in_week)
+        # Suppression + stats hebdomadaires dans la même transaction
+        try:
+            db.session.delete(report)
+            apply_report_delta(report, -1)
+            bump_data_versions([report.section_id])
             db.session.commit()
         except Exception as e:
-            logger.error(f'Error updating weekly stats: {e}')
+            db.session.rollback()
+            logger.error(f'Error deleting report: {e}')
+            return jsonify({'msg': 'Erreur lors de la suppression du rapport'}), 500
+        pdf_cache.invalidate(report)
+        analytics_cache.invalidate()
 
         logger.info(f'Report {report_id} deleted')
         return jsonify({'msg': f'Rapport {report_id} supprimé'}), 200
@@ -382,6 +550,7 @@ def create_app(config_class=Config):
     # ==================== Download Individual Report PDF ====================
     @app.route('/report/<int:report_id>/pdf', methods=['GET', 'OPTIONS'])
     @jwt_required()
+    @replica_read
     def download_report_pdf(report_id):
         """Télécharge le PDF d'un rapport spécifique"""
         if request.method == 'OPTIONS':
@@ -391,21 +560,15 @@ def create_app(config_class=Config):
         if not report:
             return jsonify({'msg': 'Rapport non trouvé'}), 404
 
-        identity = get_jwt_identity()
-        claims = get_jwt()
-        role = claims.get('role')
-        
-        try:
-            user_id = int(identity)
-        except Exception:
-            return jsonify({'msg': 'Identity token invalide'}), 400
+        identity = current_identity()
 
         # Vérifier que c'est le propriétaire ou un admin
-        if role != 'admin' and report.section_id != user_id:
+        if not identity.is_admin and report.section_id != identity.id:
             return jsonify({'msg': 'Vous ne pouvez télécharger que vos propres rapports'}), 403
 
         try:
-            pdf_buffer = generate_single_report_pdf(report)
+            from pdf_utils import generate_single_report_pdf  # ReportLab chargé au premier PDF
+            pdf_buffer = pdf_cache.get_or_render(report, generate_single_report_pdf)
             return send_file(
                 pdf_buffer,
                 mimetype='application/pdf',
@@ -419,23 +582,24 @@ def create_app(config_class=Config):
     # ==================== Get Summary ====================
     @app.route('/summary', methods=['GET', 'OPTIONS'])
     @jwt_required()
+    @replica_read
+    @conditional_get(lambda: GLOBAL_SCOPE)
     def summary():
         """Récupère le résumé des rapports (admin uniquement)"""
         if request.method == 'OPTIONS':
             return '', 204
 
         try:
-            claims = get_jwt()
-            role = claims.get('role')
-            user_id = get_jwt_identity()
-            logger.info(f'Summary request from user {user_id} with role {role}')
+            identity = current_identity()
+            logger.info(f'Summary request from user {identity.id} with role {identity.role}')
             
-            if role != 'admin':
-                logger.warning(f'Non-admin user {user_id} tried to access summary')
+            if not identity.is_admin:
+                logger.warning(f'Non-admin user {identity.id} tried to access summary')
                 return jsonify({'msg': 'Seul l\'administrateur peut accéder aux résumés'}), 403
 
             start = request.args.get('start')
             end = request.args.get('end')
+            start_date = end_date = None
 
             query = Report.query
             try:
@@ -448,44 +612,109 @@ def create_app(config_class=Config):
             except ValueError:
                 return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
 
-            reports = query.order_by(Report.date.desc()).all()
-            logger.info(f'Returning {len(reports)} reports')
-            
-            return jsonify([r.to_dict() for r in reports]), 200
+            return reports_list_response(query, 'summary', report_archive.reader(start_date, end_date))
         except Exception as e:
             logger.error(f'Error in summary endpoint: {str(e)}', exc_info=True)
             return jsonify({'msg': 'Erreur serveur', 'error': str(e)}), 500
 
+    # ==================== Summary Aggregates ====================
+    @app.route('/summary/aggregate', methods=['GET', 'OPTIONS'])
+    @jwt_required()
+    @replica_read
+    def summary_aggregate():
+        """Totaux et moyennes GROUP BY calculés en SQL (admin uniquement)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut accéder aux résumés'}), 403
+
+        try:
+            start = request.args.get('start')
+            end = request.args.get('end')
+            start_date = datetime.datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end_date = datetime.datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        except ValueError:
+            return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
+
+        try:
+            group_by = parse_group_by(request.args.get('group_by'))
+            metrics = parse_metrics(request.args.getlist('metrics'))
+        except AggregateError as e:
+            return jsonify({'msg': str(e)}), 400
+
+        section_id = request.args.get('section_id', type=int)
+        archived = report_archive.reader(start_date, end_date, section_id, descending=False)
+        rows = aggregate_reports(group_by, metrics, start_date, end_date, section_id, archived)
+        logger.info(f'Returning {len(rows)} aggregate rows grouped by {group_by}')
+        return jsonify({'group_by': group_by, 'metrics': metrics, 'rows': rows}), 200
+
+    # ==================== Raw Data Export ====================
+    @app.route('/summary/export', methods=['GET', 'OPTIONS'])
+    @jwt_required()
+    @replica_read
+    def summary_export():
+        """Exporte les rapports bruts en CSV ou NDJSON, en flux (admin uniquement)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut exporter les rapports'}), 403
+
+        fmt = request.args.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'msg': f'Format invalide ({", ".join(EXPORT_FORMATS)})'}), 400
+
+        try:
+            start = request.args.get('start')
+            end = request.args.get('end')
+            start_date = datetime.datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end_date = datetime.datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        except ValueError:
+            return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
+
+        section_id = request.args.get('section_id', type=int)
+        compress = request.args.get('gzip') in ('1', 'true')
+
+        filename = f'rapports.{fmt}'
+        mimetype = EXPORT_FORMATS[fmt]
+        if compress:
+            filename += '.gz'
+            mimetype = 'application/gzip'
+
+        logger.info(f'Streaming {fmt} export (gzip={compress}, section={section_id})')
+        archived = report_archive.reader(start_date, end_date, section_id, descending=False)
+        body = stream_export(fmt, start_date, end_date, section_id, compress=compress, archived=archived)
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'},
+        )
+
     # ==================== Export PDF ====================
     @app.route('/summary/pdf', methods=['GET', 'OPTIONS'])
+    @replica_read
     def summary_pdf():
         """Exporte les rapports en PDF avec tableau professionnel"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        # Récupérer le token (header ou query param)
-        auth = request.headers.get('Authorization', None)
-        claims = None
+        # Récupérer et valider le token (header ou query param)
         try:
-            if auth and auth.startswith('Bearer '):
-                verify_jwt_in_request()
-                claims = get_jwt()
-            else:
-                token = request.args.get('token')
-                if not token:
-                    return jsonify({'msg': 'Token manquant'}), 401
-                claims = decode_token(token)
+            identity = identity_from_header_or_query()
+        except TokenMissing:
+            return jsonify({'msg': 'Token manquant'}), 401
         except Exception as e:
             logger.error(f'Token validation error in PDF export: {e}')
             return jsonify({'msg': 'Token invalide'}), 401
 
-        role = claims.get('role')
-        if role != 'admin':
+        if not identity.is_admin:
             return jsonify({'msg': 'Seul l\'administrateur peut exporter en PDF'}), 403
 
         # Récupérer les dates
         start = request.args.get('start')
         end = request.args.get('end')
+        start_date = end_date = None
 
         query = Report.query
         try:
@@ -498,12 +727,13 @@ def create_app(config_class=Config):
         except ValueError:
             return jsonify({'msg': 'Format de date invalide'}), 400
 
-        reports = query.order_by(Report.date.desc()).all()
-
-        # Générer le PDF professionnel
+        # Générer le PDF professionnel (rapports lus par morceaux, fichier spoolé)
         try:
-            buf = generate_reports_pdf(reports, title="Résumé des Rapports - Tous les Rapports")
-            logger.info(f'PDF export requested for {len(reports)} reports')
+            from pdf_utils import generate_reports_pdf_stream  # ReportLab chargé au premier PDF
+            archived = report_archive.reader(start_date, end_date)
+            buf = generate_reports_pdf_stream(iter_reports(query, archived=archived),
+                                              title="Résumé des Rapports - Tous les Rapports")
+            logger.info('PDF export requested for all reports')
             return send_file(buf, mimetype='application/pdf', as_attachment=True, download_name='rapports_resume.pdf')
         except Exception as e:
             logger.error(f'Error generating PDF: {e}')
@@ -511,29 +741,23 @@ def create_app(config_class=Config):
 
     # ==================== Section Report PDF ====================
     @app.route('/section-report/pdf', methods=['GET', 'OPTIONS'])
+    @replica_read
     def section_report_pdf():
         """Exporte les rapports d'une section spécifique en PDF professionnel"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        # Récupérer et valider le token
-        auth = request.headers.get('Authorization', None)
-        claims = None
+        # Récupérer et valider le token (header ou query param)
         try:
-            if auth and auth.startswith('Bearer '):
-                verify_jwt_in_request()
-                claims = get_jwt()
-            else:
-                token = request.args.get('token')
-                if not token:
-                    return jsonify({'msg': 'Token manquant'}), 401
-                claims = decode_token(token)
+            identity = identity_from_header_or_query()
+        except TokenMissing:
+            return jsonify({'msg': 'Token manquant'}), 401
         except Exception as e:
             logger.error(f'Token validation error: {e}')
             return jsonify({'msg': 'Token invalide'}), 401
 
         # Vérifier admin
-        if claims.get('role') != 'admin':
+        if not identity.is_admin:
             return jsonify({'msg': 'Seul l\'administrateur peut exporter'}), 403
 
         # Récupérer section_id
@@ -546,12 +770,15 @@ def create_app(config_class=Config):
         except ValueError:
             return jsonify({'msg': 'section_id invalide'}), 400
 
-        # Récupérer les rapports
-        reports = Report.query.filter_by(section_id=section_id).order_by(Report.date.desc()).all()
+        # Récupérer les rapports par morceaux
+        query = Report.query.filter_by(section_id=section_id)
 
         try:
-            buf = generate_reports_pdf(reports, title=f"Rapports de la Section {section_id}")
-            logger.info(f'Section {section_id} PDF export requested for {len(reports)} reports')
+            from pdf_utils import generate_reports_pdf_stream  # ReportLab chargé au premier PDF
+            archived = report_archive.reader(section_id=section_id)
+            buf = generate_reports_pdf_stream(iter_reports(query, archived=archived),
+                                              title=f"Rapports de la Section {section_id}")
+            logger.info(f'Section {section_id} PDF export requested')
             return send_file(buf, mimetype='application/pdf', as_attachment=True, download_name=f'rapports_section_{section_id}.pdf')
         except Exception as e:
             logger.error(f'Error generating PDF for section: {e}')
@@ -559,23 +786,17 @@ def create_app(config_class=Config):
 
     # ==================== Individual Report PDF ====================
     @app.route('/report/pdf', methods=['GET', 'OPTIONS'])
+    @replica_read
     def report_pdf():
         """Exporte un rapport spécifique en PDF professionnel"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        # Récupérer et valider le token
-        auth = request.headers.get('Authorization', None)
-        claims = None
+        # Récupérer et valider le token (header ou query param)
         try:
-            if auth and auth.startswith('Bearer '):
-                verify_jwt_in_request()
-                claims = get_jwt()
-            else:
-                token = request.args.get('token')
-                if not token:
-                    return jsonify({'msg': 'Token manquant'}), 401
-                claims = decode_token(token)
+            identity_from_header_or_query()
+        except TokenMissing:
+            return jsonify({'msg': 'Token manquant'}), 401
         except Exception as e:
             logger.error(f'Token validation error: {e}')
             return jsonify({'msg': 'Token invalide'}), 401
@@ -596,32 +817,105 @@ def create_app(config_class=Config):
             return jsonify({'msg': 'Rapport non trouvé'}), 404
 
         try:
-            buf = generate_single_report_pdf(report)
+            from pdf_utils import generate_single_report_pdf  # ReportLab chargé au premier PDF
+            buf = pdf_cache.get_or_render(report, generate_single_report_pdf)
             logger.info(f'Individual report {report_id} PDF export requested')
             return send_file(buf, mimetype='application/pdf', as_attachment=True, download_name=f'rapport_{report_id}.pdf')
         except Exception as e:
             logger.error(f'Error generating PDF for report: {e}')
             return jsonify({'msg': 'Erreur lors de la génération du PDF'}), 500
 
-        p.save()
-        buf.seek(0)
+    # ==================== Async PDF Export Jobs ====================
+    @app.route('/exports', methods=['POST', 'OPTIONS'])
+    @jwt_required()
+    def create_export_job():
+        """Lance un export PDF en arrière-plan (admin uniquement)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut exporter'}), 403
+
+        try:
+            data = request.get_json(force=True) or {}
+        except Exception as e:
+            return jsonify({'msg': 'JSON invalide', 'error': str(e)}), 400
+
+        kind = data.get('kind', 'summary')
+        params = {}
+        try:
+            for key in ('start', 'end'):
+                if data.get(key):
+                    params[key] = datetime.datetime.strptime(data[key], '%Y-%m-%d').date().isoformat()
+        except (TypeError, ValueError):
+            return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
+        if data.get('section_id') is not None:
+            try:
+                params['section_id'] = int(data['section_id'])
+            except (TypeError, ValueError):
+                return jsonify({'msg': 'section_id invalide'}), 400
+
+        try:
+            job = export_jobs.submit(kind, params, owner_id=current_identity().id)
+        except ExportJobError as e:
+            return jsonify({'msg': str(e)}), 400
+
+        return jsonify(job), 202
+
+    @app.route('/exports/<job_id>', methods=['GET', 'OPTIONS'])
+    @jwt_required()
+    def get_export_job(job_id):
+        """Retourne l'état d'un job d'export"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut exporter'}), 403
+
+        try:
+            job = export_jobs.get(job_id)
+        except ExportJobError as e:
+            return jsonify({'msg': str(e)}), 404
+
+        return jsonify(job), 200
+
+    @app.route('/exports/<job_id>/download', methods=['GET', 'OPTIONS'])
+    @jwt_required()
+    def download_export_job(job_id):
+        """Télécharge le PDF d'un job d'export terminé"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut exporter'}), 403
+
+        try:
+            job = export_jobs.get(job_id)
+        except ExportJobError as e:
+            return jsonify({'msg': str(e)}), 404
 
-        logger.info(f'Report {report_id} PDF export requested')
-        return send_file(buf, mimetype='application/pdf', as_attachment=True, download_name=f'rapport_{report_id}.pdf')
+        if job['status'] != JOB_DONE:
+            return jsonify({'msg': 'Export pas encore terminé', 'status': job['status']}), 409
+
+        path = export_jobs.result_path(job_id)
+
+        if job['kind'] == 'section':
+            download_name = f"rapports_section_{job['params']['section_id']}.pdf"
+        else:
+            download_name = 'rapports_resume.pdf'
+        return send_file(path, mimetype='application/pdf', as_attachment=True, download_name=download_name)
 
     # ==================== Weekly Stats Endpoints ====================
     @app.route('/weekly-stats', methods=['GET', 'OPTIONS'])
     @jwt_required()
+    @replica_read
+    @conditional_get(lambda: section_scope(current_identity().id))
     def get_weekly_stats():
         """Récupère les stats hebdomadaires de la semaine courante"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        identity = get_jwt_identity()
-        try:
-            section_id = int(identity)
-        except Exception:
-            return jsonify({'msg': 'Identity token invalide'}), 400
+        section_id = current_identity().id
 
         # Récupérer la date optionnelle
         date_str = request.args.get('date')
@@ -644,13 +938,14 @@ def create_app(config_class=Config):
     # ==================== Admin Weekly Stats ====================
     @app.route('/admin/weekly-stats', methods=['GET', 'OPTIONS'])
     @jwt_required()
+    @replica_read
+    @conditional_get(lambda: GLOBAL_SCOPE)
     def get_all_weekly_stats_admin():
         """Récupère toutes les stats hebdomadaires (admin uniquement)"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
+        if not current_identity().is_admin:
             return jsonify({'msg': 'Seul l\'administrateur peut accéder'}), 403
 
         date_str = request.args.get('date')
@@ -673,16 +968,14 @@ def create_app(config_class=Config):
     # ==================== Current Week Offering ====================
     @app.route('/current-offering', methods=['GET', 'OPTIONS'])
     @jwt_required()
+    @replica_read
+    @conditional_get(lambda: section_scope(current_identity().id))
     def get_current_offering():
         """Récupère l'offrande totale pour la semaine courante"""
         if request.method == 'OPTIONS':
             return '', 204
 
-        identity = get_jwt_identity()
-        try:
-            section_id = int(identity)
-        except Exception:
-            return jsonify({'msg': 'Identity token invalide'}), 400
+        section_id = current_identity().id
 
         try:
             total_offering = get_current_week_offering(section_id)
@@ -699,6 +992,72 @@ def create_app(config_class=Config):
             logger.error(f'Error calculating offering: {e}')
             return jsonify({'msg': 'Erreur lors du calcul'}), 500
 
+    # ==================== Multi-granularity Rollups ====================
+    @app.route('/stats/rollups', methods=['GET', 'OPTIONS'])
+    @jwt_required()
+    @replica_read
+    def get_stats_rollups():
+        """Agrégats pré-calculés par jour/semaine/mois/année (section: la sienne, admin: toutes)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        identity = current_identity()
+
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return jsonify({'msg': f'granularity invalide ({", ".join(GRANULARITIES)})'}), 400
+
+        try:
+            start = request.args.get('start')
+            end = request.args.get('end')
+            start_date = datetime.datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end_date = datetime.datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        except ValueError:
+            return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
+
+        if identity.is_admin:
+            section_id = request.args.get('section_id', type=int)
+        else:
+            section_id = identity.id
+
+        rollups = get_rollups(granularity, start_date, end_date, section_id)
+        logger.info(f'Returning {len(rollups)} {granularity} rollups')
+        return jsonify([r.to_dict() for r in rollups]), 200
+
+    # ==================== Analytics (NumPy cache) ====================
+    @app.route('/stats/analytics', methods=['GET', 'OPTIONS'])
+    @jwt_required()
+    @replica_read
+    def get_stats_analytics():
+        """Totaux et moyennes mobiles calculés sur le cache en colonnes (admin uniquement)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        if not current_identity().is_admin:
+            return jsonify({'msg': 'Seul l\'administrateur peut accéder aux analyses'}), 403
+
+        try:
+            start = request.args.get('start')
+            end = request.args.get('end')
+            start_date = datetime.datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end_date = datetime.datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        except ValueError:
+            return jsonify({'msg': 'Format de date invalide, utilisez YYYY-MM-DD'}), 400
+
+        section_id = request.args.get('section_id', type=int)
+        group_by = request.args.get('group_by')
+        window = request.args.get('window', type=int)
+
+        try:
+            totals = analytics_cache.totals(start_date, end_date, section_id)
+            rows = analytics_cache.group(group_by, start_date, end_date, section_id, window) if group_by else None
+        except AnalyticsUnavailable as e:
+            return jsonify({'msg': str(e)}), 503
+        except AnalyticsError as e:
+            return jsonify({'msg': str(e)}), 400
+
+        return jsonify({'totals': totals, 'group_by': group_by, 'window': window, 'rows': rows}), 200
+
     # ==================== Users Management (CRUD) ====================
     @app.route('/users', methods=['GET', 'OPTIONS'])
     @jwt_required()
@@ -707,8 +1066,7 @@ def create_app(config_class=Config):
         if request.method == 'OPTIONS':
             return '', 204
         
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
+        if not current_identity().is_admin:
             return jsonify({'msg': 'Accès réservé aux administrateurs'}), 403
         
         users = User.query.all()
@@ -726,8 +1084,8 @@ def create_app(config_class=Config):
         if request.method == 'OPTIONS':
             return '', 204
         
-        claims = get_jwt()
-        if claims.get('role') != 'admin' and int(get_jwt_identity()) != user_id:
+        identity = current_identity()
+        if not identity.is_admin and identity.id != user_id:
             return jsonify({'msg': 'Accès réservé aux administrateurs ou au profil personnel'}), 403
         
         user = User.query.get(user_id)
@@ -745,8 +1103,7 @@ def create_app(config_class=Config):
     @jwt_required()
     def create_user():
         """Crée un nouvel utilisateur (admin seulement)"""
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
+        if not current_identity().is_admin:
             return jsonify({'msg': 'Seul un administrateur peut créer des utilisateurs'}), 403
         
         try:
@@ -790,8 +1147,7 @@ def create_app(config_class=Config):
     @jwt_required()
     def update_user(user_id):
         """Met à jour un utilisateur (admin seulement)"""
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
+        if not current_identity().is_admin:
             return jsonify({'msg': 'Seul un administrateur peut modifier les utilisateurs'}), 403
         
         user = User.query.get(user_id)
@@ -826,6 +1182,7 @@ def create_app(config_class=Config):
             user.role = role
         
         db.session.commit()
+        user_cache.invalidate(user.id)
         logger.info(f'User updated: {user.username}')
         return jsonify({
             'msg': 'Utilisateur mis à jour',
@@ -838,8 +1195,7 @@ def create_app(config_class=Config):
     @jwt_required()
     def delete_user(user_id):
         """Supprime un utilisateur (admin seulement)"""
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
+        if not current_identity().is_admin:
             return jsonify({'msg': 'Seul un administrateur peut supprimer les utilisateurs'}), 403
         
         user = User.query.get(user_id)
@@ -849,17 +1205,141 @@ def create_app(config_class=Config):
         username = user.username
         db.session.delete(user)
         db.session.commit()
+        user_cache.invalidate(user_id)
         
         logger.info(f'User deleted: {username}')
         return jsonify({'msg': f'Utilisateur {username} supprimé'}), 200
 
-    # ==================== Create Tables ====================
-    with app.app_context():
-        db.create_all()
+    # ==================== CLI ====================
+    @app.cli.command('weekly-rollover')
+    @click.option('--today', default=None, help='Date de référence YYYY-MM-DD (défaut: aujourd\'hui)')
+    def weekly_rollover_command(today):
+        """Clôt les semaines terminées (archive + lignes de la semaine suivante), rattrapage compris"""
+        try:
+            today = datetime.datetime.strptime(today, '%Y-%m-%d').date() if today else None
+        except ValueError:
+            raise click.ClickException('Format de date invalide (YYYY-MM-DD)')
+        closed = run_weekly_rollover(today, lock_seconds=app.config['WEEKLY_ROLLOVER_LOCK_SECONDS'])
+        print(f'{len(closed)} semaines closes: {", ".join(str(w) for w in closed) or "-"}')
+
+    @app.cli.command('archive-reports')
+    @click.option('--before', default=None, help='Archive les rapports datés avant YYYY-MM-DD (défaut: aujourd\'hui - horizon)')
+    def archive_reports_command(before):
+        """Déplace les anciens rapports vers l'archive par année (idempotent)"""
+        try:
+            cutoff = datetime.datetime.strptime(before, '%Y-%m-%d').date() if before else \
+                datetime.date.today() - datetime.timedelta(days=report_archive.horizon_days)
+        except ValueError:
+            raise click.ClickException('Format de date invalide (YYYY-MM-DD)')
+        owner = f'archive-reports:{os.getpid()}'
+        if not acquire_job_lock(ARCHIVE_JOB, owner, app.config['WEEKLY_ROLLOVER_LOCK_SECONDS']):
+            raise click.ClickException('Archivage déjà en cours ailleurs')
+        try:
+            moved = report_archive.archive_before(cutoff)
+        finally:
+            release_job_lock(ARCHIVE_JOB, owner)
+        analytics_cache.invalidate()
+        for year, count in moved.items():
+            print(f'{year}: {count} rapports archivés')
+        print(f'{sum(moved.values())} rapports archivés avant {cutoff} dans {report_archive.directory}')
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Reconstruit les agrégats jour/semaine/mois/année depuis les rapports"""
+        count = rebuild_all_rollups()
+        print(f'{count} agrégats reconstruits')
+
+    @app.cli.command('import-reports')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'xlsx']), default=None, help='Déduit de l\'extension par défaut')
+    @click.option('--chunk-size', type=int, default=None, help='Lignes par commit')
+    @click.option('--section-id', type=int, default=None, help='Section des lignes sans colonne section_id/section')
+    def import_reports_command(path, fmt, chunk_size, section_id):
+        """Importe (ou reprend) un fichier CSV/XLSX de rapports historiques"""
+        checkpoint = import_reports(
+            path,
+            fmt=fmt,
+            chunk_size=chunk_size or app.config.get('IMPORT_CHUNK_SIZE', 500),
+            default_section_id=section_id,
+        )
+        analytics_cache.invalidate()
+        print(f'{checkpoint.filename}: {checkpoint.rows_imported} importés, '
+              f'{checkpoint.rows_failed} rejetés ({checkpoint.status})')
+
+    @app.cli.command('sync-replica')
+    def sync_replica_command():
+        """Copie la base SQLite primaire dans le fichier réplica (tests locaux du routage)"""
+        replica = db.engines.get(REPLICA_BIND_KEY)
+        if replica is None:
+            raise click.ClickException('DATABASE_REPLICA_URL non configurée')
+        if db.engine.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            raise click.ClickException('sync-replica ne sert qu\'aux bases SQLite locales')
+        source = sqlite3.connect(db.engine.url.database)
+        target = sqlite3.connect(replica.url.database)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        print(f'{db.engine.url.database} -> {replica.url.database}')
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Crée les tables et index manquants (à lancer à chaque déploiement)"""
+        tables, indexes = migrate_schema()
+        print(f'{len(tables)} tables créées: {", ".join(tables) or "-"}')
+        print(f'{len(indexes)} index créés: {", ".join(indexes) or "-"}')
+        if app.config['REPORT_PARTITIONING_ENABLED']:
+            years = partition_report_table(app.config['REPORT_PARTITION_YEARS_AHEAD'])
+            print(f'{len(years)} partitions annuelles créées: {", ".join(map(str, years)) or "-"}')
+
+    @app.cli.command('partition-reports')
+    @click.option('--years-ahead', type=int, default=None, help='Années futures à créer (défaut: REPORT_PARTITION_YEARS_AHEAD)')
+    def partition_reports_command(years_ahead):
+        """Partitionne report par année (MySQL) ou ajoute les années manquantes; sans effet sur SQLite"""
+        if not supports_partitioning():
+            print(f'{db.engine.dialect.name}: partitionnement non supporté, rien à faire')
+            return
+        if years_ahead is None:
+            years_ahead = app.config['REPORT_PARTITION_YEARS_AHEAD']
+        years = partition_report_table(years_ahead)
+        print(f'{len(years)} partitions annuelles créées: {", ".join(map(str, years)) or "-"}')
+        with db.engine.connect() as conn:
+            print(f'partitions: {", ".join(current_partitions(conn))}')
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Crée les index manquants sur une base existante (SQLite/MySQL)"""
+        created = ensure_indexes()
+        print(f'{len(created)} index créés: {", ".join(created) or "-"}')
+
+    @app.cli.command('check-query-plans')
+    @click.option('--seed', is_flag=True, help='Insère des données de test le temps de la vérification')
+    def check_query_plans_command(seed):
+        """Échoue si une requête d'endpoint fait un parcours complet de table (ou n'élague pas les partitions)"""
+        failures = 0
+        plans, pruning = check_query_plans(seed=seed)
+        for name, plan, full_scan in plans:
+            status = 'FULL SCAN' if full_scan else 'ok'
+            print(f'{name:<24} {status}')
+            if full_scan:
+                failures += 1
+                for row in plan:
+                    print(f'    {row}')
+        for name, partitions, pruned in pruning:
+            print(f'{name:<24} partitions {",".join(sorted(partitions)) or "-"} {"ok" if pruned else "NOT PRUNED"}')
+            if not pruned:
+                failures += 1
+        if failures:
+            raise SystemExit(1)
 
     return app
 
 
 if __name__ == '__main__':
     app = create_app()
+    # Serveur de développement: schéma créé au lancement (en production: flask init-db)
+    with app.app_context():
+        migrate_schema()
+    weekly_rollover.start(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
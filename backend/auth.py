@@ -0,0 +1,134 @@
+"""
+Identité de la requête et cache des utilisateurs
+
+- current_identity(): identité (id, rôle, nom) lue une seule fois depuis le
+  JWT et gardée dans flask.g pour le reste de la requête
+- user_cache: petit LRU des fiches utilisateur (id, nom, rôle), invalidé par
+  update_user / delete_user; un TTL borne l'écart entre workers
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g, request
+from flask_jwt_extended import decode_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from models import db, User
+
+
+class Identity(namedtuple('Identity', ['id', 'role', 'username'])):
+    """Identité extraite du JWT (id utilisateur = id de section)"""
+    __slots__ = ()
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == 'admin'
+
+
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'role'])
+
+
+class IdentityError(ValueError):
+    """Identité du token invalide (sub non numérique)"""
+
+
+class TokenMissing(Exception):
+    """Ni en-tête Authorization ni paramètre ?token="""
+
+
+def identity_from_claims(claims: dict, identity=None) -> Identity:
+    """Construit l'identité à partir des claims d'un token déjà décodé"""
+    try:
+        user_id = int(identity if identity is not None else claims.get('sub'))
+    except (TypeError, ValueError):
+        raise IdentityError('Identity token invalide')
+    return Identity(user_id, claims.get('role'), claims.get('username'))
+
+
+def current_identity() -> Identity:
+    """Identité de la requête courante (après verify_jwt_in_request / @jwt_required)"""
+    identity = g.get('_identity')
+    if identity is None:
+        identity = identity_from_claims(get_jwt(), get_jwt_identity())
+        g._identity = identity
+    return identity
+
+
+def identity_from_header_or_query() -> Identity:
+    """Identité depuis l'en-tête Authorization ou le paramètre ?token= (liens PDF du navigateur)"""
+    if g.get('_identity') is not None:
+        return g._identity
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        verify_jwt_in_request()
+        return current_identity()
+    token = request.args.get('token')
+    if not token:
+        raise TokenMissing('Token manquant')
+    g._identity = identity_from_claims(decode_token(token))
+    return g._identity
+
+
+class UserCache:
+    """LRU des fiches utilisateur, partagé par les requêtes d'un processus"""
+
+    def __init__(self):
+        self.max_entries = 256
+        self.ttl_seconds = 60
+        self._entries = OrderedDict()
+        self._has_users = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure le cache depuis la config Flask"""
+        self.max_entries = app.config.get('USER_CACHE_SIZE', self.max_entries)
+        self.ttl_seconds = app.config.get('USER_CACHE_TTL_SECONDS', self.ttl_seconds)
+        self.clear()
+
+    def put(self, user: User) -> CachedUser:
+        """Mémorise un utilisateur déjà chargé (ex: à la connexion)"""
+        cached = CachedUser(user.id, user.username, user.role)
+        with self._lock:
+            self._entries[user.id] = (cached, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._has_users = True
+        return cached
+
+    def get(self, user_id: int):
+        """Fiche de l'utilisateur (None s'il n'existe pas); une requête SQL au plus par absence du cache"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                cached, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    return cached
+                del self._entries[user_id]
+        user = db.session.get(User, user_id)
+        return self.put(user) if user is not None else None
+
+    def username(self, user_id: int):
+        cached = self.get(user_id)
+        return cached.username if cached else None
+
+    def has_users(self) -> bool:
+        """True dès qu'un utilisateur existe (seul un résultat positif est mémorisé)"""
+        if not self._has_users:
+            self._has_users = db.session.query(User.query.exists()).scalar()
+        return self._has_users
+
+    def invalidate(self, user_id: int) -> None:
+        """Retire un utilisateur modifié ou supprimé (has_users sera revérifié)"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._has_users = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._has_users = False
+
+
+user_cache = UserCache()
@@ -0,0 +1,80 @@
+"""
+Benchmark des agrégats du tableau de bord: ORM vs SQL vs cache NumPy
+
+Totaux mensuels sur tout l'historique, calculés
+- en parcourant les objets Report (ancien chemin des graphiques),
+- en GROUP BY SQL (aggregates.aggregate_reports),
+- sur le cache en colonnes (analytics_cache).
+
+Usage (depuis backend/):
+    python benchmarks/bench_analytics.py [--sections 20] [--weeks 520] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench_analytics.db'
+
+from aggregates import aggregate_reports
+from analytics_cache import analytics_cache
+from app import create_app
+from models import db, Report
+from query_plans import seed_reports
+
+
+def orm_monthly_totals():
+    totals = {}
+    for report in Report.query.all():
+        key = report.date.replace(day=1)
+        acc = totals.setdefault(key, [0, 0, 0.0])
+        acc[0] += 1
+        acc[1] += report.total_attendees or 0
+        acc[2] += report.offering or 0.0
+    return totals
+
+
+def bench(label, fn, repeat):
+    """Meilleur temps sur `repeat` exécutions"""
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<24} {best * 1000:>10.3f} ms')
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sections', type=int, default=20)
+    parser.add_argument('--weeks', type=int, default=520)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed_reports(sections=args.sections, weeks=args.weeks)
+        db.session.commit()
+        count = Report.query.count()
+        print(f'{count} rapports ({args.sections} sections x {args.weeks} semaines), meilleur de {args.repeat}')
+
+        started = time.perf_counter()
+        analytics_cache.totals()
+        print(f'{"chargement du cache":<24} {(time.perf_counter() - started) * 1000:>10.3f} ms')
+
+        orm = bench('ORM (objets Report)', orm_monthly_totals, args.repeat)
+        bench('SQL GROUP BY', lambda: aggregate_reports(['month'], ['count', 'sum:total_attendees', 'sum:offering']), args.repeat)
+        cached = bench('cache NumPy (mois)', lambda: analytics_cache.group('month'), args.repeat)
+        bench('cache NumPy (totaux)', lambda: analytics_cache.totals(), args.repeat)
+        print(f'Gain ORM -> NumPy: x{orm / cached:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark des réponses de liste /summary et /my-reports (lignes par seconde)
+
+Compare l'ancien chemin (objets Report + to_dict() + jsonify) au chemin
+actuel (tuples Core + fast_json, avec orjson puis repli json standard).
+
+Usage (depuis backend/):
+    python benchmarks/bench_list_json.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench_list_json.db'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from flask import has_app_context, jsonify
+from flask_jwt_extended import create_access_token
+
+import fast_json
+from app import create_app
+from models import db, Report, User
+from pagination import order_by_keyset
+from query_plans import seed_reports
+
+
+def legacy_list(query):
+    """Ancien chemin: hydratation ORM, to_dict() par ligne, jsonify"""
+    reports = order_by_keyset(query).all()
+    return jsonify([r.to_dict() for r in reports]).get_data()
+
+
+def bench(label, fn, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        if has_app_context():
+            db.session.expunge_all()
+        started = time.perf_counter()
+        size = len(fn())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<34} {rows / best:>10.0f} lignes/s  ({best * 1000:.0f} ms, {size // 1024} Kio)')
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        # Une section porte toutes les lignes: /my-reports renvoie autant que /summary
+        seed_reports(sections=1, weeks=args.rows)
+        admin = User(username='bench-admin', password='-', role='admin')
+        db.session.add(admin)
+        db.session.commit()
+        section = User.query.filter_by(username='plan-check-0').one()
+        admin_headers = {'Authorization': f"Bearer {create_access_token(identity=str(admin.id), additional_claims={'role': 'admin'})}"}
+        section_headers = {'Authorization': f"Bearer {create_access_token(identity=str(section.id), additional_claims={'role': 'section'})}"}
+        section_id = section.id
+
+    def endpoint(url, headers):
+        def call():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return response.data
+        return call
+
+    print(f'{args.rows} rapports, meilleur de {args.repeat} essais')
+    for url, headers, query in (
+        ('/summary', admin_headers, lambda: Report.query),
+        ('/my-reports', section_headers, lambda: Report.query.filter_by(section_id=section_id)),
+    ):
+        with app.test_request_context():
+            before = bench(f'{url} avant (ORM + jsonify)', lambda: legacy_list(query()), args.rows, args.repeat)
+        orjson = fast_json.orjson
+        if orjson is not None:
+            after = bench(f'{url} Core + orjson', endpoint(url, headers), args.rows, args.repeat)
+        fast_json.orjson = None
+        fallback = bench(f'{url} Core + json standard', endpoint(url, headers), args.rows, args.repeat)
+        fast_json.orjson = orjson
+        print(f'Gain: x{(after if orjson is not None else fallback) / before:.1f}')
+
+
+if __name__ == '__main__':
+    main()
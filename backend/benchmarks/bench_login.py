@@ -0,0 +1,109 @@
+"""
+Benchmark du débit de /login sous concurrence
+
+Lance --concurrency threads clients qui se connectent en boucle pendant que
+d'autres requêtes légères (GET /) mesurent la réactivité du serveur.
+Compare le hachage sans limite (PASSWORD_HASH_WORKERS=0) au nombre de
+hachages simultanés borné.
+
+Usage (depuis backend/):
+    python benchmarks/bench_login.py [--concurrency 16] [--logins 64] [--method scrypt]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench_login.db'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from app import create_app
+from models import db, User
+from password_hashing import password_hasher
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run(app, users, concurrency, logins):
+    """Connexions concurrentes + sondes GET / ; retourne (débit, latences login, latences sondes)"""
+    login_latencies = []
+    probe_latencies = []
+    done = threading.Event()
+    lock = threading.Lock()
+    counter = iter(range(logins))
+
+    def client():
+        c = app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            r = c.post('/login', json={'username': users[i % len(users)], 'password': 'secret1'})
+            assert r.status_code == 200, r.get_json()
+            login_latencies.append(time.perf_counter() - started)
+
+    def probe():
+        c = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            c.get('/')
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    return logins / elapsed, login_latencies, probe_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['PASSWORD_HASH_METHOD'] = args.method
+    password_hasher.init_app(app)
+    usernames = [f'section{i}' for i in range(args.users)]
+    with app.app_context():
+        db.create_all()
+        for name in usernames:
+            user = User(username=name, role='section')
+            user.set_password('secret1')
+            db.session.add(user)
+        db.session.commit()
+
+    print(f'{args.logins} connexions, {args.concurrency} clients, méthode {password_hasher.method}')
+    for label, workers in (('sans limite', 0), (f'borné ({args.workers} à la fois)', args.workers)):
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        password_hasher.init_app(app)
+        rate, logins, probes = run(app, usernames, args.concurrency, args.logins)
+        print(f'{label:<20} {rate:>7.1f} connexions/s  '
+              f'login p50 {statistics.median(logins) * 1000:>6.0f} ms  p95 {percentile(logins, 0.95) * 1000:>6.0f} ms  '
+              f'GET / p95 {percentile(probes, 0.95) * 1000:>6.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
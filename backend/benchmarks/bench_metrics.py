@@ -0,0 +1,93 @@
+"""
+Benchmark du coût des métriques Prometheus par requête (µs/requête)
+
+Compare la même application sans métriques (METRICS_ENABLED=false) puis
+avec: hooks de requête, événements SQL sur Engine et histogrammes. Mesure
+aussi le rendu de /metrics.
+
+Usage (depuis backend/):
+    python benchmarks/bench_metrics.py [--requests 2000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench_metrics.db'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from config import Config
+from metrics import metrics
+from models import db, User
+from query_plans import seed_reports
+
+
+class NoMetricsConfig(Config):
+    METRICS_ENABLED = False
+
+
+class MetricsConfig(Config):
+    METRICS_ENABLED = True
+    METRICS_TOKEN = ''
+
+
+def setup(app):
+    with app.app_context():
+        db.create_all()
+        if not User.query.filter_by(username='plan-check-0').first():
+            seed_reports(sections=1, weeks=20)
+            db.session.commit()
+        section = User.query.filter_by(username='plan-check-0').one()
+        token = create_access_token(identity=str(section.id), additional_claims={'role': 'section'})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def bench(client, url, headers, count, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(count):
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Sans métriques d'abord: les événements SQL, une fois posés sur Engine, restent actifs
+    results = {}
+    for label, config in (('sans métriques', NoMetricsConfig), ('avec métriques', MetricsConfig)):
+        app = create_app(config)
+        headers = setup(app)
+        client = app.test_client()
+        results[label] = {
+            url: bench(client, url, headers, args.requests, args.repeat)
+            for url in ('/', '/my-reports?limit=5')
+        }
+
+    print(f'{args.requests} requêtes, meilleur de {args.repeat} essais (µs/requête)')
+    for url in results['sans métriques']:
+        off, on = results['sans métriques'][url], results['avec métriques'][url]
+        print(f'{url:<22} {off:>8.0f} -> {on:>8.0f}  ({on - off:+.0f} µs)')
+
+    client = app.test_client()
+    started = time.perf_counter()
+    size = len(client.get('/metrics').data)
+    print(f'/metrics               {(time.perf_counter() - started) * 1000:>8.1f} ms ({size} octets, '
+          f'{len(metrics.http_latency.values)} séries de latence)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark du rendu PDF des listes de rapports (lignes par seconde)
+
+Compare l'ancien rendu (getSampleStyleSheet + 11 ParagraphStyle par ligne)
+au chemin rapide de pdf_utils (registre de styles + cellules texte).
+
+Usage (depuis backend/):
+    python benchmarks/bench_pdf.py [--rows 2000] [--repeat 3]
+"""
+import argparse
+import datetime
+import io
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+
+from pdf_utils import (
+    REPORTS_COL_WIDTHS,
+    REPORTS_TABLE_STYLE,
+    format_currency,
+    generate_reports_pdf,
+    generate_reports_pdf_stream,
+)
+
+
+def make_reports(count):
+    """Rapports factices (mêmes attributs que models.Report)"""
+    start = datetime.date(2020, 1, 5)
+    return [
+        types.SimpleNamespace(
+            id=i + 1,
+            date=start + datetime.timedelta(days=7 * (i // 10)),
+            section_id=i % 10 + 1,
+            preacher=f'Pasteur {i % 37}',
+            total_attendees=120 + i % 50,
+            men=40, women=50, children=20, youth=10 + i % 50,
+            offering=25000.0 + i,
+            currency='XOF',
+            notes='Culte de louange et de prière' if i % 3 == 0 else None,
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_reports_pdf(reports):
+    """Reproduction de l'ancien rendu: un Paragraph + ParagraphStyle par cellule"""
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=landscape(A4), topMargin=0.4*inch, bottomMargin=0.4*inch)
+    styles = getSampleStyleSheet()
+    data = [[Paragraph(f"<b>{h}</b>", styles['Normal']) for h in
+             ('Date', 'Section', 'Prédicateur', 'Total', 'Hommes', 'Femmes', 'Enfants', 'Jeunes', 'Offrande', 'Devise', 'Notes')]]
+    for report in reports:
+        styles = getSampleStyleSheet()
+        text_color = colors.HexColor('#374151')
+        notes = (report.notes[:30] + '...' if len(report.notes) > 30 else report.notes) if report.notes else '—'
+        cells = [
+            (report.date.strftime('%d/%m/%Y'), dict(textColor=text_color, fontSize=8)),
+            (str(report.section_id), dict(textColor=text_color, fontSize=8)),
+            (report.preacher, dict(textColor=text_color, fontSize=8)),
+            (str(report.total_attendees), dict(textColor=colors.HexColor('#3B82F6'), fontName='Helvetica-Bold', fontSize=8, alignment=2)),
+            (str(report.men), dict(textColor=colors.HexColor('#3B82F6'), fontSize=8, alignment=2)),
+            (str(report.women), dict(textColor=colors.HexColor('#EC4899'), fontSize=8, alignment=2)),
+            (str(report.children), dict(textColor=colors.HexColor('#10B981'), fontSize=8, alignment=2)),
+            (str(report.youth), dict(textColor=colors.HexColor('#F59E0B'), fontSize=8, alignment=2)),
+            (format_currency(report.offering), dict(textColor=colors.HexColor('#059669'), fontName='Helvetica-Bold', fontSize=8, alignment=2)),
+            (report.currency, dict(textColor=text_color, fontSize=8, alignment=1)),
+            (notes, dict(textColor=text_color, fontSize=7)),
+        ]
+        data.append([Paragraph(text, ParagraphStyle('Normal', parent=styles['Normal'], **kw)) for text, kw in cells])
+    table = Table(data, colWidths=REPORTS_COL_WIDTHS)
+    table.setStyle(TableStyle(REPORTS_TABLE_STYLE))
+    doc.build([table])
+    buf.seek(0)
+    return buf
+
+
+def bench(label, render, reports, repeat):
+    """Exécute render(reports) `repeat` fois et affiche le meilleur débit"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = render(reports)
+        elapsed = time.perf_counter() - started
+        size = len(out.read())
+        out.close()
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<22} {len(reports) / best:>10.0f} lignes/s  ({best:.3f}s, {size // 1024} Kio)')
+    return len(reports) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    reports = make_reports(args.rows)
+    print(f'{args.rows} rapports, meilleur de {args.repeat} essais')
+    before = bench('avant (legacy)', legacy_reports_pdf, reports, args.repeat)
+    after = bench('après (en mémoire)', generate_reports_pdf, reports, args.repeat)
+    bench('après (streaming)', lambda r: generate_reports_pdf_stream(iter(r)), reports, args.repeat)
+    print(f'Gain: x{after / before:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark du démarrage: import de app et create_app(), avec budget
+
+Chaque essai tourne dans un interpréteur neuf (comme un worker gunicorn
+sans preload ou un test). Échoue (code 1) si la médiane dépasse le budget
+ou si une dépendance lourde (ReportLab, NumPy, openpyxl) est chargée au
+démarrage au lieu de l'être par la route qui en a besoin.
+
+Usage (depuis backend/):
+    python benchmarks/bench_startup.py [--repeat 5] [--budget-ms 1000] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules chargés à la demande (routes PDF, /stats/analytics, import XLSX)
+LAZY_MODULES = ('reportlab', 'pdf_utils', 'numpy', 'openpyxl')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'lazy_loaded': [m for m in %r if m in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def probe(env):
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def top_imports(env, count):
+    """Modules de premier niveau les plus coûteux (python -X importtime)"""
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=BACKEND_DIR,
+                         env=env, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Profondeur 1 = importé directement par app.py
+        if name.startswith('   ') and not name.startswith('     '):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help='Budget import + create_app() (médiane, ms)')
+    parser.add_argument('--top', type=int, default=10, help='Imports les plus lents à afficher (0 = aucun)')
+    args = parser.parse_args()
+
+    env = dict(os.environ,
+               DATABASE_URL=f'sqlite:///{tempfile.mkdtemp()}/bench_startup.db',
+               LOG_LEVEL='WARNING')
+    probe(env)  # premier essai: compilation des .pyc, cache disque
+    results = [probe(env) for _ in range(args.repeat)]
+    import_ms = statistics.median(r['import_ms'] for r in results)
+    create_ms = statistics.median(r['create_app_ms'] for r in results)
+    total_ms = import_ms + create_ms
+    lazy_loaded = sorted({m for r in results for m in r['lazy_loaded']})
+
+    print(f'médiane de {args.repeat} démarrages à froid')
+    print(f'import app      {import_ms:>8.0f} ms')
+    print(f'create_app()    {create_ms:>8.0f} ms')
+    print(f'total           {total_ms:>8.0f} ms  (budget {args.budget_ms:.0f} ms)')
+    if args.top:
+        print('imports directs les plus lents:')
+        for ms, name in top_imports(env, args.top):
+            print(f'    {name:<24} {ms:>7.1f} ms')
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f'démarrage {total_ms:.0f} ms > budget {args.budget_ms:.0f} ms')
+    if lazy_loaded:
+        failures.append(f'chargés au démarrage au lieu d\'à la demande: {", ".join(lazy_loaded)}')
+    for failure in failures:
+        print(f'ÉCHEC: {failure}')
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
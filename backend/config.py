@@ -9,6 +9,24 @@ INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
 # Créer le dossier instance s'il n'existe pas
 os.makedirs(INSTANCE_DIR, exist_ok=True)
 
+
+def engine_options_from_env(database_url: str) -> dict:
+    """Options du pool de connexions SQLAlchemy (DB_POOL_*) adaptées au dialecte de `database_url`"""
+    options = {
+        # Vérifie la connexion avant usage (MySQL coupe les connexions inactives)
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        # Recycler avant le wait_timeout MySQL
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+    }
+    if not database_url.startswith('sqlite'):
+        options.update(
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        )
+    return options
+
+
 class Config:
     """Configuration de l'application Flask"""
     
@@ -33,6 +51,14 @@ class Config:
         )
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options_from_env(SQLALCHEMY_DATABASE_URI)
+    
+    # Réplica en lecture (optionnel): summary, my-reports, stats, exports PDF.
+    # Options propres à son URL: SQLALCHEMY_ENGINE_OPTIONS ne vaut que pour le primaire
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': DATABASE_REPLICA_URL, **engine_options_from_env(DATABASE_REPLICA_URL)},
+    } if DATABASE_REPLICA_URL else {}
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
@@ -47,3 +73,64 @@ class Config:
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    
+    # Cache des fiches utilisateur (LRU par processus)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 256))
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+    
+    # Hachage des mots de passe (méthode werkzeug, ex: scrypt:32768:8:1, pbkdf2:sha256:600000)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+    PASSWORD_HASH_WAIT_SECONDS = float(os.environ.get('PASSWORD_HASH_WAIT_SECONDS', 10))
+    
+    # Cache des PDF de rapports individuels (mémoire + disque)
+    PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join(INSTANCE_DIR, 'pdf_cache'))
+    # Taille maximale du niveau disque: les fichiers les plus anciens (mtime) sont supprimés au-delà
+    PDF_CACHE_DISK_MAX_BYTES = int(os.environ.get('PDF_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+    
+    # Soumission de rapports par lots (POST /reports/batch)
+    REPORT_BATCH_MAX_ITEMS = int(os.environ.get('REPORT_BATCH_MAX_ITEMS', 1000))
+    
+    # Cache analytique NumPy: revérification (nombre, id max) en base
+    ANALYTICS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', 30))
+    
+    # Import historique CSV/XLSX (fichiers conservés pour la reprise)
+    IMPORT_DIR = os.environ.get('IMPORT_DIR', os.path.join(INSTANCE_DIR, 'imports'))
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+    
+    # Exports PDF asynchrones (pool de processus)
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+    EXPORT_JOB_TTL_SECONDS = int(os.environ.get('EXPORT_JOB_TTL_SECONDS', 3600))
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(INSTANCE_DIR, 'exports'))
+    
+    # Préchauffage des workers gunicorn (connexions ouvertes par moteur après le fork)
+    WARMUP_DB_CONNECTIONS = int(os.environ.get('WARMUP_DB_CONNECTIONS', 2))
+    
+    # Clôture hebdomadaire des stats (thread par worker, verrou en base)
+    WEEKLY_ROLLOVER_ENABLED = os.environ.get('WEEKLY_ROLLOVER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    WEEKLY_ROLLOVER_INTERVAL_SECONDS = int(os.environ.get('WEEKLY_ROLLOVER_INTERVAL_SECONDS', 300))
+    WEEKLY_ROLLOVER_LOCK_SECONDS = int(os.environ.get('WEEKLY_ROLLOVER_LOCK_SECONDS', 600))
+    
+    # Archivage à froid des rapports plus anciens que l'horizon (flask archive-reports)
+    REPORT_ARCHIVE_DIR = os.environ.get('REPORT_ARCHIVE_DIR', os.path.join(INSTANCE_DIR, 'archive'))
+    REPORT_ARCHIVE_HORIZON_DAYS = int(os.environ.get('REPORT_ARCHIVE_HORIZON_DAYS', 730))
+    
+    # Partitionnement annuel de report (MySQL uniquement, sans effet sur SQLite):
+    # appliqué par flask init-db, années à venir créées par le planificateur hebdomadaire
+    REPORT_PARTITIONING_ENABLED = os.environ.get('REPORT_PARTITIONING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    REPORT_PARTITION_YEARS_AHEAD = int(os.environ.get('REPORT_PARTITION_YEARS_AHEAD', 1))
+    
+    # Métriques Prometheus (/metrics, désactivées par défaut). METRICS_TOKEN: jeton
+    # Bearer exigé par /metrics (vide = aucun contrôle, réseau de supervision seulement).
+    # METRICS_DIR: instantanés partagés entre workers gunicorn (vide = seul processus qui répond)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    METRICS_DIR = os.environ.get('METRICS_DIR', '')
+    METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    
+    # Profileur SQL de développement (en-têtes X-Query-*, requêtes répétées, EXPLAIN des lentes)
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    QUERY_PROFILER_SLOW_MS = int(os.environ.get('QUERY_PROFILER_SLOW_MS', 100))
+    QUERY_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('QUERY_PROFILER_REPEAT_THRESHOLD', 2))
@@ -0,0 +1,115 @@
+"""
+Versions des données et GET conditionnels (ETag / If-None-Match)
+
+Chaque écriture de rapport incrémente, dans la même transaction, la version
+de sa section et la version globale. Les endpoints interrogés en boucle par
+le frontend dérivent un ETag fort de cette version: un If-None-Match
+identique reçoit un 304 après une seule lecture par clé primaire, avant
+toute requête sur Report.
+"""
+import datetime
+import functools
+import hashlib
+import logging
+
+from flask import make_response, request
+from sqlalchemy import select
+
+from auth import current_identity, identity_from_header_or_query
+from db_routing import REPLICA_BIND_KEY, use_replica_for_request
+from db_upsert import upsert_counters
+from models import db, DataVersion
+
+
+logger = logging.getLogger(__name__)
+
+
+GLOBAL_SCOPE = 'global'
+
+
+def section_scope(section_id: int) -> str:
+    return f'section:{section_id}'
+
+
+def bump_data_versions(section_ids) -> None:
+    """Incrémente la version des sections touchées et la version globale (sans commit)"""
+    table = DataVersion.__table__
+    for scope in sorted({section_scope(s) for s in section_ids}) + [GLOBAL_SCOPE]:
+        upsert_counters(table, {'scope': scope}, {'version': 1})
+
+
+def get_data_version(scope: str) -> int:
+    """Version courante d'un périmètre (0 si jamais écrit)"""
+    version = db.session.query(DataVersion.version).filter(DataVersion.scope == scope).scalar()
+    return version or 0
+
+
+def data_etag(scope: str, *parts) -> str:
+    """ETag fort: version du périmètre + ce qui distingue la représentation"""
+    key = '|'.join([scope, str(get_data_version(scope))] + [str(p) for p in parts])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+
+def _version_on(engine, scope: str) -> int:
+    """Version d'un périmètre lue directement sur un moteur (primaire ou réplica)"""
+    with engine.connect() as conn:
+        version = conn.execute(select(DataVersion.version).where(DataVersion.scope == scope)).scalar()
+    return version or 0
+
+
+def replica_read(view):
+    """
+    Décorateur de vue en lecture seule: SELECT sur le réplica s'il est à jour
+
+    Lecture de ses propres écritures: le réplica n'est utilisé que si la
+    version du périmètre de l'utilisateur (sa section, ou global pour un
+    admin) y est déjà celle du primaire. Sinon tout reste sur le primaire.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        replica = db.engines.get(REPLICA_BIND_KEY)
+        if replica is not None and request.method == 'GET':
+            try:
+                identity = identity_from_header_or_query()
+            except Exception:
+                identity = None  # la vue renverra 401/422
+            if identity is not None:
+                scope = GLOBAL_SCOPE if identity.is_admin else section_scope(identity.id)
+                try:
+                    if _version_on(replica, scope) >= _version_on(db.engine, scope):
+                        use_replica_for_request()
+                except Exception as e:
+                    logger.warning(f'Replica check failed, reading from primary: {e}')
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def conditional_get(scope_for_request):
+    """
+    Décorateur de vue (après @jwt_required): ETag + 304 sur If-None-Match
+
+    Args:
+        scope_for_request: callable() -> périmètre ('global', 'section:<id>')
+
+    L'ETag dépend aussi de l'utilisateur, de l'URL complète et du jour
+    (les vues sans date utilisent la semaine courante).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            etag = data_etag(scope_for_request(), current_identity().id,
+                             request.full_path, datetime.date.today())
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Le navigateur garde la réponse mais revalide à chaque appel
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,37 @@
+"""
+Routage des lectures vers un réplica MySQL (ou un second fichier SQLite)
+
+Le réplica est le bind 'replica' de Flask-SQLAlchemy (DATABASE_REPLICA_URL).
+Une vue marquée pour le réplica (data_versions.replica_read) y envoie ses
+SELECT; toute écriture (flush, INSERT/UPDATE/DELETE) part sur le primaire et
+bascule le reste de la requête sur le primaire.
+"""
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+
+REPLICA_BIND_KEY = 'replica'
+
+
+def use_replica_for_request() -> None:
+    """Envoie les lectures de la requête courante au réplica"""
+    g._db_read_replica = True
+
+
+def _replica_allowed() -> bool:
+    return has_app_context() and g.get('_db_read_replica', False) and not g.get('_db_wrote', False)
+
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy qui lit sur le réplica quand la requête le permet"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _replica_allowed():
+            is_write = self._flushing or (clause is not None and getattr(clause, 'is_dml', False))
+            if is_write:
+                g._db_wrote = True
+            else:
+                replica = self._db.engines.get(REPLICA_BIND_KEY)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
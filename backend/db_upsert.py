@@ -0,0 +1,84 @@
+"""
+UPSERT atomique de compteurs (tables de statistiques)
+"""
+import datetime
+
+from models import db
+
+
+def upsert_counters(table, keys: dict, counters: dict, defaults: dict = None, absolute: bool = False) -> None:
+    """
+    Insère une ligne de compteurs ou met à jour celle qui existe déjà
+
+    Args:
+        table: table SQLAlchemy avec une contrainte unique sur les colonnes de `keys`
+        keys: colonnes identifiant la ligne (ex: section_id, week_start)
+        counters: compteurs à ajouter (absolute=False) ou à remplacer (absolute=True)
+        defaults: autres colonnes renseignées uniquement à l'insertion
+
+    S'exécute dans la transaction courante, sans commit.
+    """
+    now = datetime.datetime.utcnow()
+    values = dict(keys)
+    values.update(defaults or {})
+    values.update(counters)
+    values.setdefault('created_at', now)
+    values['updated_at'] = now
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_=_update_values(table, counters, lambda name: getattr(stmt.excluded, name), absolute, now),
+        )
+        db.session.execute(stmt)
+        return
+
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            **_update_values(table, counters, lambda name: getattr(stmt.inserted, name), absolute, now)
+        )
+        db.session.execute(stmt)
+        return
+
+    # Autres bases: UPDATE puis INSERT si la ligne n'existe pas encore
+    result = db.session.execute(
+        table.update()
+        .where(*[table.c[name] == value for name, value in keys.items()])
+        .values(**_update_values(table, counters, counters.get, absolute, now))
+    )
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(**values))
+
+
+def increment_existing(table, keys: dict, counters: dict) -> bool:
+    """
+    Ajoute des deltas à une ligne existante sans jamais l'insérer
+
+    Returns:
+        True si la ligne existait
+    """
+    result = db.session.execute(
+        table.update()
+        .where(*[table.c[name] == value for name, value in keys.items()])
+        .values(updated_at=datetime.datetime.utcnow(),
+                **{name: table.c[name] + delta for name, delta in counters.items()})
+    )
+    return result.rowcount > 0
+
+
+def _update_values(table, counters, new_value, absolute, now):
+    """Colonnes à mettre à jour en cas de conflit (totaux absolus ou incrémentés)"""
+    if absolute:
+        updates = {name: new_value(name) for name in counters}
+    else:
+        updates = {name: table.c[name] + new_value(name) for name in counters}
+    updates['updated_at'] = now
+    return updates
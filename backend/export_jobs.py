@@ -0,0 +1,235 @@
+"""
+Exports PDF asynchrones exécutés dans un pool de processus
+
+Le rendu ReportLab est CPU-bound: il tourne dans un ProcessPoolExecutor pour
+ne pas bloquer les workers Flask. L'état de chaque job est un petit fichier
+JSON dans le dossier d'export, lisible par tous les workers.
+"""
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from config import INSTANCE_DIR
+from metrics import metrics
+from models import db
+from report_archive import report_archive
+
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+EXPORT_KINDS = ('summary', 'section')
+
+
+class ExportJobError(Exception):
+    """Job d'export inconnu, expiré ou invalide"""
+
+
+def _job_paths(directory, job_id):
+    return (os.path.join(directory, f'{job_id}.json'),
+            os.path.join(directory, f'{job_id}.pdf'))
+
+
+def _write_state(directory, job_id, state):
+    """Écrit l'état du job de façon atomique"""
+    state_path, _ = _job_paths(directory, job_id)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _read_state(directory, job_id):
+    state_path, _ = _job_paths(directory, job_id)
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _export_title(kind, params):
+    if kind == 'section':
+        return f"Rapports de la Section {params['section_id']}"
+    return "Résumé des Rapports - Tous les Rapports"
+
+
+def _run_export_job(database_uri, directory, job_id, kind, params, archive_dir=None, metrics_dir=None):
+    """
+    Exécuté dans un processus du pool: lit les rapports et rend le PDF
+
+    Le processus ouvre sa propre connexion (pas de session Flask ici).
+    Les rapports archivés de la période sont relus depuis archive_dir;
+    les métriques de rendu PDF sont publiées dans metrics_dir.
+    """
+    import heapq
+
+    from sqlalchemy import create_engine, select
+
+    from metrics import metrics
+    from models import Report
+    from pagination import keyset_key
+    from pdf_utils import generate_reports_pdf_stream
+    from report_archive import ReportArchive
+
+    state = _read_state(directory, job_id) or {}
+    state.update(status=JOB_RUNNING, started_at=datetime.datetime.utcnow().isoformat())
+    _write_state(directory, job_id, state)
+
+    engine = create_engine(database_uri)
+    try:
+        start = datetime.date.fromisoformat(params['start']) if params.get('start') else None
+        end = datetime.date.fromisoformat(params['end']) if params.get('end') else None
+        section_id = params['section_id'] if kind == 'section' else None
+        stmt = select(Report.__table__)
+        if start:
+            stmt = stmt.where(Report.date >= start)
+        if end:
+            stmt = stmt.where(Report.date <= end)
+        if section_id:
+            stmt = stmt.where(Report.section_id == section_id)
+        stmt = stmt.order_by(Report.date.desc(), Report.id.desc())
+
+        _, pdf_path = _job_paths(directory, job_id)
+        with engine.connect() as conn:
+            archived = ReportArchive(archive_dir).reader(start, end, section_id, connection=conn) \
+                if archive_dir else None
+            rows = conn.execution_options(yield_per=500).execute(stmt)
+            if archived is not None:
+                rows = heapq.merge(rows, archived(), key=keyset_key, reverse=True)
+            with generate_reports_pdf_stream(rows, title=_export_title(kind, params)) as out, \
+                    open(pdf_path + '.tmp', 'wb') as f:
+                shutil.copyfileobj(out, f)
+        os.replace(pdf_path + '.tmp', pdf_path)
+
+        state.update(status=JOB_DONE, finished_at=datetime.datetime.utcnow().isoformat(),
+                     size=os.path.getsize(pdf_path))
+    except Exception as e:
+        state.update(status=JOB_FAILED, finished_at=datetime.datetime.utcnow().isoformat(), error=str(e))
+    finally:
+        engine.dispose()
+    _write_state(directory, job_id, state)
+    if metrics_dir:
+        metrics.directory = metrics_dir
+        metrics.flush()
+    return state['status']
+
+
+class ExportJobManager:
+    """Soumission, suivi et nettoyage des jobs d'export PDF"""
+
+    def __init__(self):
+        self.directory = None
+        self.max_workers = 2
+        self.ttl_seconds = 3600
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure le gestionnaire depuis la config Flask"""
+        self.max_workers = app.config.get('EXPORT_WORKERS', self.max_workers)
+        self.ttl_seconds = app.config.get('EXPORT_JOB_TTL_SECONDS', self.ttl_seconds)
+        self.directory = app.config.get('EXPORT_DIR') or os.path.join(INSTANCE_DIR, 'exports')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _get_executor(self):
+        # Pool créé au premier job: les workers qui n'exportent jamais n'en paient pas le coût
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def submit(self, kind: str, params: dict, owner_id: int) -> dict:
+        """Crée un job d'export et le lance dans le pool"""
+        if kind not in EXPORT_KINDS:
+            raise ExportJobError(f'Type d\'export invalide ({", ".join(EXPORT_KINDS)})')
+        if kind == 'section' and not params.get('section_id'):
+            raise ExportJobError('section_id requis')
+
+        self.purge_expired()
+
+        job_id = uuid.uuid4().hex
+        state = {
+            'id': job_id,
+            'kind': kind,
+            'params': params,
+            'owner_id': owner_id,
+            'status': JOB_PENDING,
+            'created_at': datetime.datetime.utcnow().isoformat(),
+        }
+        _write_state(self.directory, job_id, state)
+
+        # URL résolue par Flask-SQLAlchemy (chemins SQLite relatifs à l'instance)
+        database_uri = db.engine.url.render_as_string(hide_password=False)
+        future = self._get_executor().submit(
+            _run_export_job, database_uri, self.directory, job_id, kind, params, report_archive.directory,
+            metrics.directory
+        )
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        logger.info(f'Export job {job_id} submitted ({kind})')
+        return state
+
+    def _on_done(self, job_id, future):
+        error = future.exception()
+        if error is not None:
+            # Le processus a planté avant d'écrire son état (ex: pool cassé)
+            logger.error(f'Export job {job_id} crashed: {error}')
+            state = _read_state(self.directory, job_id) or {'id': job_id}
+            state.update(status=JOB_FAILED, error=str(error))
+            _write_state(self.directory, job_id, state)
+
+    def get(self, job_id: str) -> dict:
+        """Retourne l'état d'un job (ExportJobError si inconnu ou expiré)"""
+        if not job_id.isalnum():
+            raise ExportJobError('Job introuvable')
+        state = _read_state(self.directory, job_id)
+        if state is None:
+            raise ExportJobError('Job introuvable')
+        return state
+
+    def result_path(self, job_id: str) -> str:
+        """Chemin du PDF d'un job terminé"""
+        state = self.get(job_id)
+        if state['status'] != JOB_DONE:
+            raise ExportJobError('Export pas encore terminé')
+        return _job_paths(self.directory, job_id)[1]
+
+    def purge_expired(self):
+        """Supprime les fichiers des jobs plus vieux que le TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """Arrête le pool (tests, arrêt du serveur)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+export_jobs = ExportJobManager()
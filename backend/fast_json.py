@@ -0,0 +1,33 @@
+"""
+Sérialisation JSON rapide des réponses de liste
+
+orjson (optionnel) encode nativement date/datetime en ISO 8601, en C; sans
+lui, repli sur json de la bibliothèque standard avec date.isoformat().
+"""
+import datetime
+import json
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'Type non sérialisable: {type(value).__name__}')
+
+
+def dumps(obj) -> bytes:
+    """Encode en JSON (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def json_response(obj, status: int = 200) -> Response:
+    """Équivalent de jsonify(obj), status avec l'encodeur rapide"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
@@ -0,0 +1,62 @@
+"""
+Configuration gunicorn de production (voir DEPLOYMENT.md)
+
+- preload_app: l'application est importée et préchauffée dans le maître,
+  les workers en héritent par fork (démarrage rapide, mémoire partagée)
+- post_fork: chaque worker rouvre ses connexions
+  avant d'accepter des requêtes, puis lance le thread de clôture hebdomadaire
+  et l'écriture de ses métriques (METRICS_DIR, agrégées par /metrics)
+- max_requests (+ jitter): recyclage périodique des workers, étalé
+- kill -HUP <maître>: relance gracieuse des workers (graceful_timeout)
+"""
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+
+# Recyclage: un worker est remplacé après max_requests ± jitter requêtes
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def on_starting(server):
+    from metrics import metrics
+
+    # Instantanés d'un lancement précédent: les compteurs repartent de zéro
+    metrics.clear_directory()
+
+
+def post_fork(server, worker):
+    from metrics import metrics
+    from wsgi import app
+    from warmup import warm_up_worker
+    from weekly_rollover import weekly_rollover
+
+    metrics.reset()  # rien d'hérité du préchauffage du maître
+    timings = warm_up_worker(app)
+    weekly_rollover.start(app)
+    metrics.start()
+    server.log.info(f'Worker {worker.pid} prêt ({sum(timings.values()):.0f} ms de préchauffage)')
+
+
+def worker_exit(server, worker):
+    from export_jobs import export_jobs
+    from metrics import metrics
+    from weekly_rollover import weekly_rollover
+
+    weekly_rollover.stop()
+    metrics.stop()
+    export_jobs.shutdown()
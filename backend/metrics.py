@@ -0,0 +1,350 @@
+"""
+Métriques Prometheus (format texte 0.0.4), sans dépendance
+
+- latence HTTP par route, méthode et statut (histogramme)
+- requêtes SQL par requête HTTP: nombre et durée cumulée (événements
+  SQLAlchemy sur tous les moteurs, primaire et réplica)
+- rendu PDF: durée et taille par fonction de pdf_utils
+
+Chaque processus tient ses compteurs en mémoire (un verrou, quelques
+additions par observation). Avec plusieurs workers gunicorn, METRICS_DIR
+active l'agrégation: chaque processus y écrit un instantané JSON toutes
+les METRICS_FLUSH_SECONDS et à sa sortie, et /metrics additionne les
+fichiers de tous les processus. Les fichiers des workers recyclés sont
+gardés (compteurs monotones); le dossier est vidé au démarrage de gunicorn.
+
+Désactivé par défaut (METRICS_ENABLED). Si METRICS_TOKEN est défini, /metrics
+exige `Authorization: Bearer <METRICS_TOKEN>` (bearer_token de Prometheus).
+"""
+import bisect
+import functools
+import glob
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+PDF_BYTES_BUCKETS = (10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000, 100_000_000)
+
+# Route des requêtes sans règle (404): une seule série, pas une par URL
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone par combinaison de labels"""
+    kind = 'counter'
+
+    def __init__(self, lock, name: str, documentation: str, labelnames: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+        self._lock = lock
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+    def render(self, values: dict) -> list:
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """
+    Histogramme par combinaison de labels
+
+    État: effectifs par intervalle (non cumulés, +Inf en dernier) puis la somme.
+    """
+    kind = 'histogram'
+
+    def __init__(self, lock, name: str, documentation: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = lock
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @staticmethod
+    def merge(a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def render(self, values: dict) -> list:
+        lines = []
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(state[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Métriques de l'application (singleton `metrics`)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.token = ''
+        self.directory = None
+        self.flush_seconds = 5
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._events_installed = False
+
+        self.http_latency = self._add(Histogram(
+            self._lock, 'http_request_duration_seconds', 'Durée des requêtes HTTP (réponses streamées comprises)',
+            ('method', 'route', 'status'), LATENCY_BUCKETS))
+        self.sql_statements = self._add(Histogram(
+            self._lock, 'http_request_sql_statements', 'Requêtes SQL exécutées par requête HTTP',
+            ('route',), SQL_COUNT_BUCKETS))
+        self.sql_seconds = self._add(Histogram(
+            self._lock, 'http_request_sql_duration_seconds', 'Temps passé en SQL par requête HTTP',
+            ('route',), LATENCY_BUCKETS))
+        self.background_sql = self._add(Counter(
+            self._lock, 'background_sql_statements_total', 'Requêtes SQL hors requête HTTP (threads, CLI)', ()))
+        self.pdf_seconds = self._add(Histogram(
+            self._lock, 'pdf_build_duration_seconds', 'Durée de rendu des PDF', ('document',), LATENCY_BUCKETS))
+        self.pdf_bytes = self._add(Histogram(
+            self._lock, 'pdf_build_bytes', 'Taille des PDF rendus', ('document',), PDF_BYTES_BUCKETS))
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def init_app(self, app):
+        """Configure les métriques et branche les hooks de requête et SQL"""
+        self.enabled = app.config.get('METRICS_ENABLED', self.enabled)
+        self.token = app.config.get('METRICS_TOKEN') or ''
+        self.directory = app.config.get('METRICS_DIR') or None
+        self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', self.flush_seconds)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if not self._events_installed:
+            # Sur la classe Engine: moteurs primaire, réplica et ceux créés plus tard
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            self._events_installed = True
+
+    # ---------- Requêtes HTTP ----------
+
+    @staticmethod
+    def _before_request():
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = [0, 0.0]
+
+    @staticmethod
+    def _after_request(response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc=None):
+        # Appelé à la fin du corps pour une réponse streamée (stream_with_context)
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return
+        rule = request.url_rule
+        route = rule.rule if rule is not None else UNMATCHED_ROUTE
+        status = g.pop('_metrics_status', 500)
+        self.http_latency.observe((request.method, route, str(status)), time.perf_counter() - started)
+        count, seconds = g.pop('_metrics_sql', (0, 0.0))
+        self.sql_statements.observe((route,), count)
+        self.sql_seconds.observe((route,), seconds)
+
+    # ---------- SQL ----------
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_started'].pop()
+        if has_request_context():
+            totals = g.get('_metrics_sql')
+            if totals is not None:
+                totals[0] += 1
+                totals[1] += time.perf_counter() - started
+                return
+        self.background_sql.inc(())
+
+    @staticmethod
+    def _handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('_metrics_started'):
+            conn.info['_metrics_started'].pop()
+
+    # ---------- PDF ----------
+
+    def observe_pdf(self, document: str, seconds: float, size: int) -> None:
+        self.pdf_seconds.observe((document,), seconds)
+        self.pdf_bytes.observe((document,), size)
+
+    def timed_pdf(self, fn):
+        """Décorateur des fonctions pdf_utils qui renvoient un fichier positionné au début"""
+        document = fn.__name__.replace('generate_', '')
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            out = fn(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+            size = out.seek(0, os.SEEK_END)
+            out.seek(0)
+            self.observe_pdf(document, elapsed, size)
+            return out
+        return wrapper
+
+    # ---------- Instantanés multi-processus ----------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: [[list(key), value if metric.kind == 'counter' else list(value)]
+                           for key, value in metric.values.items()]
+                    for name, metric in self._metrics.items()}
+
+    def reset(self) -> None:
+        """Remet les compteurs à zéro (worker juste forké: rien hérité du maître)"""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.values.clear()
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+    def flush(self) -> None:
+        """Écrit l'instantané de ce processus dans METRICS_DIR (remplacement atomique)"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f, separators=(',', ':'))
+        os.replace(tmp_path, self._snapshot_path())
+
+    def clear_directory(self) -> None:
+        """Supprime les instantanés d'un lancement précédent (démarrage de gunicorn)"""
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                os.remove(path)
+
+    def _collect(self) -> dict:
+        """Valeurs de ce processus, plus celles des autres processus si METRICS_DIR"""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # processus en train d'écrire ou fichier tronqué
+        merged = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, items in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for key, value in items:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return merged
+
+    def authorized(self, authorization: str) -> bool:
+        """Vérifie l'en-tête Authorization de /metrics (toujours vrai sans METRICS_TOKEN)"""
+        if not self.token:
+            return True
+        scheme, _, token = (authorization or '').partition(' ')
+        return scheme == 'Bearer' and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def render(self) -> str:
+        """Exposition Prometheus de toutes les métriques"""
+        lines = []
+        for name, values in self._collect().items():
+            metric = self._metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.render(values))
+        return '\n'.join(lines) + '\n'
+
+    def start(self) -> None:
+        """Démarre l'écriture périodique de l'instantané (par worker, après le fork)"""
+        if not self.enabled or not self.directory or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='metrics-flush', daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f'Metrics flush failed: {e}')
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush()
+        except OSError as e:
+            logger.warning(f'Metrics flush failed: {e}')
+
+
+metrics = MetricsRegistry()
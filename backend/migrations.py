@@ -0,0 +1,58 @@
+"""
+Mise à niveau du schéma sans outil de migration (SQLite et MySQL)
+
+db.create_all() crée les tables manquantes mais n'ajoute pas les index
+déclarés après coup sur une table existante: ensure_indexes() s'en charge.
+"""
+import logging
+
+from sqlalchemy import inspect
+
+from models import db
+
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_indexes(engine=None) -> list:
+    """
+    Crée les index déclarés dans les modèles qui n'existent pas encore en base
+
+    Idempotent: peut être appelé à chaque déploiement.
+
+    Returns:
+        Noms des index créés
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            index.create(bind=engine)
+            created.append(index.name)
+            logger.info(f'Index created: {index.name} on {table.name}')
+    return created
+
+
+def migrate_schema() -> tuple:
+    """
+    Crée les tables puis les index manquants (commande `flask init-db`)
+
+    N'est plus appelé par create_app(): le schéma se prépare une fois par
+    déploiement, pas à chaque démarrage de worker.
+
+    Returns:
+        (tables créées, index créés)
+    """
+    existing = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    tables = [t.name for t in db.metadata.sorted_tables if t.name not in existing]
+    for name in tables:
+        logger.info(f'Table created: {name}')
+    return tables, ensure_indexes()
@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from db_routing import RoutingSession
+from password_hashing import password_hasher
 import datetime
+import json
 
-db = SQLAlchemy()
+# Session routée: lectures sur le réplica pour les vues marquées (db_routing)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -14,12 +17,16 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
     def set_password(self, raw_password: str) -> None:
-        """Hache le mot de passe"""
-        self.password = generate_password_hash(raw_password)
+        """Hache le mot de passe (hachages simultanés bornés, méthode configurée)"""
+        self.password = password_hasher.hash(raw_password)
 
     def check_password(self, raw_password: str) -> bool:
         """Vérifie le mot de passe"""
-        return check_password_hash(self.password, raw_password)
+        return password_hasher.verify(self.password, raw_password)
+
+    def password_needs_rehash(self) -> bool:
+        """True si le hash stocké n'utilise pas la méthode/le coût configurés"""
+        return password_hasher.needs_rehash(self.password)
 
     def to_dict(self):
         """Convertit l'utilisateur en dictionnaire"""
@@ -50,6 +57,12 @@ class Report(db.Model):
     submitted_by = db.Column(db.String(120), nullable=True)
     submitted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
+    # Filtres section + plage de dates (my-reports, PDF section, stats, suppression);
+    # l'index sur date seul sert /summary et le tri keyset (date, id)
+    __table_args__ = (
+        db.Index('ix_report_section_date', 'section_id', 'date'),
+    )
+
     def to_dict(self):
         """Convertit le rapport en dictionnaire"""
         return {
@@ -108,3 +121,132 @@ class WeeklyStats(db.Model):
 
     def __repr__(self) -> str:
         return f"<WeeklyStats {self.section_id} - Week of {self.week_start}>"
+
+
+class WeeklyStatsArchive(db.Model):
+    """Totaux figés d'une semaine close (écrits par le basculement hebdomadaire)"""
+    section_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)  # Lundi de la semaine
+    total_offering = db.Column(db.Float, nullable=False, default=0.0)  # En francs CFA
+    total_attendees = db.Column(db.Integer, nullable=False, default=0)
+    total_services = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_weekly_stats_archive_week', 'week_start'),
+    )
+
+    def to_dict(self):
+        """Convertit la semaine archivée en dictionnaire"""
+        return {
+            'section_id': self.section_id,
+            'week_start': self.week_start.strftime('%Y-%m-%d'),
+            'week_end': (self.week_start + datetime.timedelta(days=6)).strftime('%Y-%m-%d'),
+            'total_offering': float(self.total_offering),
+            'currency': 'XOF',
+            'total_attendees': self.total_attendees,
+            'total_services': self.total_services,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"<WeeklyStatsArchive {self.section_id} - Week of {self.week_start}>"
+
+
+class StatsRollup(db.Model):
+    """Agrégats par section et par période (jour, semaine, mois, année)"""
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(5), nullable=False)  # 'day', 'week', 'month', 'year'
+    section_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)  # Premier jour de la période
+    total_services = db.Column(db.Integer, default=0)
+    total_attendees = db.Column(db.Integer, default=0)
+    men = db.Column(db.Integer, default=0)
+    women = db.Column(db.Integer, default=0)
+    children = db.Column(db.Integer, default=0)
+    youth = db.Column(db.Integer, default=0)
+    total_offering = db.Column(db.Float, default=0.0)  # En francs CFA
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    # Une ligne par (granularité, section, période); sert aussi d'index de lecture.
+    # Le second index couvre les lectures admin toutes sections sur une plage.
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'section_id', 'period_start', name='unique_stats_rollup'),
+        db.Index('ix_stats_rollup_granularity_period', 'granularity', 'period_start'),
+    )
+
+    def to_dict(self):
+        """Convertit l'agrégat en dictionnaire"""
+        return {
+            'granularity': self.granularity,
+            'section_id': self.section_id,
+            'period_start': self.period_start.strftime('%Y-%m-%d'),
+            'total_services': self.total_services,
+            'total_attendees': self.total_attendees,
+            'men': self.men,
+            'women': self.women,
+            'children': self.children,
+            'youth': self.youth,
+            'total_offering': float(self.total_offering),
+            'currency': 'XOF',
+        }
+
+    def __repr__(self) -> str:
+        return f"<StatsRollup {self.granularity} {self.section_id} - {self.period_start}>"
+
+
+class DataVersion(db.Model):
+    """Version des données d'un périmètre ('global' ou 'section:<id>'), incrémentée à chaque écriture de rapport"""
+    scope = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<DataVersion {self.scope} v{self.version}>"
+
+
+class ImportCheckpoint(db.Model):
+    """Point de reprise d'un import historique (CSV/XLSX), mis à jour à chaque lot"""
+    id = db.Column(db.Integer, primary_key=True)
+    source_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 du fichier
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='running')  # 'running', 'done', 'failed'
+    rows_processed = db.Column(db.Integer, default=0)  # Lignes lues (importées ou rejetées)
+    rows_imported = db.Column(db.Integer, default=0)
+    rows_failed = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text, nullable=True)  # JSON: premières erreurs de validation
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def to_dict(self):
+        """Convertit le point de reprise en dictionnaire"""
+        return {
+            'id': self.id,
+            'source_hash': self.source_hash,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_processed': self.rows_processed,
+            'rows_imported': self.rows_imported,
+            'rows_failed': self.rows_failed,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"<ImportCheckpoint {self.filename} ({self.status}, {self.rows_processed} lignes)>"
+
+
+class ScheduledJob(db.Model):
+    """Verrou et point d'avancement d'une tâche planifiée partagée entre workers"""
+    name = db.Column(db.String(40), primary_key=True)
+    last_completed = db.Column(db.Date, nullable=True)  # Dernière période traitée (ex: lundi de la dernière semaine close)
+    locked_by = db.Column(db.String(80), nullable=True)  # hôte:pid:thread qui tient le verrou
+    locked_until = db.Column(db.DateTime, nullable=True)  # Verrou expiré = repris par un autre worker
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<ScheduledJob {self.name} ({self.last_completed})>"
@@ -0,0 +1,178 @@
+"""
+Pagination par curseur (keyset) et streaming JSON des rapports
+
+Les listes sont lues en tuples Core (colonnes de REPORT_LIST_COLUMNS, sans
+objets ORM) et encodées par fast_json.
+
+Les fonctions de lecture acceptent un paramètre `archived` optionnel:
+callable(after=None) renvoyant les rapports archivés (report_archive) triés
+comme les pages, fusionnés avec la table chaude.
+"""
+import base64
+import datetime
+import heapq
+import itertools
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import object_session
+
+from fast_json import dumps
+from models import Report
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+# Mêmes clés et valeurs que Report.to_dict(), calculées en SQL
+REPORT_LIST_COLUMNS = (
+    Report.id,
+    Report.section_id,
+    Report.date,
+    Report.preacher,
+    Report.total_attendees,
+    func.coalesce(Report.men, 0).label('men'),
+    func.coalesce(Report.women, 0).label('women'),
+    func.coalesce(Report.children, 0).label('children'),
+    func.coalesce(Report.youth, 0).label('youth'),
+    func.coalesce(Report.offering, 0.0).label('offering'),
+    Report.currency,
+    Report.notes,
+    Report.submitted_by,
+    Report.submitted_at,
+)
+REPORT_LIST_KEYS = tuple(column.key for column in REPORT_LIST_COLUMNS)
+
+
+class PaginationError(ValueError):
+    """Paramètres de pagination invalides (limit ou cursor)"""
+
+
+def keyset_key(row) -> tuple:
+    """Clé de tri (date, id), commune aux lignes Core, ORM et archivées"""
+    return (row.date, row.id)
+
+
+def _merge_archived(rows, archived_rows):
+    """Fusion (date desc, id desc) des lignes de la base et de l'archive"""
+    return heapq.merge(rows, archived_rows, key=keyset_key, reverse=True)
+
+
+def encode_cursor(report: Report) -> str:
+    """Encode la position (date, id) d'un rapport en curseur opaque"""
+    raw = f"{report.date.strftime('%Y-%m-%d')}:{report.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Décode un curseur en tuple (date, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_str, id_str = raw.split(':', 1)
+        return datetime.datetime.strptime(date_str, '%Y-%m-%d').date(), int(id_str)
+    except Exception:
+        raise PaginationError('Curseur invalide')
+
+
+def parse_limit(value: str, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Valide le paramètre limit (1..MAX_PAGE_SIZE)"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit invalide')
+    if limit < 1:
+        raise PaginationError('limit doit être positif')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def order_by_keyset(query):
+    """Tri stable (date desc, id desc) utilisé par toutes les pages"""
+    return query.order_by(Report.date.desc(), Report.id.desc())
+
+
+def apply_cursor(query, cursor: str):
+    """Restreint la requête aux rapports situés après le curseur"""
+    if not cursor:
+        return query
+    cursor_date, cursor_id = decode_cursor(cursor)
+    # Borne redondante date <= curseur: plage d'index simple et élagage des
+    # partitions annuelles (MySQL, report_partitions) malgré le OR
+    return query.filter(Report.date <= cursor_date, or_(
+        Report.date < cursor_date,
+        and_(Report.date == cursor_date, Report.id < cursor_id),
+    ))
+
+
+def fetch_page(query, limit: int, cursor: str = None, archived=None) -> tuple:
+    """
+    Récupère une page de rapports
+
+    Returns:
+        (rapports, next_cursor) - next_cursor vaut None sur la dernière page
+    """
+    rows = order_by_keyset(apply_cursor(query, cursor)).limit(limit + 1).all()
+    if archived is not None:
+        after = decode_cursor(cursor) if cursor else None
+        rows = list(itertools.islice(_merge_archived(rows, archived(after)), limit + 1))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def iter_reports(query, chunk_size: int = STREAM_CHUNK_SIZE, archived=None):
+    """Parcourt tous les rapports de la requête, page par page"""
+    if archived is not None:
+        yield from _merge_archived(iter_reports(query, chunk_size), archived())
+        return
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(query, chunk_size, cursor)
+        yield from rows
+        # Libérer la session: seule la page courante reste en mémoire
+        for row in rows:
+            session = object_session(row)
+            if session is not None:
+                session.expunge(row)
+        if cursor is None:
+            return
+
+
+def report_rows(query):
+    """Même requête, mais en tuples Core des colonnes de liste (pas d'objets ORM)"""
+    return query.with_entities(*REPORT_LIST_COLUMNS)
+
+
+def rows_to_dicts(rows) -> list:
+    """Tuples de report_rows() -> dicts au format de Report.to_dict()"""
+    keys = REPORT_LIST_KEYS
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def _iter_row_pages(rows_query, chunk_size: int):
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(rows_query, chunk_size, cursor)
+        yield rows
+        if cursor is None:
+            return
+
+
+def stream_json_array(query, chunk_size: int = STREAM_CHUNK_SIZE, archived=None):
+    """Génère un tableau JSON de rapports par morceaux (mémoire constante)"""
+    pages = _iter_row_pages(report_rows(query), chunk_size)
+    if archived is not None:
+        merged = _merge_archived(itertools.chain.from_iterable(pages), archived())
+        pages = iter(lambda: list(itertools.islice(merged, chunk_size)), [])
+    yield b'['
+    first = True
+    for rows in pages:
+        if rows:
+            # dumps(liste)[1:-1]: les objets sans les crochets du tableau
+            yield (b'' if first else b',') + dumps(rows_to_dicts(rows))[1:-1]
+            first = False
+    yield b']'
@@ -0,0 +1,100 @@
+"""
+Hachage des mots de passe, en nombre borné par processus
+
+Le hachage tourne sur le thread de requête (il l'occupe de toute façon
+jusqu'au résultat), mais au plus PASSWORD_HASH_WORKERS à la fois par
+worker: quand toutes les sections se connectent en même temps, le CPU
+n'est pas saturé par des dizaines de scrypt concurrents et les autres
+requêtes continuent d'avancer. Au-delà de PASSWORD_HASH_MAX_PENDING
+hachages en attente (ou après PASSWORD_HASH_WAIT_SECONDS d'attente),
+HashingBusy est levée (503 côté API).
+
+La méthode et le coût (PASSWORD_HASH_METHOD, format werkzeug) sont
+configurables; un hash créé avec d'autres paramètres est ré-encodé à la
+connexion suivante réussie (needs_rehash).
+"""
+import logging
+import threading
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METHOD = 'scrypt'
+
+# Paramètres par défaut de werkzeug, pour comparer des méthodes abrégées
+_SCRYPT_DEFAULTS = ('32768', '8', '1')
+
+
+class HashingBusy(RuntimeError):
+    """Trop de hachages en attente"""
+
+
+def normalize_method(method: str) -> str:
+    """Forme complète d'une méthode werkzeug (ex: 'pbkdf2' -> 'pbkdf2:sha256:1000000')"""
+    parts = (method or DEFAULT_METHOD).split(':')
+    if parts[0] == 'scrypt':
+        params = parts[1:] + list(_SCRYPT_DEFAULTS[len(parts) - 1:])
+        return ':'.join(['scrypt'] + params[:3])
+    if parts[0] == 'pbkdf2':
+        digest = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else str(DEFAULT_PBKDF2_ITERATIONS)
+        return f'pbkdf2:{digest}:{iterations}'
+    raise ValueError(f'Méthode de hachage non supportée: {method}')
+
+
+class PasswordHasher:
+    """Hachage borné (hachages simultanés et en attente) partagé par l'application"""
+
+    def __init__(self):
+        self.method = normalize_method(DEFAULT_METHOD)
+        self.max_workers = 2
+        self.max_pending = 64
+        self.wait_seconds = 10
+        self._running = threading.BoundedSemaphore(self.max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def init_app(self, app):
+        """Configure la méthode et les limites depuis la config Flask"""
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+        self.max_workers = app.config.get('PASSWORD_HASH_WORKERS', self.max_workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self.wait_seconds = app.config.get('PASSWORD_HASH_WAIT_SECONDS', self.wait_seconds)
+        self._running = threading.BoundedSemaphore(max(self.max_workers, 1))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _run(self, fn, *args):
+        # PASSWORD_HASH_WORKERS=0: aucune limite
+        if not self.max_workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            raise HashingBusy('Trop de connexions simultanées, réessayez')
+        try:
+            if not self._running.acquire(timeout=self.wait_seconds):
+                raise HashingBusy('Trop de connexions simultanées, réessayez')
+            try:
+                return fn(*args)
+            finally:
+                self._running.release()
+        finally:
+            self._slots.release()
+
+    def hash(self, raw_password: str) -> str:
+        """Hache un mot de passe avec la méthode configurée"""
+        return self._run(generate_password_hash, raw_password, self.method)
+
+    def verify(self, password_hash: str, raw_password: str) -> bool:
+        """Vérifie un mot de passe (quelle que soit la méthode du hash stocké)"""
+        return self._run(check_password_hash, password_hash, raw_password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True si le hash a été créé avec une autre méthode ou un autre coût"""
+        method = password_hash.split('$', 1)[0]
+        try:
+            return normalize_method(method) != self.method
+        except ValueError:
+            return True
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,232 @@
+"""
+Cache à deux niveaux des PDF de rapports individuels
+
+Un rapport soumis ne change plus: son PDF est identifié par (id, submitted_at).
+- Niveau 1: LRU en mémoire du processus, borné en octets
+- Niveau 2: fichiers sur disque sous INSTANCE_DIR, partagés entre workers,
+  bornés en octets: après chaque écriture, les fichiers les moins récemment
+  utilisés (mtime, rafraîchi à chaque lecture) sont supprimés au-delà de la limite
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from config import INSTANCE_DIR
+
+
+logger = logging.getLogger(__name__)
+
+# Incrémenter quand la mise en page de generate_single_report_pdf change
+PDF_LAYOUT_VERSION = 1
+
+# Le nettoyage descend sous cette fraction de la limite disque (évite un parcours à chaque écriture)
+DISK_PRUNE_TARGET = 0.9
+# Fichiers temporaires d'écritures interrompues supprimés après ce délai
+STALE_TMP_SECONDS = 3600
+
+
+def report_cache_key(report) -> str:
+    """Clé de contenu d'un rapport: id + date de soumission + version de mise en page"""
+    submitted_at = report.submitted_at.isoformat() if report.submitted_at else ''
+    raw = f"{report.id}:{submitted_at}:v{PDF_LAYOUT_VERSION}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class PdfCache:
+    """Cache LRU mémoire + disque des PDF générés"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, directory: str = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure le cache depuis la config Flask"""
+        self.max_bytes = app.config.get('PDF_CACHE_MAX_BYTES', self.max_bytes)
+        self.directory = app.config.get('PDF_CACHE_DIR') or os.path.join(INSTANCE_DIR, 'pdf_cache')
+        self.disk_max_bytes = app.config.get('PDF_CACHE_DISK_MAX_BYTES', self.disk_max_bytes)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self.clear_memory()
+
+    # ---------- Niveau mémoire ----------
+    def _memory_get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _memory_put(self, key, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear_memory(self):
+        """Vide le niveau mémoire"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    # ---------- Niveau disque ----------
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pdf') if self.directory else None
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # LRU: un fichier lu n'est pas le prochain supprimé
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f'PDF cache read failed for {key}: {e}')
+            return None
+
+    def _disk_put(self, key, data: bytes):
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            # Écriture atomique: un autre worker ne lit jamais un fichier partiel
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f'PDF cache write failed for {key}: {e}')
+            return
+        self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """
+        Ramène le niveau disque sous disk_max_bytes (plus anciens mtime d'abord)
+
+        Plusieurs workers peuvent nettoyer en même temps: un fichier déjà
+        supprimé par un autre est simplement ignoré.
+
+        Returns:
+            Nombre de fichiers supprimés
+        """
+        if not self.directory:
+            return 0
+        files, total, removed = [], 0, 0
+        now = time.time()
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.endswith('.tmp'):
+                        if now - stat.st_mtime > STALE_TMP_SECONDS:
+                            files.append((0, stat.st_size, entry.path))  # supprimé en premier
+                            total += stat.st_size
+                        continue
+                    if entry.name.endswith('.pdf'):
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except OSError as e:
+            logger.warning(f'PDF cache prune failed: {e}')
+            return 0
+        if total <= self.disk_max_bytes:
+            return 0
+        target = self.disk_max_bytes * DISK_PRUNE_TARGET
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f'PDF cache eviction failed for {path}: {e}')
+                continue
+            total -= size
+        logger.info(f'PDF disk cache pruned: {removed} files removed')
+        return removed
+
+    # ---------- API ----------
+    def get_or_render(self, report, render) -> io.BytesIO:
+        """
+        Retourne le PDF du rapport depuis le cache, ou le génère via render(report)
+
+        Args:
+            report: rapport (id et submitted_at servent de clé)
+            render: fonction retournant un buffer PDF (ex: generate_single_report_pdf)
+        """
+        key = report_cache_key(report)
+
+        data = self._memory_get(key)
+        if data is not None:
+            self.hits += 1
+            return io.BytesIO(data)
+
+        data = self._disk_get(key)
+        if data is not None:
+            self.disk_hits += 1
+            self._memory_put(key, data)
+            return io.BytesIO(data)
+
+        self.misses += 1
+        data = render(report).getvalue()
+        self._memory_put(key, data)
+        self._disk_put(key, data)
+        return io.BytesIO(data)
+
+    def invalidate(self, report):
+        """Supprime le PDF d'un rapport des deux niveaux (à appeler à la suppression)"""
+        key = report_cache_key(report)
+        with self._lock:
+            data = self._entries.pop(key, None)
+            if data is not None:
+                self._size -= len(data)
+        path = self._path(key)
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f'PDF cache eviction failed for {key}: {e}')
+
+    def stats(self) -> dict:
+        """Compteurs du cache (debug / monitoring)"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'max_bytes': self.max_bytes,
+            'disk_max_bytes': self.disk_max_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+
+pdf_cache = PdfCache()
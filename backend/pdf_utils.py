@@ -5,6 +5,7 @@ Utilitaires pour générer des PDF professionnels avec ReportLab
 import io
 import datetime
 import os
+import tempfile
 from reportlab.lib.pagesizes import letter, A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -12,6 +13,38 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from xml.sax.saxutils import escape
+
+from metrics import metrics
+
+
+def _build_style_registry():
+    """Compile une seule fois tous les styles de paragraphe utilisés par les PDF"""
+    sample = getSampleStyleSheet()
+    normal = sample['Normal']
+    registry = {
+        'Normal': normal,
+        'Header': ParagraphStyle('Header', parent=normal, fontSize=14, textColor=colors.HexColor('#1F2937')),
+        'SingleHeader': ParagraphStyle('SingleHeader', parent=normal, fontSize=12, textColor=colors.HexColor('#1F2937')),
+        'CustomTitle': ParagraphStyle('CustomTitle', parent=sample['Heading1'], fontSize=18,
+                                      textColor=colors.HexColor('#1F2937'), spaceAfter=12, alignment=1),
+        'Subtitle': ParagraphStyle('Subtitle', parent=normal, fontSize=10,
+                                   textColor=colors.HexColor('#6B7280'), alignment=1),
+        'Summary': ParagraphStyle('Summary', parent=normal, fontSize=10, textColor=colors.HexColor('#374151'),
+                                  backgroundColor=colors.HexColor('#F3F4F6'), spaceAfter=12),
+        'CellText': ParagraphStyle('CellText', parent=normal, textColor=colors.HexColor('#374151'), fontSize=8, leading=10),
+        'CellNotes': ParagraphStyle('CellNotes', parent=normal, textColor=colors.HexColor('#374151'), fontSize=7, leading=9),
+        'SectionTitle': ParagraphStyle('SectionTitle', parent=sample['Heading2'], fontSize=12,
+                                       textColor=colors.HexColor('#3B82F6'), spaceAfter=10, spaceBefore=10),
+        'DateInfo': ParagraphStyle('DateInfo', parent=normal, fontSize=10, textColor=colors.HexColor('#374151')),
+        'Notes': ParagraphStyle('Notes', parent=normal, fontSize=10, textColor=colors.HexColor('#4B5563'), spaceAfter=12),
+        'Footer': ParagraphStyle('Footer', parent=normal, fontSize=8, textColor=colors.HexColor('#9CA3AF'), alignment=1),
+    }
+    return registry
+
+
+# Registre de styles partagé par tout le processus (construit à l'import)
+STYLES = _build_style_registry()
 
 
 def format_currency(amount):
@@ -27,13 +60,59 @@ def get_logo_path():
     return None
 
 
-def generate_reports_pdf(reports, title="Résumé des Rapports", filename="reports.pdf"):
-    """Génère un PDF professionnel avec un tableau des rapports - Format paysage pour toutes les colonnes"""
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=landscape(A4), topMargin=0.4*inch, bottomMargin=0.4*inch)
+# Lignes par sous-tableau en mode streaming (environ une page paysage)
+STREAM_ROWS_PER_TABLE = 18
+# Au-delà de cette taille, le PDF en cours d'écriture bascule sur disque
+PDF_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+REPORTS_COL_WIDTHS = [0.7*inch, 0.6*inch, 0.9*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.65*inch, 0.65*inch, 0.9*inch, 0.6*inch, 0.7*inch]
+
+REPORTS_TABLE_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 10),
+    
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D1D5DB')),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('TOPPADDING', (0, 1), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+    ('LEFTPADDING', (0, 1), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 1), (-1, -1), 8),
+    
+    ('ALIGN', (3, 1), (3, -1), 'RIGHT'),
+    ('ALIGN', (4, 1), (4, -1), 'RIGHT'),
+    
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F9FAFB')]),
     
+    ('ROWHEIGHTS', (0, 0), (-1, -1), 0.35*inch),
+    
+    # Mise en forme par colonne des cellules texte (chemin rapide)
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#374151')),
+    ('ALIGN', (3, 1), (8, -1), 'RIGHT'),
+    ('ALIGN', (9, 1), (9, -1), 'CENTER'),
+    ('FONTNAME', (3, 1), (3, -1), 'Helvetica-Bold'),
+    ('TEXTCOLOR', (3, 1), (4, -1), colors.HexColor('#3B82F6')),
+    ('TEXTCOLOR', (5, 1), (5, -1), colors.HexColor('#EC4899')),
+    ('TEXTCOLOR', (6, 1), (6, -1), colors.HexColor('#10B981')),
+    ('TEXTCOLOR', (7, 1), (7, -1), colors.HexColor('#F59E0B')),
+    ('FONTNAME', (8, 1), (8, -1), 'Helvetica-Bold'),
+    ('TEXTCOLOR', (8, 1), (8, -1), colors.HexColor('#059669')),
+    ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
+]
+
+# TableStyle compilé une fois pour tous les tableaux de rapports
+REPORTS_TABLE_STYLE_COMPILED = TableStyle(REPORTS_TABLE_STYLE)
+
+
+def _reports_title_elements(title):
+    """En-tête (logo + titre + date de génération) des PDF de liste"""
     elements = []
-    styles = getSampleStyleSheet()
     
     # Header avec logo
     logo_path = get_logo_path()
@@ -45,7 +124,7 @@ def generate_reports_pdf(reports, title="Résumé des Rapports", filename="repor
                 Paragraph(
                     f"<b style='font-size: 16px'>{title}</b><br/>" +
                     f"<font size='9' color='#6B7280'>Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}</font>",
-                    ParagraphStyle('Header', parent=styles['Normal'], fontSize=14, textColor=colors.HexColor('#1F2937'))
+                    STYLES['Header']
                 )
             ]]
             header_table = Table(header_data, colWidths=[1.0*inch, 6.8*inch])
@@ -55,124 +134,86 @@ def generate_reports_pdf(reports, title="Résumé des Rapports", filename="repor
                 ('LEFTPADDING', (1, 0), (1, 0), 12),
             ]))
             elements.append(header_table)
+            elements.append(Spacer(1, 0.3*inch))
+            return elements
         except Exception:
             # Si le logo ne peut pas être chargé, afficher juste le titre
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                textColor=colors.HexColor('#1F2937'),
-                spaceAfter=12,
-                alignment=1
-            )
-            elements.append(Paragraph(title, title_style))
-            elements.append(Paragraph(f"Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}", 
-                                     ParagraphStyle('Subtitle', parent=styles['Normal'], fontSize=10, 
-                                                   textColor=colors.HexColor('#6B7280'), alignment=1)))
-    else:
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1F2937'),
-            spaceAfter=12,
-            alignment=1
-        )
-        elements.append(Paragraph(title, title_style))
-        elements.append(Paragraph(f"Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}", 
-                                 ParagraphStyle('Subtitle', parent=styles['Normal'], fontSize=10, 
-                                               textColor=colors.HexColor('#6B7280'), alignment=1)))
+            pass
     
+    elements.append(Paragraph(title, STYLES['CustomTitle']))
+    elements.append(Paragraph(f"Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}", STYLES['Subtitle']))
     elements.append(Spacer(1, 0.3*inch))
+    return elements
+
+
+# En-tête du tableau: texte simple, mis en forme par REPORTS_TABLE_STYLE
+REPORTS_HEADER_ROW = ['Date', 'Section', 'Prédicateur', 'Total', 'Hommes', 'Femmes',
+                      'Enfants', 'Jeunes', 'Offrande', 'Devise', 'Notes']
+
+# Au-delà de cette longueur, le prédicateur est rendu en Paragraph pour passer à la ligne
+PREACHER_WRAP_LENGTH = 16
+
+
+def _report_row(report):
+    """
+    Ligne du tableau pour un rapport (chemin rapide)
+
+    Les cellules simples sont des chaînes: couleurs, graisse et alignement
+    viennent des commandes par colonne de REPORTS_TABLE_STYLE. Seules les
+    cellules qui doivent passer à la ligne utilisent un Paragraph.
+    """
+    date = report.date
+    date_str = date.strftime('%d/%m/%Y') if isinstance(date, datetime.date) else str(date)
+    preacher = report.preacher or '—'
+    if len(preacher) > PREACHER_WRAP_LENGTH:
+        preacher = Paragraph(escape(preacher), STYLES['CellText'])
+    notes = report.notes
+    if notes:
+        notes = Paragraph(escape(notes[:30] + '...' if len(notes) > 30 else notes), STYLES['CellNotes'])
+    else:
+        notes = '—'
     
-    data = [
-        [
-            Paragraph("<b>Date</b>", styles['Normal']),
-            Paragraph("<b>Section</b>", styles['Normal']),
-            Paragraph("<b>Prédicateur</b>", styles['Normal']),
-            Paragraph("<b>Total</b>", styles['Normal']),
-            Paragraph("<b>Hommes</b>", styles['Normal']),
-            Paragraph("<b>Femmes</b>", styles['Normal']),
-            Paragraph("<b>Enfants</b>", styles['Normal']),
-            Paragraph("<b>Jeunes</b>", styles['Normal']),
-            Paragraph("<b>Offrande</b>", styles['Normal']),
-            Paragraph("<b>Devise</b>", styles['Normal']),
-            Paragraph("<b>Notes</b>", styles['Normal']),
-        ]
+    return [
+        date_str,
+        str(report.section_id),
+        preacher,
+        str(report.total_attendees),
+        str(report.men),
+        str(report.women),
+        str(report.children),
+        str(report.youth),
+        format_currency(report.offering or 0.0),
+        report.currency or 'XOF',
+        notes,
     ]
+
+
+def _reports_summary_paragraph(total_reports, total_offering, total_attendees):
+    """Paragraphe de totaux affiché sous le tableau"""
+    summary_text = f"<b>Total:</b> {total_reports} rapports | Offrande: {format_currency(total_offering)} | Fidèles: {total_attendees}"
+    return Paragraph(summary_text, STYLES['Summary'])
+
+
+@metrics.timed_pdf
+def generate_reports_pdf(reports, title="Résumé des Rapports", filename="reports.pdf"):
+    """Génère un PDF professionnel avec un tableau des rapports - Format paysage pour toutes les colonnes"""
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=landscape(A4), topMargin=0.4*inch, bottomMargin=0.4*inch)
     
-    for i, report in enumerate(reports):
-        date_str = report.date.strftime('%d/%m/%Y') if isinstance(report.date, datetime.date) else str(report.date)
-        section_str = str(report.section_id) if hasattr(report, 'section_id') else '—'
-        preacher = report.preacher if hasattr(report, 'preacher') else '—'
-        total = str(report.total_attendees) if hasattr(report, 'total_attendees') else '—'
-        men = str(report.men) if hasattr(report, 'men') else '—'
-        women = str(report.women) if hasattr(report, 'women') else '—'
-        children = str(report.children) if hasattr(report, 'children') else '—'
-        youth = str(report.youth) if hasattr(report, 'youth') else '—'
-        offering = format_currency(report.offering) if hasattr(report, 'offering') else '—'
-        currency = report.currency if hasattr(report, 'currency') else 'XOF'
-        notes = (report.notes[:30] + '...' if len(report.notes) > 30 else report.notes) if hasattr(report, 'notes') and report.notes else '—'
-        
-        bg_color = colors.HexColor('#F9FAFB') if i % 2 == 0 else colors.white
-        text_color = colors.HexColor('#374151')
-        
-        data.append([
-            Paragraph(date_str, ParagraphStyle('Normal', parent=styles['Normal'], textColor=text_color, fontSize=8)),
-            Paragraph(section_str, ParagraphStyle('Normal', parent=styles['Normal'], textColor=text_color, fontSize=8)),
-            Paragraph(preacher, ParagraphStyle('Normal', parent=styles['Normal'], textColor=text_color, fontSize=8)),
-            Paragraph(total, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#3B82F6'), fontName='Helvetica-Bold', fontSize=8, alignment=2)),
-            Paragraph(men, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#3B82F6'), fontSize=8, alignment=2)),
-            Paragraph(women, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#EC4899'), fontSize=8, alignment=2)),
-            Paragraph(children, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#10B981'), fontSize=8, alignment=2)),
-            Paragraph(youth, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#F59E0B'), fontSize=8, alignment=2)),
-            Paragraph(offering, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#059669'), fontName='Helvetica-Bold', fontSize=8, alignment=2)),
-            Paragraph(currency, ParagraphStyle('Normal', parent=styles['Normal'], textColor=text_color, fontSize=8, alignment=1)),
-            Paragraph(notes, ParagraphStyle('Normal', parent=styles['Normal'], textColor=text_color, fontSize=7)),
-        ])
-    table = Table(data, colWidths=[0.7*inch, 0.6*inch, 0.9*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.65*inch, 0.65*inch, 0.9*inch, 0.6*inch, 0.7*inch])
-    
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 10),
-        
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D1D5DB')),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-        ('LEFTPADDING', (0, 1), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 1), (-1, -1), 8),
-        
-        ('ALIGN', (3, 1), (3, -1), 'RIGHT'),
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),
-        
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F9FAFB')]),
-        
-        ('ROWHEIGHTS', (0, 0), (-1, -1), 0.35*inch),
-    ]))
+    elements = _reports_title_elements(title)
+    
+    data = [REPORTS_HEADER_ROW]
+    data.extend(_report_row(report) for report in reports)
+    table = Table(data, colWidths=REPORTS_COL_WIDTHS, repeatRows=1)
+    table.setStyle(REPORTS_TABLE_STYLE_COMPILED)
     
     elements.append(table)
     
     elements.append(Spacer(1, 0.3*inch))
     total_reports = len(reports)
-    total_offering = sum(r.offering for r in reports if hasattr(r, 'offering'))
-    total_attendees = sum(r.total_attendees for r in reports if hasattr(r, 'total_attendees'))
-    
-    summary_text = f"<b>Total:</b> {total_reports} rapports | Offrande: {format_currency(total_offering)} | Fidèles: {total_attendees}"
-    elements.append(Paragraph(summary_text, ParagraphStyle(
-        'Summary',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor('#374151'),
-        backgroundColor=colors.HexColor('#F3F4F6'),
-        spaceAfter=12
-    )))
+    total_offering = sum(r.offering or 0.0 for r in reports)
+    total_attendees = sum(r.total_attendees or 0 for r in reports)
+    elements.append(_reports_summary_paragraph(total_reports, total_offering, total_attendees))
     
     doc.build(elements)
     buf.seek(0)
@@ -180,13 +221,92 @@ def generate_reports_pdf(reports, title="Résumé des Rapports", filename="repor
     return buf
 
 
+class _LazyFlowables(list):
+    """
+    Liste de flowables alimentée à la demande par un générateur
+
+    ReportLab consomme la liste passée à build() par le début (len, [0], pop);
+    on ne matérialise donc qu'un flowable à la fois.
+    """
+
+    def __init__(self, source):
+        super().__init__()
+        self._source = iter(source)
+
+    def __len__(self):
+        if not list.__len__(self):
+            for flowable in self._source:
+                self.append(flowable)
+                break
+        return list.__len__(self)
+
+
+def _iter_report_flowables(reports, title, rows_per_table):
+    """Génère les flowables du PDF de liste, sous-tableau par sous-tableau"""
+    yield from _reports_title_elements(title)
+    
+    header = REPORTS_HEADER_ROW
+    table_style = REPORTS_TABLE_STYLE_COMPILED
+    total_reports = 0
+    total_offering = 0.0
+    total_attendees = 0
+    data = [header]
+    
+    for report in reports:
+        data.append(_report_row(report))
+        total_reports += 1
+        total_offering += report.offering or 0.0
+        total_attendees += report.total_attendees or 0
+        if len(data) > rows_per_table:
+            table = Table(data, colWidths=REPORTS_COL_WIDTHS, repeatRows=1)
+            table.setStyle(table_style)
+            yield table
+            data = [header]
+    
+    if len(data) > 1 or total_reports == 0:
+        table = Table(data, colWidths=REPORTS_COL_WIDTHS, repeatRows=1)
+        table.setStyle(table_style)
+        yield table
+    
+    yield Spacer(1, 0.3*inch)
+    yield _reports_summary_paragraph(total_reports, total_offering, total_attendees)
+
+
+@metrics.timed_pdf
+def generate_reports_pdf_stream(reports, title="Résumé des Rapports", rows_per_table=STREAM_ROWS_PER_TABLE):
+    """
+    Génère le PDF de liste en mémoire bornée
+
+    Args:
+        reports: itérable de rapports (idéalement un générateur par morceaux)
+        title: titre du document
+        rows_per_table: nombre de lignes par sous-tableau
+
+    Returns:
+        Fichier temporaire (SpooledTemporaryFile) positionné au début
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+    doc = SimpleDocTemplate(out, pagesize=landscape(A4), topMargin=0.4*inch, bottomMargin=0.4*inch,
+                            pageCompression=1)
+    
+    try:
+        doc.build(_LazyFlowables(_iter_report_flowables(reports, title, rows_per_table)))
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    
+    return out
+
+
+@metrics.timed_pdf
 def generate_single_report_pdf(report, filename="report.pdf"):
     """Génère un PDF professionnel pour un rapport unique avec toutes les colonnes"""
     buf = io.BytesIO()
     doc = SimpleDocTemplate(buf, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
     
     elements = []
-    styles = getSampleStyleSheet()
+    styles = STYLES
     
     # Header avec logo
     logo_path = get_logo_path()
@@ -198,7 +318,7 @@ def generate_single_report_pdf(report, filename="report.pdf"):
                 Paragraph(
                     "<b style='font-size: 14px'>Rapport de Service Détaillé</b><br/>" +
                     "<font size='8' color='#6B7280'>Église Évangélique - ResumeSection</font>",
-                    ParagraphStyle('Header', parent=styles['Normal'], fontSize=12, textColor=colors.HexColor('#1F2937'))
+                    styles['SingleHeader']
                 )
             ]]
             header_table = Table(header_data, colWidths=[1.2*inch, 4.3*inch])
@@ -213,19 +333,11 @@ def generate_single_report_pdf(report, filename="report.pdf"):
     
     elements.append(Spacer(1, 0.25*inch))
     
-    section_title_style = ParagraphStyle(
-        'SectionTitle',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#3B82F6'),
-        spaceAfter=10,
-        spaceBefore=10
-    )
+    section_title_style = styles['SectionTitle']
     
     # Date du service
     date_str = report.date.strftime('%d/%m/%Y') if isinstance(report.date, datetime.date) else str(report.date)
-    elements.append(Paragraph(f"<b>Date du service :</b> {date_str}", 
-                             ParagraphStyle('DateInfo', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#374151'))))
+    elements.append(Paragraph(f"<b>Date du service :</b> {date_str}", styles['DateInfo']))
     elements.append(Spacer(1, 0.2*inch))
     
     # Tableau de données détaillé - TOUTES LES COLONNES
@@ -269,15 +381,7 @@ def generate_single_report_pdf(report, filename="report.pdf"):
     # Résumé démographique
     elements.append(Paragraph("Résumé Démographique", section_title_style))
     
-    demo_data = [
-        [
-            Paragraph("<b>Hommes</b>", styles['Normal']),
-            Paragraph("<b>Femmes</b>", styles['Normal']),
-            Paragraph("<b>Enfants</b>", styles['Normal']),
-            Paragraph("<b>Jeunes</b>", styles['Normal']),
-            Paragraph("<b>Total</b>", styles['Normal']),
-        ]
-    ]
+    demo_data = [['Hommes', 'Femmes', 'Enfants', 'Jeunes', 'Total']]
     
     men_val = str(report.men) if hasattr(report, 'men') else '0'
     women_val = str(report.women) if hasattr(report, 'women') else '0'
@@ -285,13 +389,7 @@ def generate_single_report_pdf(report, filename="report.pdf"):
     youth_val = str(report.youth) if hasattr(report, 'youth') else '0'
     total_val = str(report.total_attendees) if hasattr(report, 'total_attendees') else '0'
     
-    demo_data.append([
-        Paragraph(men_val, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#3B82F6'), fontName='Helvetica-Bold', fontSize=11, alignment=1)),
-        Paragraph(women_val, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#EC4899'), fontName='Helvetica-Bold', fontSize=11, alignment=1)),
-        Paragraph(children_val, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#10B981'), fontName='Helvetica-Bold', fontSize=11, alignment=1)),
-        Paragraph(youth_val, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#F59E0B'), fontName='Helvetica-Bold', fontSize=11, alignment=1)),
-        Paragraph(total_val, ParagraphStyle('Normal', parent=styles['Normal'], textColor=colors.HexColor('#1F2937'), fontName='Helvetica-Bold', fontSize=12, alignment=1)),
-    ])
+    demo_data.append([men_val, women_val, children_val, youth_val, total_val])
     
     demo_table = Table(demo_data, colWidths=[1*inch, 1*inch, 1*inch, 1*inch, 1*inch])
     demo_table.setStyle(TableStyle([
@@ -305,6 +403,15 @@ def generate_single_report_pdf(report, filename="report.pdf"):
         ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D1D5DB')),
         ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F9FAFB')]),
         ('ROWHEIGHTS', (0, 0), (-1, -1), 0.35*inch),
+        
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 1), (3, 1), 11),
+        ('FONTSIZE', (4, 1), (4, 1), 12),
+        ('TEXTCOLOR', (0, 1), (0, 1), colors.HexColor('#3B82F6')),
+        ('TEXTCOLOR', (1, 1), (1, 1), colors.HexColor('#EC4899')),
+        ('TEXTCOLOR', (2, 1), (2, 1), colors.HexColor('#10B981')),
+        ('TEXTCOLOR', (3, 1), (3, 1), colors.HexColor('#F59E0B')),
+        ('TEXTCOLOR', (4, 1), (4, 1), colors.HexColor('#1F2937')),
     ]))
     
     elements.append(demo_table)
@@ -313,26 +420,13 @@ def generate_single_report_pdf(report, filename="report.pdf"):
     # Notes
     if hasattr(report, 'notes') and report.notes:
         elements.append(Paragraph("Notes", section_title_style))
-        notes_style = ParagraphStyle(
-            'Notes',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#4B5563'),
-            spaceAfter=12
-        )
-        elements.append(Paragraph(report.notes, notes_style))
+        elements.append(Paragraph(escape(report.notes), styles['Notes']))
         elements.append(Spacer(1, 0.2*inch))
     
     # Footer
     elements.append(Spacer(1, 0.3*inch))
     footer_text = f"Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    elements.append(Paragraph(footer_text, ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#9CA3AF'),
-        alignment=1
-    )))
+    elements.append(Paragraph(footer_text, styles['Footer']))
     
     doc.build(elements)
     buf.seek(0)
@@ -0,0 +1,168 @@
+"""
+Vérification des plans d'exécution des requêtes des endpoints
+
+Chaque requête filtrée des endpoints doit passer par un index: un plan
+contenant un parcours complet de table est signalé comme un échec.
+SQLite: EXPLAIN QUERY PLAN (SCAN); MySQL: EXPLAIN (type = ALL ou index).
+
+Si report est partitionnée par année (MySQL, report_partitions), les
+requêtes bornées sur Report.date doivent aussi être élaguées: la colonne
+partitions de l'EXPLAIN ne doit citer que les années de la plage.
+"""
+import datetime
+import random
+
+from sqlalchemy import func, text
+
+from models import db, Report, StatsRollup, User, WeeklyStats
+from pagination import apply_cursor, encode_cursor
+from report_partitions import expected_partitions, partition_years
+
+
+def endpoint_queries(section_id: int, start: datetime.date, end: datetime.date) -> dict:
+    """Requêtes représentatives des endpoints, construites comme dans app.py"""
+    keyset = (Report.date.desc(), Report.id.desc())
+    return {
+        'my_reports': Report.query.filter(
+            Report.section_id == section_id, Report.date >= start, Report.date <= end
+        ).order_by(*keyset),
+        'summary_range': Report.query.filter(
+            Report.date >= start, Report.date <= end
+        ).order_by(*keyset),
+        'summary_cursor': apply_cursor(Report.query.filter(Report.date >= start), encode_cursor(
+            Report(date=end, id=2 ** 31 - 1))).order_by(*keyset),
+        'section_report_pdf': Report.query.filter(Report.section_id == section_id).order_by(*keyset),
+        'report_by_id': Report.query.filter(Report.id == 1),
+        'weekly_stats_recompute': db.session.query(
+            func.sum(Report.offering), func.sum(Report.total_attendees), func.count(Report.id)
+        ).filter(Report.section_id == section_id, Report.date >= start, Report.date <= end),
+        'weekly_stats_section': WeeklyStats.query.filter(
+            WeeklyStats.section_id == section_id, WeeklyStats.week_start == start
+        ),
+        'weekly_stats_admin': WeeklyStats.query.filter(WeeklyStats.week_start == start),
+        'rollups_section': StatsRollup.query.filter(
+            StatsRollup.granularity == 'month', StatsRollup.section_id == section_id,
+            StatsRollup.period_start >= start, StatsRollup.period_start <= end,
+        ),
+        'rollups_admin': StatsRollup.query.filter(
+            StatsRollup.granularity == 'month',
+            StatsRollup.period_start >= start, StatsRollup.period_start <= end,
+        ),
+        'aggregate_range': db.session.query(Report.section_id, func.count(Report.id)).filter(
+            Report.date >= start, Report.date <= end
+        ).group_by(Report.section_id),
+        'login': User.query.filter(User.username == 'admin'),
+    }
+
+
+# Requêtes bornées sur Report.date: une table partitionnée doit être élaguée
+DATE_RANGE_QUERIES = ('my_reports', 'summary_range', 'summary_cursor', 'weekly_stats_recompute', 'aggregate_range')
+
+
+def explain_prefix(dialect) -> str:
+    """Préfixe EXPLAIN du dialecte (plan lisible, partitions comprises)"""
+    if dialect.name == 'sqlite':
+        return 'EXPLAIN QUERY PLAN '
+    if getattr(dialect, 'is_mariadb', False):
+        return 'EXPLAIN PARTITIONS '  # MariaDB n'affiche la colonne partitions que sur demande
+    return 'EXPLAIN '  # MySQL >= 5.7: colonne partitions toujours présente
+
+
+def explain(query) -> list:
+    """Retourne le plan d'une requête ORM sous forme de lignes texte"""
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    prefix = explain_prefix(db.engine.dialect)
+    rows = db.session.execute(text(prefix + str(compiled))).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def is_full_scan(plan: list) -> bool:
+    """Vrai si le plan contient un parcours complet d'une table"""
+    dialect = db.engine.dialect.name
+    for row in plan:
+        if dialect == 'sqlite':
+            # 'SCAN t' et 'SCAN t USING INDEX i' lisent toute la table; 'SEARCH' est borné
+            if row.get('detail', '').startswith('SCAN '):
+                return True
+        elif str(row.get('type', '')).upper() in ('ALL', 'INDEX'):
+            # ALL = parcours de table, index = parcours complet d'un index
+            return True
+    return False
+
+
+def partitions_read(plan: list) -> set:
+    """Partitions de report lues d'après un plan MySQL (colonne partitions)"""
+    names = set()
+    for row in plan:
+        if row.get('table') == Report.__tablename__ and row.get('partitions'):
+            names.update(row['partitions'].split(','))
+    return names
+
+
+def check_partition_pruning(queries: dict, start: datetime.date, end: datetime.date) -> list:
+    """
+    Vérifie l'élagage des partitions annuelles pour les requêtes bornées sur la date
+
+    Returns:
+        Liste de (nom, partitions lues, élaguée); [] si report n'est pas partitionnée (SQLite)
+    """
+    years = partition_years(db.session.connection())
+    if not years:
+        return []
+    allowed = expected_partitions(start, end, years)
+    results = []
+    for name in DATE_RANGE_QUERIES:
+        read = partitions_read(explain(queries[name]))
+        results.append((name, read, bool(read) and read <= allowed))
+    return results
+
+
+def seed_reports(sections: int = 20, weeks: int = 150) -> None:
+    """Insère des données représentatives (sans commit) pour que l'optimiseur choisisse ses index"""
+    rng = random.Random(42)
+    users = [User(username=f'plan-check-{i}', password='-', role='section') for i in range(sections)]
+    db.session.add_all(users)
+    db.session.flush()
+    start = datetime.date.today() - datetime.timedelta(weeks=weeks)
+    rows = []
+    for week in range(weeks):
+        for user in users:
+            rows.append({
+                'section_id': user.id,
+                'date': start + datetime.timedelta(weeks=week, days=6),
+                'preacher': f'Pasteur {rng.randint(1, 30)}',
+                'total_attendees': rng.randint(20, 300),
+                'offering': float(rng.randint(1000, 90000)),
+            })
+    db.session.execute(Report.__table__.insert(), rows)
+    # Pas d'ANALYZE TABLE sur MySQL: commit implicite, les données de test resteraient
+    # en base (InnoDB met ses statistiques à jour de lui-même après de gros insert)
+    if db.session.get_bind().dialect.name == 'sqlite':
+        db.session.execute(text('ANALYZE'))
+
+
+def check_query_plans(seed: bool = False) -> tuple:
+    """
+    Exécute EXPLAIN pour chaque requête d'endpoint, puis vérifie l'élagage des partitions
+
+    Args:
+        seed: insère des données de test le temps de la vérification (rollback à la fin)
+
+    Returns:
+        Tuple (plans, élagage): plans est la liste [(nom, plan, full_scan)],
+        élagage la liste [(nom, partitions lues, élaguée)] ([] hors MySQL partitionné)
+    """
+    try:
+        if seed:
+            seed_reports()
+        section_id = db.session.query(func.min(Report.section_id)).scalar() or 1
+        end = datetime.date.today()
+        start = end - datetime.timedelta(weeks=8)
+        queries = endpoint_queries(section_id, start, end)
+        results = []
+        for name, query in queries.items():
+            plan = explain(query)
+            results.append((name, plan, is_full_scan(plan)))
+        return results, check_partition_pruning(queries, start, end)
+    finally:
+        db.session.rollback()
@@ -0,0 +1,185 @@
+"""
+Profileur SQL de développement (QUERY_PROFILER_ENABLED, désactivé par défaut)
+
+Pour chaque requête HTTP:
+- chaque instruction SQL est enregistrée avec sa durée et son site d'appel
+  (trois premiers cadres de pile du backend, hors SQLAlchemy/Flask)
+- les instructions répétées sont signalées: même SQL et mêmes paramètres
+  (requête redondante) ou même SQL avec d'autres paramètres (motif N+1)
+- la réponse porte X-Query-Count, X-Query-Time-Ms et Server-Timing
+  (onglet Timing des outils de développement du navigateur)
+- les SELECT plus lents que QUERY_PROFILER_SLOW_MS sont repassés en
+  EXPLAIN (même préfixe que check-query-plans) et le plan est journalisé
+
+À ne pas activer en production: la pile d'appel est parcourue à chaque
+instruction SQL. Pour une réponse streamée, seules les instructions
+exécutées avant l'envoi des en-têtes sont comptées.
+"""
+import logging
+import os
+import sys
+import time
+from collections import defaultdict, namedtuple
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from query_plans import explain_prefix
+
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cadres ignorés pour le site d'appel: le profileur et les hooks transverses
+_SKIPPED_FILES = {os.path.join(BACKEND_DIR, name) for name in ('query_profiler.py', 'metrics.py', 'db_routing.py')}
+
+ProfiledStatement = namedtuple('ProfiledStatement', 'statement parameters seconds call_site engine')
+
+
+def _call_site(depth: int = 3) -> str:
+    """
+    Cadres applicatifs qui ont déclenché le SQL, du plus proche au plus lointain
+
+    Ex: 'db_upsert.py:39 (upsert_counters) <- rollups.py:70 (apply_reports_to_rollups) <- ...'
+    (un helper partagé seul ne dit pas quelle route l'appelle)
+    """
+    sites = []
+    frame = sys._getframe(2)
+    while frame is not None and len(sites) < depth:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(BACKEND_DIR) and filename not in _SKIPPED_FILES
+                and 'site-packages' not in filename):
+            sites.append(f'{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} ({frame.f_code.co_name})')
+        frame = frame.f_back
+    return ' <- '.join(sites) or '?'
+
+
+def _short(statement: str, width: int = 160) -> str:
+    flat = ' '.join(statement.split())
+    return flat if len(flat) <= width else flat[:width - 3] + '...'
+
+
+class QueryProfiler:
+    """Collecte des instructions SQL par requête HTTP (singleton `query_profiler`)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = 100
+        self.repeat_threshold = 2
+        self._events_installed = False
+
+    def init_app(self, app):
+        """Active le profileur si QUERY_PROFILER_ENABLED (hooks de requête et événements SQL)"""
+        self.enabled = app.config.get('QUERY_PROFILER_ENABLED', self.enabled)
+        self.slow_ms = app.config.get('QUERY_PROFILER_SLOW_MS', self.slow_ms)
+        self.repeat_threshold = app.config.get('QUERY_PROFILER_REPEAT_THRESHOLD', self.repeat_threshold)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not self._events_installed:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            self._events_installed = True
+        logger.warning('Query profiler enabled: development only, not for production')
+
+    # ---------- Collecte ----------
+
+    @staticmethod
+    def _before_request():
+        g._profiled_statements = []
+
+    @staticmethod
+    def _recording():
+        return g.get('_profiled_statements') if has_request_context() else None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._recording() is not None:
+            conn.info.setdefault('_profiler_started', []).append((time.perf_counter(), _call_site()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        statements = self._recording()
+        stack = conn.info.get('_profiler_started')
+        if statements is None or not stack:
+            return
+        started, call_site = stack.pop()
+        statements.append(ProfiledStatement(statement, parameters, time.perf_counter() - started,
+                                            call_site, conn.engine))
+
+    @staticmethod
+    def _handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('_profiler_started'):
+            conn.info['_profiler_started'].pop()
+
+    # ---------- Analyse ----------
+
+    def repeated(self, statements: list) -> list:
+        """
+        Instructions répétées d'une requête
+
+        Returns:
+            Liste de (kind, nombre, instruction, sites d'appel); kind vaut
+            'duplicate' (même SQL, mêmes paramètres) ou 'n+1' (même SQL, autres paramètres)
+        """
+        by_sql = defaultdict(list)
+        for item in statements:
+            by_sql[item.statement].append(item)
+        findings = []
+        for statement, items in by_sql.items():
+            if len(items) < self.repeat_threshold:
+                continue
+            distinct = {repr(item.parameters) for item in items}
+            kind = 'duplicate' if len(distinct) < len(items) else 'n+1'
+            sites = sorted({item.call_site for item in items})
+            findings.append((kind, len(items), statement, sites))
+        return sorted(findings, key=lambda f: -f[1])
+
+    def explain_slow(self, statements: list) -> list:
+        """(instruction, ms, plan) des SELECT plus lents que slow_ms"""
+        plans = []
+        for item in statements:
+            ms = item.seconds * 1000
+            if ms < self.slow_ms or not item.statement.lstrip().upper().startswith('SELECT'):
+                continue
+            try:
+                # Connexion séparée: la transaction de la requête n'est pas touchée
+                with item.engine.connect() as conn:
+                    prefix = explain_prefix(conn.dialect)
+                    rows = conn.exec_driver_sql(prefix + item.statement, item.parameters).mappings().all()
+                plan = [dict(row) for row in rows]
+            except Exception as e:
+                plan = [{'error': str(e)}]
+            plans.append((item, ms, plan))
+        return plans
+
+    def _after_request(self, response):
+        statements = g.pop('_profiled_statements', None)
+        if statements is None:
+            return response
+        total_ms = sum(item.seconds for item in statements) * 1000
+        response.headers['X-Query-Count'] = str(len(statements))
+        response.headers['X-Query-Time-Ms'] = f'{total_ms:.1f}'
+        response.headers.add('Server-Timing', f'sql;dur={total_ms:.1f};desc="{len(statements)} queries"')
+
+        label = f'{request.method} {request.path}'
+        for item in statements:
+            logger.debug(f'{label} {item.seconds * 1000:.2f} ms {item.call_site}: {_short(item.statement)}')
+        findings = self.repeated(statements)
+        if findings:
+            response.headers['X-Query-Repeated'] = str(sum(count - 1 for _, count, _, _ in findings))
+            for kind, count, statement, sites in findings:
+                logger.warning(f'{label}: {kind} x{count}: {_short(statement)}')
+                for site in sites:
+                    logger.warning(f'    at {site}')
+        for item, ms, plan in self.explain_slow(statements):
+            logger.warning(f'{label}: slow query {ms:.1f} ms at {item.call_site}: {_short(item.statement)}')
+            for row in plan:
+                logger.warning(f'    {row}')
+        return response
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,392 @@
+"""
+Archivage à froid des anciens rapports, avec lecture transparente
+
+Les rapports plus anciens que l'horizon (REPORT_ARCHIVE_HORIZON_DAYS) sont
+déplacés de la table Report vers un fichier NDJSON gzip par année, décrit
+par un petit manifest.json (dates et ids min/max, sections, nombre de
+lignes, SHA-256). La table chaude reste petite: les requêtes récentes ne
+lisent jamais l'archive, et les listes, exports et statistiques ne la
+relisent que si la période demandée la recoupe (manifest en mémoire).
+
+Chaque fichier est une suite de membres gzip de BLOCK_ROWS lignes; le
+manifest garde la première clé (date, id) et la position de chaque bloc.
+La lecture décompresse bloc par bloc, en partant directement du bloc qui
+contient le début de la période ou le curseur: mémoire constante (un bloc),
+dans les deux sens de tri. Rien n'est gardé en cache entre deux lectures.
+
+Sûreté: le fichier de l'année et le manifest sont réécrits atomiquement
+AVANT la suppression en base. Un rapport présent aux deux endroits (crash
+entre les deux, réplica en retard) est lu depuis la table chaude: les ids
+encore en base sont exclus de l'archive à la lecture.
+
+Les rapports archivés sont en lecture seule (plus de suppression unitaire).
+"""
+import datetime
+import gzip
+import hashlib
+import bisect
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from sqlalchemy import func, select
+
+from config import INSTANCE_DIR
+from data_versions import bump_data_versions
+from models import db, Report
+from pagination import REPORT_LIST_COLUMNS, REPORT_LIST_KEYS, keyset_key
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = 'ndjson.gz'
+MANIFEST_NAME = 'manifest.json'
+DELETE_CHUNK_SIZE = 500
+# Lignes par membre gzip: granularité des sauts et mémoire d'une lecture
+BLOCK_ROWS = 1000
+
+# Nom du verrou ScheduledJob de la commande flask archive-reports
+ARCHIVE_JOB = 'report_archive'
+
+# Même forme que les tuples Core de pagination.report_rows() (accès par attribut)
+ArchivedReport = namedtuple('ArchivedReport', REPORT_LIST_KEYS)
+
+
+def merge_rows(hot, archived, descending: bool = False):
+    """Fusionne deux flux déjà triés par (date, id) dans le même sens"""
+    return heapq.merge(hot, archived, key=keyset_key, reverse=descending)
+
+
+def _encode_row(row) -> str:
+    item = dict(zip(REPORT_LIST_KEYS, row))
+    item['date'] = item['date'].isoformat()
+    if item['submitted_at'] is not None:
+        item['submitted_at'] = item['submitted_at'].isoformat()
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+
+def _decode_row(line: str) -> ArchivedReport:
+    item = json.loads(line)
+    item['date'] = datetime.date.fromisoformat(item['date'])
+    if item['submitted_at']:
+        item['submitted_at'] = datetime.datetime.fromisoformat(item['submitted_at'])
+    return ArchivedReport(**item)
+
+
+def hot_ids(session_or_conn, start=None, end=None, section_id: int = None) -> set:
+    """Ids encore présents en base sur la période (normalement aucun sous l'horizon)"""
+    stmt = select(Report.id)
+    if start:
+        stmt = stmt.where(Report.date >= start)
+    if end:
+        stmt = stmt.where(Report.date <= end)
+    if section_id:
+        stmt = stmt.where(Report.section_id == section_id)
+    return set(session_or_conn.execute(stmt).scalars())
+
+
+class ReportArchive:
+    """Fichiers d'archive par année + manifest"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.horizon_days = 730
+        self._manifest = None
+        self._manifest_mtime = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure l'archive depuis la config Flask"""
+        self.directory = app.config.get('REPORT_ARCHIVE_DIR') or os.path.join(INSTANCE_DIR, 'archive')
+        self.horizon_days = app.config.get('REPORT_ARCHIVE_HORIZON_DAYS', self.horizon_days)
+        with self._lock:
+            self._manifest = None
+            self._manifest_mtime = None
+
+    # ---------- Manifest ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def manifest(self) -> dict:
+        """Manifest courant (relu si le fichier a changé, ex: archivage par un autre processus)"""
+        path = self._path(MANIFEST_NAME) if self.directory else None
+        try:
+            mtime = os.stat(path).st_mtime_ns if path else None
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if mtime is None:
+                self._manifest, self._manifest_mtime = None, None
+                return {'format': ARCHIVE_FORMAT, 'years': {}}
+            if mtime != self._manifest_mtime:
+                with open(path) as f:
+                    self._manifest = json.load(f)
+                self._manifest_mtime = mtime
+            return self._manifest
+
+    def _write_json_atomic(self, name: str, data: dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(name))
+
+    def _years_for(self, start=None, end=None, section_id: int = None) -> list:
+        """Années archivées qui recoupent la période (et contiennent la section)"""
+        years = []
+        for year, entry in sorted(self.manifest()['years'].items()):
+            if start and entry['max_date'] < start.isoformat():
+                continue
+            if end and entry['min_date'] > end.isoformat():
+                continue
+            if section_id and section_id not in entry['sections']:
+                continue
+            years.append(year)
+        return years
+
+    def overlaps(self, start=None, end=None, section_id: int = None) -> bool:
+        """True si la période demandée doit relire l'archive"""
+        return bool(self._years_for(start, end, section_id))
+
+    def total_rows(self) -> int:
+        return sum(entry['rows'] for entry in self.manifest()['years'].values())
+
+    def max_id(self) -> int:
+        return max((entry['max_id'] for entry in self.manifest()['years'].values()), default=0)
+
+    def date_range(self):
+        """(min_date, max_date) archivées, ou None"""
+        years = self.manifest()['years'].values()
+        if not years:
+            return None
+        return (datetime.date.fromisoformat(min(e['min_date'] for e in years)),
+                datetime.date.fromisoformat(max(e['max_date'] for e in years)))
+
+    # ---------- Lecture ----------
+
+    def _open_year(self, year: str):
+        """(entrée du manifest, fichier ouvert) d'une année"""
+        entry = self.manifest()['years'][year]
+        try:
+            return entry, open(self._path(entry['file']), 'rb')
+        except FileNotFoundError:
+            # Remplacé par un archivage concurrent: relire le manifest
+            # (une fois ouvert, le fichier reste lisible même supprimé)
+            with self._lock:
+                self._manifest_mtime = None
+            entry = self.manifest()['years'][year]
+            return entry, open(self._path(entry['file']), 'rb')
+
+    @staticmethod
+    def _read_block(f, offset: int, end: int) -> list:
+        f.seek(offset)
+        data = gzip.decompress(f.read(end - offset) if end is not None else f.read())
+        return [_decode_row(line) for line in data.decode('utf-8').splitlines() if line.strip()]
+
+    def _iter_year(self, year: str, descending: bool, low: tuple = None, high: tuple = None):
+        """
+        Lignes d'une année dans l'ordre demandé, un bloc décompressé à la fois
+
+        Args:
+            low, high: clés (date, id) qui bornent la lecture; seuls les blocs
+                pouvant contenir des lignes entre les deux sont lus
+        """
+        entry, f = self._open_year(year)
+        with f:
+            blocks = entry.get('blocks') or [[entry['min_date'], entry['min_id'], 0]]
+            firsts = [(datetime.date.fromisoformat(d), i) for d, i, _ in blocks]
+            ends = [offset for _, _, offset in blocks[1:]] + [None]
+            if descending:
+                last = bisect.bisect_right(firsts, high) - 1 if high is not None else len(blocks) - 1
+                for index in range(last, -1, -1):
+                    rows = self._read_block(f, blocks[index][2], ends[index])
+                    yield from reversed(rows)
+                    if low is not None and firsts[index] <= low:
+                        return
+            else:
+                first = max(bisect.bisect_right(firsts, low) - 1, 0) if low is not None else 0
+                for index in range(first, len(blocks)):
+                    if high is not None and firsts[index] > high:
+                        return
+                    yield from self._read_block(f, blocks[index][2], ends[index])
+
+    def iter_rows(self, start=None, end=None, section_id: int = None, descending: bool = False,
+                  after: tuple = None, exclude_ids: set = None):
+        """
+        Rapports archivés de la période, triés par (date, id)
+
+        Args:
+            after: curseur (date, id); seules les lignes situées après dans l'ordre demandé
+            exclude_ids: ids à ignorer (encore présents dans la table chaude)
+        """
+        low = (start, -1) if start else None
+        high = (end, float('inf')) if end else None
+        if after is not None:
+            if descending:
+                high = min(high, after) if high is not None else after
+            else:
+                low = max(low, after) if low is not None else after
+        years = self._years_for(start, end, section_id)
+        for year in (reversed(years) if descending else years):
+            for row in self._iter_year(year, descending, low, high):
+                if start and row.date < start:
+                    if descending:
+                        break
+                    continue
+                if end and row.date > end:
+                    if descending:
+                        continue
+                    break
+                if section_id and row.section_id != section_id:
+                    continue
+                if after is not None and (keyset_key(row) >= after if descending else keyset_key(row) <= after):
+                    continue
+                if exclude_ids and row.id in exclude_ids:
+                    continue
+                yield row
+
+    def reader(self, start=None, end=None, section_id: int = None, descending: bool = True, connection=None):
+        """
+        Lecture transparente pour une vue (contexte d'application requis,
+        sauf si `connection` est fournie, ex: processus d'export)
+
+        Returns:
+            None si la période ne recoupe pas l'archive, sinon un callable
+            archived(after=None) -> lignes archivées triées, sans doublon avec la base
+        """
+        if not self.overlaps(start, end, section_id):
+            return None
+        low, high = self.date_range()
+        exclude = hot_ids(connection or db.session, max(start, low) if start else low,
+                          min(end, high) if end else high, section_id)
+
+        def archived(after=None):
+            return self.iter_rows(start, end, section_id, descending=descending,
+                                  after=after, exclude_ids=exclude)
+        return archived
+
+    def totals(self, columns, section_id: int = None, start=None, end=None) -> tuple:
+        """
+        (nombre, sommes) des rapports archivés d'une période, pour les recalculs de stats
+
+        Args:
+            columns: attributs de rapport à sommer (ex: ('offering', 'total_attendees'))
+        """
+        reader = self.reader(start, end, section_id, descending=False)
+        count, sums = 0, [0] * len(columns)
+        for row in (reader() if reader else ()):
+            count += 1
+            for i, column in enumerate(columns):
+                sums[i] += getattr(row, column) or 0
+        return count, sums
+
+    # ---------- Archivage ----------
+
+    def _write_year(self, year: int, new_rows: list) -> dict:
+        """Fusionne les lignes dans le fichier de l'année (remplacement atomique) et met le manifest à jour"""
+        key = str(year)
+        new_rows = sorted(new_rows, key=keyset_key)
+        new_ids = {row.id for row in new_rows}
+        existing = ()
+        if key in self.manifest()['years']:
+            existing = (row for row in self._iter_year(key, descending=False) if row.id not in new_ids)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        digest = hashlib.sha256()
+        blocks, block = [], []
+        stats = {'rows': 0, 'min_id': None, 'max_id': None, 'sections': set(), 'first': None, 'last': None}
+
+        def write_block(raw):
+            blocks.append([block[0].date.isoformat(), block[0].id, raw.tell()])
+            # mtime=0: fichier identique pour un contenu identique
+            with gzip.GzipFile(filename=f'reports-{year}.ndjson', mode='wb', fileobj=raw, mtime=0) as gz:
+                gz.write(''.join(_encode_row(row) + '\n' for row in block).encode('utf-8'))
+            block.clear()
+
+        with os.fdopen(fd, 'wb') as raw:
+            for row in heapq.merge(existing, new_rows, key=keyset_key):
+                block.append(row)
+                stats['rows'] += 1
+                stats['min_id'] = row.id if stats['min_id'] is None else min(stats['min_id'], row.id)
+                stats['max_id'] = row.id if stats['max_id'] is None else max(stats['max_id'], row.id)
+                stats['sections'].add(row.section_id)
+                stats['first'] = stats['first'] or row
+                stats['last'] = row
+                if len(block) >= BLOCK_ROWS:
+                    write_block(raw)
+            if block:
+                write_block(raw)
+            raw.flush()
+            os.fsync(raw.fileno())
+        with open(tmp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        # Nom versionné: un lecteur qui a encore l'ancien manifest lit l'ancien fichier
+        filename = f'reports-{year}-{digest.hexdigest()[:12]}.{ARCHIVE_FORMAT}'
+        os.replace(tmp_path, self._path(filename))
+        previous = self.manifest()['years'].get(key, {}).get('file')
+
+        entry = {
+            'file': filename,
+            'rows': stats['rows'],
+            'min_date': stats['first'].date.isoformat(),
+            'max_date': stats['last'].date.isoformat(),
+            'min_id': stats['min_id'],
+            'max_id': stats['max_id'],
+            'sections': sorted(stats['sections']),
+            'sha256': digest.hexdigest(),
+            'blocks': blocks,
+        }
+        manifest = dict(self.manifest())
+        manifest['format'] = ARCHIVE_FORMAT
+        manifest['years'] = dict(manifest.get('years', {}), **{key: entry})
+        manifest['updated_at'] = datetime.datetime.utcnow().isoformat()
+        self._write_json_atomic(MANIFEST_NAME, manifest)
+        if previous and previous != filename:
+            os.remove(self._path(previous))
+        return entry
+
+    def archive_before(self, cutoff: datetime.date) -> dict:
+        """
+        Déplace les rapports datés avant `cutoff` vers l'archive, année par année
+
+        Idempotent: relancé après une interruption, il refusionne et supprime
+        ce qui reste en base. Un commit par année.
+
+        Returns:
+            {année: nombre de rapports archivés}
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        first = db.session.query(func.min(Report.date)).filter(Report.date < cutoff).scalar()
+        moved = {}
+        if first is None:
+            return moved
+        for year in range(first.year, cutoff.year + 1):
+            low = datetime.date(year, 1, 1)
+            high = min(datetime.date(year + 1, 1, 1), cutoff)
+            rows = db.session.execute(
+                select(*REPORT_LIST_COLUMNS)
+                .where(Report.date >= low, Report.date < high)
+                .order_by(Report.date, Report.id)
+            ).all()
+            if not rows:
+                continue
+            self._write_year(year, [ArchivedReport(*row) for row in rows])
+            ids = [row.id for row in rows]
+            table = Report.__table__
+            for i in range(0, len(ids), DELETE_CHUNK_SIZE):
+                db.session.execute(table.delete().where(table.c.id.in_(ids[i:i + DELETE_CHUNK_SIZE])))
+            bump_data_versions({row.section_id for row in rows})
+            db.session.commit()
+            moved[year] = len(rows)
+            logger.info(f'Archived {len(rows)} reports of {year} (before {cutoff})')
+        return moved
+
+
+report_archive = ReportArchive()
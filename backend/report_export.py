@@ -0,0 +1,117 @@
+"""
+Export brut des rapports en CSV ou NDJSON, en flux
+
+Les lignes sont lues via un curseur serveur (yield_per) sans créer d'objets
+ORM, puis sérialisées par morceaux: la mémoire reste constante quelle que soit
+la taille de la table et les premiers octets partent immédiatement.
+"""
+import csv
+import heapq
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+
+from models import db, Report
+from pagination import keyset_key
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_COLUMNS = (
+    'id', 'section_id', 'date', 'preacher', 'total_attendees',
+    'men', 'women', 'children', 'youth', 'offering', 'currency',
+    'notes', 'submitted_by', 'submitted_at',
+)
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def export_statement(start=None, end=None, section_id: int = None):
+    """Requête Core des rapports filtrés, triés par (date, id)"""
+    table = Report.__table__
+    stmt = select(*[table.c[name] for name in EXPORT_COLUMNS])
+    if start:
+        stmt = stmt.where(table.c.date >= start)
+    if end:
+        stmt = stmt.where(table.c.date <= end)
+    if section_id:
+        stmt = stmt.where(table.c.section_id == section_id)
+    return stmt.order_by(table.c.date, table.c.id)
+
+
+def iter_export_rows(stmt, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Génère les lignes par lots de chunk_size (curseur serveur quand la base le permet)"""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+def _export_value(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Sérialise les lignes en CSV (en-tête inclus), un morceau tous les chunk_size lignes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow([_export_value(v) for v in row])
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Sérialise les lignes en NDJSON (un objet JSON par ligne)"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row))), ensure_ascii=False))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks, level: int = 6):
+    """Compresse un flux de morceaux texte au format gzip, à la volée"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(fmt: str, start=None, end=None, section_id: int = None, compress: bool = False,
+                  archived=None):
+    """
+    Générateur d'octets de l'export complet (format 'csv' ou 'ndjson')
+
+    archived: lecteur report_archive.reader(..., descending=False) si la
+    période recoupe l'archive; ses lignes sont fusionnées dans l'ordre (date, id)
+    """
+    rows = iter_export_rows(export_statement(start, end, section_id))
+    if archived is not None:
+        rows = heapq.merge(rows, archived(), key=keyset_key)
+    chunks = iter_csv(rows) if fmt == 'csv' else iter_ndjson(rows)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,291 @@
+"""
+Import historique de rapports depuis un fichier CSV ou XLSX
+
+Le fichier est lu ligne par ligne et inséré par lots. Chaque lot est
+validé avec le même commit qu'un point de reprise (ImportCheckpoint): un
+import interrompu reprend exactement après le dernier lot enregistré.
+Les stats des semaines et périodes touchées sont recalculées une seule
+fois, à la fin.
+"""
+import csv
+import datetime
+import hashlib
+import json
+import logging
+import os
+
+from data_versions import bump_data_versions
+from models import db, ImportCheckpoint, Report, User
+from report_schema import ReportSchema, normalize_report_payload
+from rollups import GRANULARITIES, period_start, recompute_rollup
+from weekly_stats import get_monday_of_week, recompute_weekly_stats
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+# Nombre maximal d'erreurs de validation conservées dans le point de reprise
+MAX_RECORDED_ERRORS = 100
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+
+class ReportImportError(ValueError):
+    """Fichier d'import invalide (format, colonnes, section)"""
+
+
+def file_sha256(path: str) -> str:
+    """Empreinte du fichier: identifie un import pour la reprise"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def detect_format(filename: str) -> str:
+    """Déduit le format de l'extension du fichier"""
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if ext not in IMPORT_FORMATS:
+        raise ReportImportError(f'Format non supporté: {ext or "?"} ({", ".join(IMPORT_FORMATS)})')
+    return ext
+
+
+def iter_rows(path: str, fmt: str):
+    """Génère les lignes du fichier sous forme de dicts {en-tête: valeur}"""
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            yield from csv.DictReader(f, dialect=dialect)
+        return
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ReportImportError('openpyxl est requis pour importer des fichiers XLSX (pip install openpyxl)')
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+        for values in rows:
+            if values is None or all(v is None for v in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+class _SectionResolver:
+    """
+    Résout la section d'une ligne (colonne section_id, ou section = nom d'utilisateur)
+
+    Un identifiant comme un nom doit désigner une section existante (pas
+    l'administrateur): sinon None, rejeté en "Section introuvable" pour la
+    ligne au lieu de faire échouer le lot sur la clé étrangère.
+    """
+
+    def __init__(self, default_section_id: int = None):
+        self.default_section_id = default_section_id
+        self._by_id = {}
+        self._by_username = {}
+
+    def _section_id(self, user):
+        return user.id if user is not None and user.role != 'admin' else None
+
+    def _resolve_id(self, section_id: int):
+        if section_id not in self._by_id:
+            self._by_id[section_id] = self._section_id(db.session.get(User, section_id))
+        return self._by_id[section_id]
+
+    def __call__(self, row: dict):
+        value = row.get('section_id')
+        if value not in (None, ''):
+            try:
+                return self._resolve_id(int(float(value)))
+            except (TypeError, ValueError, OverflowError):
+                return None
+        username = row.get('section')
+        if username not in (None, ''):
+            username = str(username).strip()
+            if username not in self._by_username:
+                self._by_username[username] = self._section_id(User.query.filter_by(username=username).first())
+            return self._by_username[username]
+        if self.default_section_id is None:
+            return None
+        return self._resolve_id(self.default_section_id)
+
+
+def _normalize_row(row: dict) -> dict:
+    """Normalise les en-têtes (alias de add_report) et les valeurs d'une ligne"""
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+        if isinstance(value, datetime.datetime):
+            value = value.date()
+        if isinstance(value, datetime.date):
+            value = value.strftime('%Y-%m-%d')
+        cleaned[str(key).strip()] = value
+    data = normalize_report_payload(cleaned)
+    for field in ('section_id', 'section'):
+        data.pop(field, None)
+    return data
+
+
+def _import_chunk(chunk, resolve_section, checkpoint, errors):
+    """Valide et insère un lot de lignes, puis avance le point de reprise (un seul commit)"""
+    items = []
+    sections = []
+    for line_no, row in chunk:
+        items.append(_normalize_row(row))
+        sections.append((line_no, resolve_section(row)))
+
+    schema = ReportSchema(many=True)
+    validation_errors = schema.validate(items)
+    valid = []
+    failed = 0
+    for index, (line_no, section_id) in enumerate(sections):
+        item_errors = validation_errors.get(index)
+        if item_errors is None and section_id is None:
+            item_errors = {'section': ['Section introuvable']}
+        if item_errors is not None:
+            failed += 1
+            if len(errors) < MAX_RECORDED_ERRORS:
+                errors.append({'line': line_no, 'errors': item_errors})
+            continue
+        valid.append(index)
+
+    now = datetime.datetime.utcnow()
+    loaded = schema.load([items[i] for i in valid]) if valid else []
+    rows = [{
+        'section_id': sections[index][1],
+        'date': data['date'],
+        'preacher': data['preacher'],
+        'total_attendees': data['total_attendees'],
+        'men': data.get('men', 0) or 0,
+        'women': data.get('women', 0) or 0,
+        'children': data.get('children', 0) or 0,
+        'youth': data.get('youth', 0) or 0,
+        'offering': data.get('offering', 0.0) or 0.0,
+        'currency': 'XOF',
+        'notes': data.get('notes'),
+        'submitted_by': 'import',
+        'submitted_at': now,
+    } for index, data in zip(valid, loaded)]
+
+    try:
+        if rows:
+            db.session.execute(Report.__table__.insert(), rows)
+            bump_data_versions({row['section_id'] for row in rows})
+        checkpoint.rows_processed += len(chunk)
+        checkpoint.rows_imported += len(rows)
+        checkpoint.rows_failed += failed
+        checkpoint.errors = json.dumps(errors)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _rebuild_stats(path, fmt, resolve_section):
+    """
+    Recalcule une fois chaque semaine et période touchée par le fichier
+
+    Relit le fichier (y compris les lots d'une exécution précédente) pour que
+    la reprise après une panne reconstruise aussi les semaines déjà importées.
+    """
+    weeks = set()
+    periods = set()
+    for row in iter_rows(path, fmt):
+        data = _normalize_row(row)
+        section_id = resolve_section(row)
+        try:
+            date = datetime.datetime.strptime(str(data.get('date')), '%Y-%m-%d').date()
+        except ValueError:
+            continue
+        if section_id is None:
+            continue
+        weeks.add((section_id, get_monday_of_week(date)))
+        for granularity in GRANULARITIES:
+            periods.add((granularity, section_id, period_start(granularity, date)))
+
+    for section_id, week_start in weeks:
+        recompute_weekly_stats(section_id, week_start)
+    for granularity, section_id, start in periods:
+        recompute_rollup(granularity, section_id, start)
+    db.session.commit()
+    return len(weeks)
+
+
+def import_reports(path: str, filename: str = None, fmt: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   default_section_id: int = None) -> ImportCheckpoint:
+    """
+    Importe (ou reprend l'import de) un fichier de rapports
+
+    Args:
+        path: chemin du fichier sur disque
+        filename: nom d'origine (pour le format et l'affichage)
+        fmt: 'csv' ou 'xlsx' (déduit de l'extension si absent)
+        chunk_size: nombre de lignes par commit
+        default_section_id: section des lignes sans colonne section_id/section
+
+    Returns:
+        Le point de reprise final (status 'done' ou 'failed')
+    """
+    filename = filename or os.path.basename(path)
+    fmt = fmt or detect_format(filename)
+    if fmt not in IMPORT_FORMATS:
+        raise ReportImportError(f'Format non supporté: {fmt} ({", ".join(IMPORT_FORMATS)})')
+
+    source_hash = file_sha256(path)
+    checkpoint = ImportCheckpoint.query.filter_by(source_hash=source_hash).first()
+    if checkpoint and checkpoint.status == 'done':
+        logger.info(f'Import {filename} already done, skipping')
+        return checkpoint
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(source_hash=source_hash, filename=filename, status='running',
+                                      rows_processed=0, rows_imported=0, rows_failed=0)
+        db.session.add(checkpoint)
+        db.session.commit()
+    else:
+        checkpoint.status = 'running'
+        db.session.commit()
+        logger.info(f'Resuming import {filename} after {checkpoint.rows_processed} rows')
+
+    resolve_section = _SectionResolver(default_section_id)
+    errors = json.loads(checkpoint.errors) if checkpoint.errors else []
+    skip = checkpoint.rows_processed
+    chunk = []
+    try:
+        # Ligne 1 = en-tête: les données commencent à la ligne 2
+        for line_no, row in enumerate(iter_rows(path, fmt), start=2):
+            if line_no - 2 < skip:
+                continue
+            chunk.append((line_no, row))
+            if len(chunk) >= chunk_size:
+                _import_chunk(chunk, resolve_section, checkpoint, errors)
+                chunk = []
+        if chunk:
+            _import_chunk(chunk, resolve_section, checkpoint, errors)
+
+        weeks = _rebuild_stats(path, fmt, resolve_section)
+        checkpoint.status = 'done'
+        db.session.commit()
+        logger.info(f'Import {filename} done: {checkpoint.rows_imported} imported, '
+                    f'{checkpoint.rows_failed} rejected, {weeks} weeks rebuilt')
+    except Exception as e:
+        db.session.rollback()
+        checkpoint.status = 'failed'
+        db.session.commit()
+        logger.error(f'Import {filename} failed after {checkpoint.rows_processed} rows: {e}')
+        raise
+    return checkpoint
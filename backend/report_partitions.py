@@ -0,0 +1,163 @@
+"""
+Partitionnement annuel de la table report (MySQL, optionnel)
+
+RANGE COLUMNS(date): une partition par année (p2024 reçoit les dates
+< 2025-01-01) et une partition pmax (MAXVALUE) pour les dates au-delà de
+la dernière année créée. Une requête bornée sur Report.date (>=, <=, <,
+BETWEEN) ne lit que les partitions des années concernées (partition pruning).
+
+Contraintes MySQL sur une table partitionnée:
+- toute clé unique contient la colonne de partitionnement: la clé
+  primaire devient (id, date)
+- pas de clé étrangère: report.section_id -> user.id est supprimée,
+  l'appartenance d'un rapport à sa section reste garantie par l'API
+
+SQLite (développement): toutes les fonctions sont sans effet et renvoient [].
+"""
+import datetime
+import logging
+import re
+
+from sqlalchemy import inspect, text
+
+from models import db, Report
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = Report.__tablename__
+FUTURE_PARTITION = 'pmax'
+
+# Verrou nommé MySQL: un seul worker réorganise les partitions à la fois
+_LOCK_NAME = 'report_partitions'
+
+_YEAR_PARTITION = re.compile(r'^p(\d{4})$')
+
+
+def supports_partitioning(engine=None) -> bool:
+    return (engine or db.engine).dialect.name == 'mysql'
+
+
+def partition_name(year: int) -> str:
+    return f'p{year}'
+
+
+def _partition_definition(year: int) -> str:
+    return f"PARTITION {partition_name(year)} VALUES LESS THAN ('{year + 1}-01-01')"
+
+
+def _future_definition() -> str:
+    return f'PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)'
+
+
+def current_partitions(conn) -> list:
+    """Noms des partitions de report, dans l'ordre ([] si la table n'est pas partitionnée)"""
+    if conn.dialect.name != 'mysql':
+        return []
+    return list(conn.execute(text(
+        'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL '
+        'ORDER BY PARTITION_ORDINAL_POSITION'
+    ), {'table': TABLE}).scalars())
+
+
+def partition_years(conn) -> list:
+    """Années ayant leur propre partition"""
+    years = []
+    for name in current_partitions(conn):
+        match = _YEAR_PARTITION.match(name)
+        if match:
+            years.append(int(match.group(1)))
+    return years
+
+
+def _ddl_connection(engine):
+    # DDL MySQL: commit implicite de toute façon; GET_LOCK est lié à la session
+    return engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+
+
+def _with_lock(conn, fn):
+    if conn.execute(text('SELECT GET_LOCK(:name, 30)'), {'name': _LOCK_NAME}).scalar() != 1:
+        raise RuntimeError('Verrou de partitionnement indisponible')
+    try:
+        return fn()
+    finally:
+        conn.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': _LOCK_NAME})
+
+
+def _add_missing_years(conn, last_year: int) -> list:
+    """Découpe pmax jusqu'à last_year inclus (verrou tenu par l'appelant)"""
+    years = partition_years(conn)
+    missing = list(range(max(years) + 1, last_year + 1)) if years else []
+    if not missing:
+        return []
+    definitions = ', '.join([_partition_definition(y) for y in missing] + [_future_definition()])
+    conn.execute(text(f'ALTER TABLE {TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({definitions})'))
+    logger.info(f'Partitions added to {TABLE}: {", ".join(partition_name(y) for y in missing)}')
+    return missing
+
+
+def partition_report_table(years_ahead: int = 1, today: datetime.date = None, engine=None) -> list:
+    """
+    Partitionne report par année (commande `flask partition-reports`)
+
+    Table déjà partitionnée: ajoute seulement les années manquantes.
+    Sinon: supprime les clés étrangères, passe la clé primaire à (id, date)
+    puis crée une partition par année depuis le plus ancien rapport jusqu'à
+    l'année courante + years_ahead. Sur une grosse table, l'ALTER recopie
+    les données: à lancer hors des heures de soumission.
+
+    Returns:
+        Années dont la partition a été créée
+    """
+    engine = engine or db.engine
+    if not supports_partitioning(engine):
+        return []
+    today = today or datetime.date.today()
+    last_year = today.year + years_ahead
+    with _ddl_connection(engine) as conn:
+        def convert():
+            if current_partitions(conn):
+                return _add_missing_years(conn, last_year)
+            oldest = conn.execute(text(f'SELECT MIN(date) FROM {TABLE}')).scalar()
+            years = list(range(min(oldest.year if oldest else today.year, today.year), last_year + 1))
+            for fk in inspect(conn).get_foreign_keys(TABLE):
+                conn.execute(text(f'ALTER TABLE {TABLE} DROP FOREIGN KEY {fk["name"]}'))
+                logger.info(f'Foreign key {fk["name"]} dropped on {TABLE} (required for partitioning)')
+            # Une seule instruction: id (AUTO_INCREMENT) reste en tête d'une clé
+            conn.execute(text(f'ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, date)'))
+            definitions = ', '.join([_partition_definition(y) for y in years] + [_future_definition()])
+            conn.execute(text(f'ALTER TABLE {TABLE} PARTITION BY RANGE COLUMNS(date) ({definitions})'))
+            logger.info(f'Table {TABLE} partitioned by year: {years[0]}-{years[-1]} + {FUTURE_PARTITION}')
+            return years
+        return _with_lock(conn, convert)
+
+
+def ensure_future_partitions(years_ahead: int = 1, today: datetime.date = None, engine=None) -> list:
+    """
+    Crée les partitions des années à venir (jusqu'à l'année courante + years_ahead)
+
+    Découpe pmax (REORGANIZE PARTITION): instantané tant qu'aucun rapport
+    n'est daté au-delà de la dernière année. Sans effet si la table n'est
+    pas partitionnée ou hors MySQL; appelé par le planificateur hebdomadaire.
+
+    Returns:
+        Années ajoutées
+    """
+    engine = engine or db.engine
+    if not supports_partitioning(engine):
+        return []
+    last_year = (today or datetime.date.today()).year + years_ahead
+    with _ddl_connection(engine) as conn:
+        existing = partition_years(conn)
+        if not existing or max(existing) >= last_year:
+            return []  # non partitionnée, ou rien à faire (cas courant: une seule requête)
+        return _with_lock(conn, lambda: _add_missing_years(conn, last_year))
+
+
+def expected_partitions(start: datetime.date, end: datetime.date, years: list) -> set:
+    """Partitions qu'une requête bornée par [start, end] doit lire au plus"""
+    names = {partition_name(y) for y in years if start.year <= y <= end.year}
+    if not years or end.year > max(years):
+        names.add(FUTURE_PARTITION)
+    return names
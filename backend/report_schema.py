@@ -1,5 +1,65 @@
 from marshmallow import Schema, fields, validate, pre_load
 
+
+# Mapping flexible des clés (frontend, anciens formulaires, imports)
+REPORT_FIELD_ALIASES = {
+    'totalFaithful': 'total_attendees',
+    'total_faithful': 'total_attendees',
+    'totalFaithfulCount': 'total_attendees',
+    'total': 'total_attendees',
+    'menCount': 'men',
+    'men_count': 'men',
+    'womenCount': 'women',
+    'women_count': 'women',
+    'childrenCount': 'children',
+    'children_count': 'children',
+    'kids': 'children',
+    'youthCount': 'youth',
+    'youth_count': 'youth',
+    'offrande': 'offering',
+    'offre': 'offering',
+    'don': 'offering',
+    'notes': 'notes',
+    'note': 'notes',
+    'preacher': 'preacher',
+    'predicateur': 'preacher',
+    'date': 'date',
+    'report_date': 'date',
+}
+
+NUMERIC_REPORT_FIELDS = ('total_attendees', 'men', 'women', 'children', 'youth', 'offering')
+
+
+def coerce_numeric(value):
+    """Convertit '12', '12,5' ou '' en nombre (None si vide, inchangé si invalide)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        s = str(value).strip()
+        if s == '':
+            return None
+        if s.isdigit() or (s.startswith('-') and s[1:].isdigit()):
+            return int(s)
+        s2 = s.replace(',', '.')
+        return float(s2)
+    except Exception:
+        return value
+
+
+def normalize_report_payload(payload) -> dict:
+    """Renomme les clés alias et convertit les champs numériques"""
+    normalized = {}
+    if isinstance(payload, dict):
+        for k, v in payload.items():
+            mapped = REPORT_FIELD_ALIASES.get(k, k)
+            if mapped in NUMERIC_REPORT_FIELDS:
+                v = coerce_numeric(v)
+            normalized[mapped] = v
+    return normalized
+
+
 class ReportSchema(Schema):
     """Schéma de validation pour les rapports"""
     
@@ -0,0 +1,170 @@
+"""
+Agrégats multi-granularité (jour, semaine, mois, année) par section
+"""
+import datetime
+import itertools
+
+from sqlalchemy import func
+
+from db_upsert import increment_existing, upsert_counters
+from models import db, Report, StatsRollup
+from report_archive import report_archive
+
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+# Compteurs maintenus pour chaque période: colonne StatsRollup -> attribut Report
+ROLLUP_COUNTERS = {
+    'total_attendees': 'total_attendees',
+    'men': 'men',
+    'women': 'women',
+    'children': 'children',
+    'youth': 'youth',
+    'total_offering': 'offering',
+}
+
+
+def period_start(granularity: str, date: datetime.date) -> datetime.date:
+    """Premier jour de la période contenant `date`"""
+    if granularity == 'day':
+        return date
+    if granularity == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if granularity == 'month':
+        return date.replace(day=1)
+    if granularity == 'year':
+        return date.replace(month=1, day=1)
+    raise ValueError(f'Granularité inconnue: {granularity}')
+
+
+def period_end(granularity: str, start: datetime.date) -> datetime.date:
+    """Dernier jour de la période commençant à `start`"""
+    if granularity == 'day':
+        return start
+    if granularity == 'week':
+        return start + datetime.timedelta(days=6)
+    if granularity == 'month':
+        next_month = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        return next_month - datetime.timedelta(days=1)
+    if granularity == 'year':
+        return start.replace(month=12, day=31)
+    raise ValueError(f'Granularité inconnue: {granularity}')
+
+
+def apply_reports_to_rollups(reports: list, sign: int = 1) -> None:
+    """
+    Ajoute (sign=1) ou retire (sign=-1) des rapports des 4 granularités (sans commit)
+
+    Les deltas sont cumulés par période: une seule écriture par période touchée.
+    """
+    periods = {}
+    for report in reports:
+        for granularity in GRANULARITIES:
+            key = (granularity, report.section_id, period_start(granularity, report.date))
+            acc = periods.get(key)
+            if acc is None:
+                acc = periods[key] = dict.fromkeys(ROLLUP_COUNTERS, 0)
+                acc['total_services'] = 0
+            for column, attr in ROLLUP_COUNTERS.items():
+                acc[column] += (getattr(report, attr) or 0) * sign
+            acc['total_services'] += sign
+
+    table = StatsRollup.__table__
+    for (granularity, section_id, start), counters in periods.items():
+        keys = {'granularity': granularity, 'section_id': section_id, 'period_start': start}
+        if sign > 0:
+            upsert_counters(table, keys, counters)
+        elif not increment_existing(table, keys, counters):
+            # Agrégat absent (données antérieures): recalcul de la période
+            db.session.flush()
+            recompute_rollup(granularity, section_id, start)
+
+
+def recompute_rollup(granularity: str, section_id: int, start: datetime.date) -> None:
+    """Recalcule une période à partir des rapports, archivés compris (agrégat SQL, sans commit)"""
+    end = period_end(granularity, start)
+    columns = [func.coalesce(func.sum(getattr(Report, attr)), 0) for attr in ROLLUP_COUNTERS.values()]
+    row = db.session.query(func.count(Report.id), *columns).filter(
+        Report.section_id == section_id,
+        Report.date >= start,
+        Report.date <= end,
+    ).one()
+    archived_count, archived_sums = report_archive.totals(tuple(ROLLUP_COUNTERS.values()), section_id, start, end)
+    counters = dict(zip(ROLLUP_COUNTERS, row[1:]))
+    counters['total_offering'] = float(counters['total_offering'])
+    for name, extra in zip(ROLLUP_COUNTERS, archived_sums):
+        counters[name] += extra
+    counters['total_services'] = row[0] + archived_count
+    upsert_counters(
+        StatsRollup.__table__,
+        {'granularity': granularity, 'section_id': section_id, 'period_start': start},
+        counters,
+        absolute=True,
+    )
+
+
+def rebuild_all_rollups(batch_size: int = 1000) -> int:
+    """
+    Reconstruit tous les agrégats depuis la table Report et l'archive (backfill, réparation)
+
+    Les rapports sont lus par lots; seuls les totaux par période restent en mémoire.
+
+    Returns:
+        Nombre de lignes d'agrégats écrites
+    """
+    totals = {}
+    query = db.session.query(Report.section_id, Report.date, *[getattr(Report, attr) for attr in ROLLUP_COUNTERS.values()])
+    archived = report_archive.reader(descending=False)
+    archived_rows = (
+        (r.section_id, r.date, *[getattr(r, attr) for attr in ROLLUP_COUNTERS.values()])
+        for r in (archived() if archived else ())
+    )
+    for row in itertools.chain(query.yield_per(batch_size), archived_rows):
+        section_id, date, values = row[0], row[1], row[2:]
+        for granularity in GRANULARITIES:
+            key = (granularity, section_id, period_start(granularity, date))
+            acc = totals.setdefault(key, [0] * (len(values) + 1))
+            acc[0] += 1
+            for i, value in enumerate(values, start=1):
+                acc[i] += value or 0
+
+    now = datetime.datetime.utcnow()
+    rows = []
+    for (granularity, section_id, start), acc in totals.items():
+        row = {
+            'granularity': granularity,
+            'section_id': section_id,
+            'period_start': start,
+            'total_services': acc[0],
+            'created_at': now,
+            'updated_at': now,
+        }
+        row.update(zip(ROLLUP_COUNTERS, acc[1:]))
+        rows.append(row)
+
+    db.session.execute(StatsRollup.__table__.delete())
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(StatsRollup.__table__.insert(), rows[i:i + batch_size])
+    db.session.commit()
+    return len(rows)
+
+
+def get_rollups(granularity: str, start: datetime.date = None, end: datetime.date = None,
+                section_id: int = None) -> list:
+    """
+    Récupère les agrégats d'une granularité
+
+    Args:
+        start/end: bornes sur le début de période (None = sans borne)
+        section_id: ID de la section (None = toutes)
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Granularité inconnue: {granularity}')
+    query = StatsRollup.query.filter(StatsRollup.granularity == granularity)
+    if section_id:
+        query = query.filter(StatsRollup.section_id == section_id)
+    if start:
+        query = query.filter(StatsRollup.period_start >= period_start(granularity, start))
+    if end:
+        query = query.filter(StatsRollup.period_start <= end)
+    return query.order_by(StatsRollup.period_start, StatsRollup.section_id).all()
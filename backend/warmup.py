@@ -0,0 +1,90 @@
+"""
+Préchauffage de l'application avant d'accepter du trafic
+
+Avec gunicorn --preload (voir gunicorn.conf.py), warm_up() tourne une fois
+dans le processus maître: imports ReportLab, feuille de styles, premier
+rendu PDF et cache d'analyses sont hérités par les workers (copy-on-write).
+warm_up_worker() tourne ensuite dans chaque worker après le fork: les
+connexions ne survivent pas au fork, elles sont donc rouvertes là.
+"""
+import datetime
+import logging
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from analytics_cache import AnalyticsUnavailable, analytics_cache
+from models import db
+
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(timings: dict, name: str, fn) -> None:
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        # Un préchauffage raté ne doit pas empêcher le démarrage: la requête
+        # concernée paiera simplement le coût à froid
+        logger.warning(f'Warm-up step {name} failed: {e}')
+    timings[name] = (time.perf_counter() - started) * 1000
+
+
+def _render_sample_pdfs() -> None:
+    """Premier rendu PDF: charge polices, métriques et logo dans les caches ReportLab"""
+    from pdf_utils import generate_reports_pdf_stream, generate_single_report_pdf
+
+    sample = SimpleNamespace(
+        id=0, date=datetime.date.today(), section_id=0, preacher='-', men=0, women=0, youth=0,
+        children=0, total_attendees=0, offering=0, currency='XOF', notes='', submitted_by='-',
+    )
+    generate_single_report_pdf(sample).close()
+    for _ in generate_reports_pdf_stream([sample]):
+        pass
+
+
+def _ping_engines(connections: int = 1) -> None:
+    """Ouvre `connections` connexions par moteur (primaire et réplica) et les rend au pool"""
+    for engine in db.engines.values():
+        opened = []
+        try:
+            for _ in range(max(1, connections)):
+                conn = engine.connect()
+                opened.append(conn)
+                conn.execute(text('SELECT 1'))
+        finally:
+            for conn in opened:
+                conn.close()
+
+
+def _prime_analytics() -> None:
+    try:
+        analytics_cache.totals()
+    except AnalyticsUnavailable:
+        pass
+
+
+def warm_up(app) -> dict:
+    """Préchauffage partagé (processus maître avant le fork, ou processus unique)"""
+    timings = {}
+    with app.app_context():
+        _timed(timings, 'pdf', _render_sample_pdfs)
+        _timed(timings, 'database', _ping_engines)
+        _timed(timings, 'analytics', _prime_analytics)
+    logger.info('Warm-up done: ' + ', '.join(f'{k} {v:.0f} ms' for k, v in timings.items()))
+    return timings
+
+
+def warm_up_worker(app) -> dict:
+    """Préchauffage propre à un worker, juste après le fork"""
+    timings = {}
+    with app.app_context():
+        # Les connexions héritées du maître appartiennent à son processus:
+        # on les abandonne sans les fermer (close=False) et on en rouvre
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        _timed(timings, 'database', lambda: _ping_engines(app.config.get('WARMUP_DB_CONNECTIONS', 1)))
+    logger.info('Worker warm-up done: ' + ', '.join(f'{k} {v:.0f} ms' for k, v in timings.items()))
+    return timings
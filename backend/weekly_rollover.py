@@ -0,0 +1,246 @@
+"""
+Basculement hebdomadaire des statistiques (clôture de semaine)
+
+Chaque lundi, la semaine précédente est close:
+- ses lignes WeeklyStats sont figées dans WeeklyStatsArchive (INSERT ... SELECT)
+- les lignes de la semaine suivante sont créées à zéro pour toutes les
+  sections en une seule requête, au lieu du commit paresseux de
+  get_or_create_weekly_stats à la première lecture
+
+Le planificateur tourne dans chaque worker (thread démon), mais une ligne
+ScheduledJob sert de verrou (avec expiration) et de point d'avancement:
+un seul worker travaille, une semaine déjà close n'est jamais refaite, et
+les semaines manquées (serveur arrêté) sont rattrapées dans l'ordre.
+
+Le même thread crée les partitions annuelles à venir de report quand le
+partitionnement MySQL est activé (report_partitions).
+"""
+import datetime
+import logging
+import os
+import socket
+import threading
+
+from sqlalchemy import Date, DateTime, Float, Integer, String, func, literal, or_, select
+
+from db_upsert import upsert_counters
+from models import db, ScheduledJob, User, WeeklyStats, WeeklyStatsArchive
+from report_partitions import ensure_future_partitions
+from weekly_stats import get_monday_of_week
+
+
+logger = logging.getLogger(__name__)
+
+ROLLOVER_JOB = 'weekly_rollover'
+
+ONE_WEEK = datetime.timedelta(days=7)
+
+
+def _worker_id() -> str:
+    """hôte:pid:thread (la commande CLI et le thread d'un même worker sont distincts)"""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_native_id()}'[:80]
+
+
+# ==================== Verrou ====================
+
+def acquire_job_lock(name: str, owner: str, lock_seconds: int) -> bool:
+    """
+    Prend le verrou de la tâche `name` (ligne créée au besoin) et commit
+
+    Un seul UPDATE conditionnel: réussit si le verrou est libre, expiré ou
+    déjà tenu par `owner`.
+    """
+    table = ScheduledJob.__table__
+    upsert_counters(table, {'name': name}, {})
+    now = datetime.datetime.utcnow()
+    result = db.session.execute(
+        table.update()
+        .where(table.c.name == name,
+               or_(table.c.locked_until.is_(None), table.c.locked_until < now, table.c.locked_by == owner))
+        .values(locked_by=owner, locked_until=now + datetime.timedelta(seconds=lock_seconds), updated_at=now)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def release_job_lock(name: str, owner: str) -> None:
+    table = ScheduledJob.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.name == name, table.c.locked_by == owner)
+        .values(locked_by=None, locked_until=None, updated_at=datetime.datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def _last_completed(name: str):
+    return db.session.execute(
+        select(ScheduledJob.last_completed).where(ScheduledJob.name == name)
+    ).scalar()
+
+
+# ==================== Clôture d'une semaine ====================
+
+def archive_week(week_start: datetime.date) -> int:
+    """Fige les WeeklyStats d'une semaine dans l'archive (idempotent, sans commit)"""
+    archive = WeeklyStatsArchive.__table__
+    stats = WeeklyStats.__table__
+    db.session.execute(archive.delete().where(archive.c.week_start == week_start))
+    result = db.session.execute(archive.insert().from_select(
+        ['section_id', 'week_start', 'total_offering', 'total_attendees', 'total_services', 'archived_at'],
+        select(
+            stats.c.section_id,
+            stats.c.week_start,
+            func.coalesce(stats.c.total_offering, 0.0),
+            func.coalesce(stats.c.total_attendees, 0),
+            func.coalesce(stats.c.total_services, 0),
+            literal(datetime.datetime.utcnow(), DateTime),
+        ).where(stats.c.week_start == week_start),
+    ))
+    return result.rowcount
+
+
+def create_week_rows(week_start: datetime.date) -> int:
+    """Crée à zéro les WeeklyStats d'une semaine pour toutes les sections (une requête, sans commit)"""
+    stats = WeeklyStats.__table__
+    users = User.__table__
+    now = datetime.datetime.utcnow()
+    already = select(stats.c.id).where(stats.c.section_id == users.c.id,
+                                       stats.c.week_start == week_start).exists()
+    stmt = stats.insert().from_select(
+        ['section_id', 'week_start', 'week_end', 'total_offering', 'currency',
+         'total_attendees', 'total_services', 'created_at', 'updated_at'],
+        select(
+            users.c.id,
+            literal(week_start, Date),
+            literal(week_start + datetime.timedelta(days=6), Date),
+            literal(0.0, Float),
+            literal('XOF', String),
+            literal(0, Integer),
+            literal(0, Integer),
+            literal(now, DateTime),
+            literal(now, DateTime),
+        ).where(users.c.role != 'admin', ~already),
+    )
+    # Une ligne créée entre-temps par get_or_create_weekly_stats est ignorée
+    stmt = stmt.prefix_with('OR IGNORE', dialect='sqlite').prefix_with('IGNORE', dialect='mysql')
+    return db.session.execute(stmt).rowcount
+
+
+def run_weekly_rollover(today: datetime.date = None, lock_seconds: int = 600) -> list:
+    """
+    Clôt toutes les semaines terminées qui ne l'ont pas encore été
+
+    Une transaction par semaine (archive + avancement, plus les lignes de la
+    semaine en cours pour la dernière): une interruption reprend à la semaine
+    qui a échoué. Au premier passage, l'historique part de la plus ancienne
+    semaine de WeeklyStats; les semaines passées rattrapées sont seulement
+    archivées, sans lignes à zéro pour chaque section.
+
+    Returns:
+        Lundis des semaines closes par cet appel ([] si rien à faire ou verrou tenu ailleurs)
+    """
+    today = today or datetime.date.today()
+    last_week = get_monday_of_week(today) - ONE_WEEK
+    done = _last_completed(ROLLOVER_JOB)
+    if done is not None and done >= last_week:
+        return []
+
+    owner = _worker_id()
+    if not acquire_job_lock(ROLLOVER_JOB, owner, lock_seconds):
+        logger.info(f'Weekly rollover already running elsewhere, skipped by {owner}')
+        return []
+
+    closed = []
+    try:
+        done = _last_completed(ROLLOVER_JOB)  # relu sous verrou
+        if done is not None:
+            week = done + ONE_WEEK
+        else:
+            first = db.session.query(func.min(WeeklyStats.week_start)).scalar()
+            week = min(first, last_week) if first else last_week
+        jobs = ScheduledJob.__table__
+        while week <= last_week:
+            archived = archive_week(week)
+            # Seule la semaine en cours reçoit ses lignes à zéro (pas les semaines passées)
+            created = create_week_rows(week + ONE_WEEK) if week == last_week else 0
+            now = datetime.datetime.utcnow()
+            progress = db.session.execute(
+                jobs.update()
+                .where(jobs.c.name == ROLLOVER_JOB, jobs.c.locked_by == owner)
+                .values(last_completed=week, updated_at=now,
+                        locked_until=now + datetime.timedelta(seconds=lock_seconds))
+            )
+            if progress.rowcount != 1:
+                # Verrou expiré et repris par un autre worker: il refera cette semaine
+                db.session.rollback()
+                logger.warning(f'Weekly rollover lock lost by {owner} at week {week}')
+                break
+            db.session.commit()
+            closed.append(week)
+            logger.info(f'Week {week} closed: {archived} sections archived, '
+                        f'{created} rows created for {week + ONE_WEEK}')
+            week += ONE_WEEK
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        release_job_lock(ROLLOVER_JOB, owner)
+    return closed
+
+
+# ==================== Planificateur ====================
+
+class WeeklyRolloverScheduler:
+    """Thread démon qui lance run_weekly_rollover() à intervalle régulier"""
+
+    def __init__(self):
+        self.enabled = True
+        self.interval_seconds = 300
+        self.lock_seconds = 600
+        self.partitioning = False
+        self.partition_years_ahead = 1
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Configure le planificateur depuis la config Flask (ne démarre rien)"""
+        self.enabled = app.config.get('WEEKLY_ROLLOVER_ENABLED', self.enabled)
+        self.interval_seconds = app.config.get('WEEKLY_ROLLOVER_INTERVAL_SECONDS', self.interval_seconds)
+        self.lock_seconds = app.config.get('WEEKLY_ROLLOVER_LOCK_SECONDS', self.lock_seconds)
+        self.partitioning = app.config.get('REPORT_PARTITIONING_ENABLED', self.partitioning)
+        self.partition_years_ahead = app.config.get('REPORT_PARTITION_YEARS_AHEAD', self.partition_years_ahead)
+
+    def start(self, app) -> None:
+        """Démarre le thread (à appeler dans chaque worker, après le fork)"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(app,),
+                                        name='weekly-rollover', daemon=True)
+        self._thread.start()
+
+    def _loop(self, app) -> None:
+        while True:
+            try:
+                with app.app_context():
+                    run_weekly_rollover(lock_seconds=self.lock_seconds)
+            except Exception as e:
+                logger.error(f'Weekly rollover failed: {e}')
+            if self.partitioning:
+                try:
+                    with app.app_context():
+                        ensure_future_partitions(self.partition_years_ahead)
+                except Exception as e:
+                    logger.error(f'Report partition maintenance failed: {e}')
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+weekly_rollover = WeeklyRolloverScheduler()
@@ -2,7 +2,13 @@
 Utilitaires pour gérer les statistiques hebdomadaires
 """
 import datetime
+
+from sqlalchemy import func
+
+from db_upsert import increment_existing, upsert_counters
 from models import db, WeeklyStats, Report
+from report_archive import report_archive
+from rollups import apply_reports_to_rollups
 
 
 def get_monday_of_week(date: datetime.date) -> datetime.date:
@@ -15,10 +21,87 @@ def get_sunday_of_week(date: datetime.date) -> datetime.date:
     return get_monday_of_week(date) + datetime.timedelta(days=6)
 
 
+def _upsert_weekly_stats(section_id: int, week_start: datetime.date, offering: float,
+                         attendees: int, services: int, absolute: bool = False) -> None:
+    """UPSERT de la ligne WeeklyStats d'une semaine (deltas ou totaux absolus)"""
+    upsert_counters(
+        WeeklyStats.__table__,
+        keys={'section_id': section_id, 'week_start': week_start},
+        counters={'total_offering': offering, 'total_attendees': attendees, 'total_services': services},
+        defaults={'week_end': week_start + datetime.timedelta(days=6), 'currency': 'XOF'},
+        absolute=absolute,
+    )
+
+
+def apply_report_delta(report: Report, sign: int = 1) -> None:
+    """
+    Ajoute (sign=1) ou retire (sign=-1) un rapport des stats de sa semaine
+    et des agrégats jour/semaine/mois/année
+
+    Coût O(1): un UPSERT par table, dans la même transaction que l'insertion
+    ou la suppression du rapport. L'appelant fait le commit.
+    """
+    apply_reports_delta([report], sign)
+
+
+def apply_reports_delta(reports: list, sign: int = 1) -> None:
+    """
+    Applique un lot de rapports aux stats: les deltas sont cumulés par
+    (section, semaine) puis écrits une seule fois par semaine touchée
+    """
+    weeks = {}
+    for report in reports:
+        key = (report.section_id, get_monday_of_week(report.date))
+        acc = weeks.setdefault(key, [0.0, 0, 0, report.date])
+        acc[0] += (report.offering or 0.0) * sign
+        acc[1] += (report.total_attendees or 0) * sign
+        acc[2] += sign
+
+    for (section_id, week_start), (offering, attendees, services, date) in weeks.items():
+        if sign > 0:
+            _upsert_weekly_stats(section_id, week_start, offering, attendees, services)
+            continue
+        found = increment_existing(
+            WeeklyStats.__table__,
+            {'section_id': section_id, 'week_start': week_start},
+            {'total_offering': offering, 'total_attendees': attendees, 'total_services': services},
+        )
+        if not found:
+            # Pas de ligne de stats (données antérieures): recalcul complet de la semaine
+            db.session.flush()
+            recompute_weekly_stats(section_id, date)
+
+    # Agrégats jour/semaine/mois/année
+    apply_reports_to_rollups(reports, sign)
+
+
+def recompute_weekly_stats(section_id: int, date: datetime.date) -> None:
+    """
+    Recalcule les totaux d'une semaine à partir des rapports (agrégat SQL,
+    plus les rapports archivés si la semaine recoupe l'archive)
+
+    Sert de réparation et aux traitements par lots. Sans commit.
+    """
+    week_start = get_monday_of_week(date)
+    week_end = get_sunday_of_week(date)
+    offering, attendees, services = db.session.query(
+        func.coalesce(func.sum(Report.offering), 0.0),
+        func.coalesce(func.sum(Report.total_attendees), 0),
+        func.count(Report.id),
+    ).filter(
+        Report.section_id == section_id,
+        Report.date >= week_start,
+        Report.date <= week_end,
+    ).one()
+    archived_count, (archived_offering, archived_attendees) = report_archive.totals(
+        ('offering', 'total_attendees'), section_id, week_start, week_end)
+    _upsert_weekly_stats(section_id, week_start, float(offering) + archived_offering,
+                         int(attendees) + archived_attendees, int(services) + archived_count, absolute=True)
+
+
 def get_or_create_weekly_stats(section_id: int, date: datetime.date) -> WeeklyStats:
     """Récupère ou crée les stats hebdomadaires pour une section et une date"""
     week_start = get_monday_of_week(date)
-    week_end = get_sunday_of_week(date)
     
     stats = WeeklyStats.query.filter(
         WeeklyStats.section_id == section_id,
@@ -26,41 +109,17 @@ def get_or_create_weekly_stats(section_id: int, date: datetime.date) -> WeeklySt
     ).first()
     
     if not stats:
-        stats = WeeklyStats(
-            section_id=section_id,
-            week_start=week_start,
-            week_end=week_end,
-            total_offering=0.0,
-            currency='XOF',
-            total_attendees=0,
-            total_services=0
-        )
-        db.session.add(stats)
+        # UPSERT à zéro: sûr si un autre worker crée la ligne en même temps
+        _upsert_weekly_stats(section_id, week_start, 0.0, 0, 0)
         db.session.commit()
+        stats = WeeklyStats.query.filter(
+            WeeklyStats.section_id == section_id,
+            WeeklyStats.week_start == week_start
+        ).one()
     
     return stats
 
 
-def update_weekly_stats_from_report(report: Report) -> WeeklyStats:
-    """Met à jour les stats hebdomadaires quand un rapport est ajouté/modifié"""
-    stats = get_or_create_weekly_stats(report.section_id, report.date)
-    
-    # Recalculer toutes les stats pour cette semaine
-    reports_in_week = Report.query.filter(
-        Report.section_id == report.section_id,
-        Report.date >= stats.week_start,
-        Report.date <= stats.week_end
-    ).all()
-    
-    stats.total_offering = sum(r.offering or 0.0 for r in reports_in_week)
-    stats.total_attendees = sum(r.total_attendees or 0 for r in reports_in_week)
-    stats.total_services = len(reports_in_week)
-    stats.updated_at = datetime.datetime.utcnow()
-    
-    db.session.commit()
-    return stats
-
-
 def get_weekly_stats(section_id: int = None, date: datetime.date = None) -> list:
     """
     Récupère les stats hebdomadaires
@@ -90,29 +149,3 @@ def get_current_week_offering(section_id: int) -> float:
     today = datetime.date.today()
     stats = get_or_create_weekly_stats(section_id, today)
     return float(stats.total_offering)
-
-
-def reset_and_archive_week_stats() -> list:
-    """
-    Archivé et réinitialise les stats du lundi
-    Cette fonction devrait être appelée par une tâche programmée
-    """
-    today = datetime.date.today()
-    
-    # Si ce n'est pas lundi, retourner une liste vide
-    if today.weekday() != 0:  # 0 = lundi
-        return []
-    
-    # Récupérer toutes les stats de la semaine passée
-    past_monday = today - datetime.timedelta(days=7)
-    past_stats = WeeklyStats.query.filter(
-        WeeklyStats.week_start == past_monday
-    ).all()
-    
-    # Note: Dans un système réel, on archiverait ces données
-    # Pour maintenant, on les garde simplement en base
-    
-    # Créer les nouvelles stats pour la semaine courante (optionnel)
-    # Elles seront créées à la demande lors du premier rapport
-    
-    return past_stats
@@ -0,0 +1,14 @@
+"""
+Point d'entrée WSGI de production
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+L'application est créée et préchauffée à l'import: avec preload_app (voir
+gunicorn.conf.py) cela se fait une seule fois dans le maître, avant le fork.
+"""
+from app import create_app
+from warmup import warm_up
+
+
+app = create_app()
+warm_up(app)